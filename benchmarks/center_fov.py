@@ -0,0 +1,78 @@
+from __future__ import absolute_import, division, print_function
+
+from glue_wwt.viewer.utils import center_fov, center_fov_chunked
+
+from .common import ROWS, make_table, make_viewer, remove_all
+
+CHUNK_SIZE = 10 ** 6
+
+
+class CenterFOV:
+    """
+    Finding the circle enclosing the positions of a table, either in memory
+    or in chunks.
+    """
+
+    params = (ROWS, ['clustered', 'all-sky'])
+    param_names = ['rows', 'spread']
+    timeout = 600
+
+    def setup(self, rows, spread):
+        data = make_table(rows)
+        self.lon = data['lon']
+        self.lat = data['lat']
+        if spread == 'clustered':
+            self.lon = 150 + self.lon / 36
+            self.lat = 30 + self.lat / 18
+
+    def time_center_fov(self, rows, spread):
+        center_fov(self.lon, self.lat)
+
+    def time_center_fov_chunked(self, rows, spread):
+        center_fov_chunked(lambda: ((self.lon[start:start + CHUNK_SIZE], self.lat[start:start + CHUNK_SIZE])
+                                    for start in range(0, len(self.lon), CHUNK_SIZE)))
+
+
+class LayerCenter:
+    """
+    Recentering the view on a table layer again, once the enclosing circle
+    has been computed.
+    """
+
+    params = ([10 ** 4, 10 ** 6],)
+    param_names = ['rows']
+
+    def setup(self, rows):
+        self.data = make_table(rows)
+        self.viewer = make_viewer(self.data)
+        self.viewer.add_data(self.data)
+        self.viewer.layers[0].center()
+
+    def teardown(self, rows):
+        remove_all(self.viewer)
+
+    def time_center(self, rows):
+        self.viewer.layers[0].center()
+
+
+class LayerCenterFirst:
+    """
+    Centering the view on a table layer for the first time, which computes
+    the enclosing circle. Each sample is a single call on a new layer.
+    """
+
+    params = ([10 ** 4, 10 ** 6],)
+    param_names = ['rows']
+    number = 1
+    warmup_time = 0
+
+    def setup(self, rows):
+        self.data = make_table(rows)
+        self.viewer = make_viewer(self.data)
+        self.viewer.add_data(self.data)
+
+    def teardown(self, rows):
+        remove_all(self.viewer)
+
+    def time_center(self, rows):
+        self.viewer.layers[0].center()
@@ -0,0 +1,63 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from astropy.wcs import WCS
+from glue.core import Data, DataCollection
+from glue.core.session import Session
+
+from glue_wwt.viewer.tests.fake_wwt import FakeWWTViewer
+
+# The table sizes used by the benchmarks
+ROWS = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+
+def make_table(rows, time=False, seed=12345):
+    """
+    Return a dataset with ``rows`` random positions on the sky, which the
+    viewer picks as its longitude and latitude attributes.
+    """
+    rng = np.random.default_rng(seed)
+    components = dict(lon=rng.uniform(0, 360, rows),
+                      lat=np.degrees(np.arcsin(rng.uniform(-1, 1, rows))),
+                      mag=rng.normal(15, 2, rows))
+    if time:
+        offsets = rng.integers(0, 365 * 86400, rows).astype('timedelta64[s]')
+        components['time'] = np.datetime64('2020-01-01T00:00:00') + offsets
+    return Data(label='table', **components)
+
+
+def make_image(size, native=True, seed=12345):
+    """
+    Return a ``size`` x ``size`` image with celestial WCS coordinates, which
+    are already in the form WWT expects if ``native`` is `True`.
+    """
+    rng = np.random.default_rng(seed)
+    wcs = WCS(naxis=2)
+    wcs.wcs.ctype = 'RA---TAN', 'DEC--TAN'
+    wcs.wcs.crval = 10, 20
+    wcs.wcs.crpix = size / 2, size / 2
+    wcs.wcs.cdelt = -1 / size, 1 / size
+    if not native:
+        wcs.wcs.ctype = 'GLON-TAN', 'GLAT-TAN'
+    return Data(label='image', image=rng.normal(0, 1, (size, size)), coords=wcs)
+
+
+def make_viewer(*datasets):
+    """
+    Return a WWT viewer using a stand-in client, for the given datasets.
+    """
+    data_collection = DataCollection(list(datasets))
+    session = Session(data_collection=data_collection, hub=data_collection.hub)
+    viewer = FakeWWTViewer(session)
+    viewer.register_to_hub(data_collection.hub)
+    return viewer
+
+
+def remove_all(viewer):
+    """
+    Remove all the layers from ``viewer``, which releases their columns from
+    the column store so that the next build starts from scratch.
+    """
+    for data in list(viewer.state.layers_data):
+        viewer.remove_data(data)
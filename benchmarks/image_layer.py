@@ -0,0 +1,53 @@
+from __future__ import absolute_import, division, print_function
+
+from glue_wwt.viewer.reprojection_cache import prepare_image_for_wwt
+
+from .common import make_image, make_viewer, remove_all
+
+SIZES = [256, 1024, 4096]
+
+
+class ImagePrepare:
+    """
+    Preparing an image for WWT without the reprojection cache, for images
+    that are (native) or aren't already in a form WWT can show.
+    """
+
+    params = (SIZES, [True, False])
+    param_names = ['size', 'native']
+    timeout = 600
+
+    def setup(self, size, native):
+        self.data = make_image(size, native=native)
+
+    def time_prepare(self, size, native):
+        prepare_image_for_wwt(self.data['image'], self.data.coords, cache=None)
+
+    def peakmem_prepare(self, size, native):
+        prepare_image_for_wwt(self.data['image'], self.data.coords, cache=None)
+
+
+class ImageLayerBuild:
+    """
+    Building an image layer, with the reprojected image already cached.
+    """
+
+    params = (SIZES, [True, False])
+    param_names = ['size', 'native']
+    number = 1
+    repeat = (1, 5, 30)
+    timeout = 600
+
+    def setup(self, size, native):
+        self.data = make_image(size, native=native)
+        prepare_image_for_wwt(self.data['image'], self.data.coords)
+        self.viewer = make_viewer(self.data)
+
+    def teardown(self, size, native):
+        remove_all(self.viewer)
+
+    def time_build(self, size, native):
+        self.viewer.add_data(self.data)
+
+    def peakmem_build(self, size, native):
+        self.viewer.add_data(self.data)
@@ -0,0 +1,24 @@
+from __future__ import absolute_import, division, print_function
+
+# The timeraw_* benchmarks run the returned code in a fresh interpreter, so
+# nothing is imported yet. See also glue_wwt/viewer/tests/test_imports.py,
+# which checks that the slow modules are not imported at all.
+
+PLUGIN_MODULES = ['glue_wwt.viewer.data_viewer', 'glue_wwt.viewer.image_layer',
+                  'glue_wwt.viewer.table_layer', 'glue_wwt.viewer.tools']
+
+
+class Import:
+    """
+    Importing the package and the modules registering the plugin, on their
+    own or once glue itself is imported.
+    """
+
+    def timeraw_import_glue_wwt(self):
+        return "import glue_wwt"
+
+    def timeraw_import_glue_wwt_after_glue(self):
+        return "import glue_wwt", "import glue.core.state"
+
+    def timeraw_import_plugin(self):
+        return "\n".join("import {0}".format(name) for name in PLUGIN_MODULES), "import glue.core"
@@ -0,0 +1,146 @@
+from __future__ import absolute_import, division, print_function
+
+from .common import ROWS, make_table, make_viewer, remove_all
+
+
+class TableLayerBuild:
+    """
+    Building a table layer, from adding the data to the viewer to the table
+    being sent to WWT, in each kind of mode.
+    """
+
+    params = (ROWS, ['Sky', 'Earth', 'Solar System'])
+    param_names = ['rows', 'mode']
+    number = 1
+    repeat = (1, 5, 30)
+    timeout = 600
+
+    def setup(self, rows, mode):
+        self.data = make_table(rows)
+        self.viewer = make_viewer(self.data)
+        self.viewer.state.mode = mode
+
+    def teardown(self, rows, mode):
+        remove_all(self.viewer)
+
+    def time_build(self, rows, mode):
+        self.viewer.add_data(self.data)
+
+    def peakmem_build(self, rows, mode):
+        self.viewer.add_data(self.data)
+
+
+class TableLayerFrame:
+    """
+    Building a table layer whose coordinates have to be transformed to ICRS.
+    """
+
+    params = (ROWS, ['ICRS', 'Galactic', 'FK4'])
+    param_names = ['rows', 'frame']
+    number = 1
+    repeat = (1, 5, 30)
+    timeout = 600
+
+    def setup(self, rows, frame):
+        self.data = make_table(rows)
+        self.viewer = make_viewer(self.data)
+        self.viewer.state.frame = frame
+
+    def teardown(self, rows, frame):
+        remove_all(self.viewer)
+
+    def time_build(self, rows, frame):
+        self.viewer.add_data(self.data)
+
+    def peakmem_build(self, rows, frame):
+        self.viewer.add_data(self.data)
+
+
+class TableLayerTimeSeries:
+    """
+    Turning a table layer into a time series, which adds a time column.
+    """
+
+    params = (ROWS,)
+    param_names = ['rows']
+    number = 1
+    repeat = (1, 5, 30)
+    timeout = 600
+
+    def setup(self, rows):
+        self.data = make_table(rows, time=True)
+        self.viewer = make_viewer(self.data)
+        self.viewer.add_data(self.data)
+        self.layer_state = self.viewer.layers[0].state
+        self.layer_state.time_att = self.data.id['time']
+
+    def teardown(self, rows):
+        remove_all(self.viewer)
+
+    def time_enable(self, rows):
+        self.layer_state.time_series = True
+
+    def peakmem_enable(self, rows):
+        self.layer_state.time_series = True
+
+
+class TableLayerSubsets:
+    """
+    Building a table layer along with the layers of its subsets.
+    """
+
+    params = (ROWS, [0, 1, 5])
+    param_names = ['rows', 'subsets']
+    number = 1
+    repeat = (1, 5, 30)
+    timeout = 600
+
+    def setup(self, rows, subsets):
+        self.data = make_table(rows)
+        for index in range(subsets):
+            self.data.new_subset(self.data.id['mag'] > 13 + index, label='subset {0}'.format(index))
+        self.viewer = make_viewer(self.data)
+
+    def teardown(self, rows, subsets):
+        remove_all(self.viewer)
+
+    def time_build(self, rows, subsets):
+        self.viewer.add_data(self.data)
+
+    def peakmem_build(self, rows, subsets):
+        self.viewer.add_data(self.data)
+
+
+class TableLayerUpdate:
+    """
+    Updating a table layer after a style change, a change of the data, or a
+    change of mode and back.
+    """
+
+    params = ([10 ** 4, 10 ** 6],)
+    param_names = ['rows']
+    number = 1
+    repeat = (1, 5, 30)
+    timeout = 600
+
+    def setup(self, rows):
+        self.data = make_table(rows)
+        self.viewer = make_viewer(self.data)
+        self.viewer.add_data(self.data)
+        self.layer_state = self.viewer.layers[0].state
+
+    def teardown(self, rows):
+        remove_all(self.viewer)
+
+    def time_style(self, rows):
+        self.layer_state.alpha = 0.3
+        self.layer_state.color = '#ff0000'
+
+    def time_modify_rows(self, rows):
+        lon = self.data['lon'].copy()
+        lon[:10] += 1
+        self.data.update_components({self.data.id['lon']: lon})
+
+    def time_mode_round_trip(self, rows):
+        self.viewer.state.mode = 'Earth'
+        self.viewer.state.mode = 'Sky'
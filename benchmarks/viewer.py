@@ -0,0 +1,30 @@
+from __future__ import absolute_import, division, print_function
+
+from .common import make_viewer
+
+
+class UpdateSettings:
+    """
+    Pushing the viewer settings to WWT.
+    """
+
+    def setup(self):
+        self.viewer = make_viewer()
+
+    def time_update_all(self):
+        self.viewer._update_wwt(force=True)
+
+    def time_toggle_grid(self):
+        self.viewer.state.equatorial_grid = not self.viewer.state.equatorial_grid
+
+    def time_transaction(self):
+        with self.viewer.settings_transaction():
+            for setting in ('equatorial_grid', 'ecliptic_grid', 'galactic_grid', 'alt_az_grid'):
+                setattr(self.viewer.state, setting, not getattr(self.viewer.state, setting))
+
+    def track_messages_update_all(self):
+        start = len(self.viewer._wwt.messages)
+        self.viewer._update_wwt(force=True)
+        return len(self.viewer._wwt.messages) - start
+
+    track_messages_update_all.unit = 'messages'
@@ -1,13 +1,16 @@
 from __future__ import absolute_import, division, print_function
 
-# The following needs to be imported before the application is constructed
-try:
-    from qtpy.QtWebEngineWidgets import QWebEnginePage  # noqa
-except ImportError:
-    pass
-
+import sys
 import importlib.metadata
 
+# The following needs to be imported before the Qt application is constructed.
+# Importing Qt WebEngine is slow, so we only do this if Qt is already in use.
+if 'qtpy' in sys.modules:
+    try:
+        from qtpy.QtWebEngineWidgets import QWebEnginePage  # noqa
+    except ImportError:
+        pass
+
 __version__ = importlib.metadata.version('glue-core')
 
 # Ensure we can read old session files
@@ -0,0 +1,102 @@
+"""
+Linking the cameras of several WWT viewers, so that moving the view in one of
+them moves it in the others.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from functools import partial
+
+from .throttle import Throttle
+
+__all__ = ['CameraLink']
+
+
+def _same_camera(first, second, tolerance):
+    for name in ('ra', 'dec', 'fov', 'roll'):
+        difference = abs(first.get(name, 0) - second.get(name, 0))
+        if name in ('ra', 'roll'):
+            difference = min(difference % 360, -difference % 360)
+        if difference > tolerance:
+            return False
+    return True
+
+
+class CameraLink(object):
+    """
+    Keep the views of the WWT ``viewers`` the same.
+
+    When the view of one of the viewers changes, the others are moved to it,
+    at most ``rate`` times per second: changes in between (e.g. while slewing)
+    are coalesced so that only the latest is propagated. Views that differ by
+    less than ``tolerance`` degrees are considered to be the same.
+    """
+
+    def __init__(self, viewers=(), rate=10, tolerance=1e-6):
+        self.rate = rate
+        self.tolerance = tolerance
+        self._viewers = []
+        self._throttles = {}
+        # The views that viewers were moved to, so that WWT reporting the
+        # move (possibly several times) isn't propagated back
+        self._expected = {}
+        for viewer in viewers:
+            self.add(viewer)
+
+    @property
+    def viewers(self):
+        return list(self._viewers)
+
+    def add(self, viewer):
+        """
+        Link the camera of ``viewer``, which is moved to the view of the
+        viewers already linked.
+        """
+        if viewer in self._viewers:
+            return
+        if self._viewers:
+            self._move(viewer, self._viewers[0].camera_state())
+        self._viewers.append(viewer)
+        self._throttles[id(viewer)] = Throttle(partial(self._propagate, viewer),
+                                               1. / self.rate, viewer._call_later)
+        viewer.add_camera_callback(self._on_camera_changed)
+
+    def remove(self, viewer):
+        """
+        Unlink the camera of ``viewer``.
+        """
+        if viewer not in self._viewers:
+            return
+        viewer.remove_camera_callback(self._on_camera_changed)
+        self._viewers.remove(viewer)
+        self._throttles.pop(id(viewer)).cancel()
+        self._expected.pop(id(viewer), None)
+
+    def disconnect(self):
+        """
+        Unlink all the viewers.
+        """
+        for viewer in self.viewers:
+            self.remove(viewer)
+
+    def _on_camera_changed(self, viewer):
+        expected = self._expected.get(id(viewer))
+        if expected is not None:
+            if _same_camera(viewer.camera_state(), expected, self.tolerance):
+                return
+            del self._expected[id(viewer)]
+        self._throttles[id(viewer)]()
+
+    def _propagate(self, source):
+        if source not in self._viewers:
+            return
+        camera = source.camera_state()
+        for viewer in self._viewers:
+            if viewer is not source:
+                self._move(viewer, camera)
+
+    def _move(self, viewer, camera):
+        if _same_camera(viewer.camera_state(), camera, self.tolerance):
+            return
+        self._expected[id(viewer)] = camera
+        viewer.set_camera_state(camera, instant=True)
@@ -0,0 +1,70 @@
+"""
+A local model of the WWT clock.
+
+WWT's clock advances at a constant rate (relative to real time) while it is
+playing, so we can extrapolate its current time locally from the last time
+we synchronized with it, instead of asking the widget for it.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+from numpy import datetime64, timedelta64
+
+__all__ = ['WWTClock']
+
+
+class WWTClock(object):
+    """
+    Extrapolates the WWT time from an anchor ``(wall time, simulation time)``.
+
+    Parameters
+    ----------
+    current_time : `numpy.datetime64`
+        The simulation time at the moment the clock is created.
+    rate : float, optional
+        The number of simulation seconds per real second.
+    playing : bool, optional
+        Whether the clock is advancing.
+    wall_clock : callable, optional
+        A function returning the current wall time in seconds. This is
+        mostly useful for testing.
+    """
+
+    def __init__(self, current_time, rate=1, playing=False, wall_clock=time.monotonic):
+        self._wall_clock = wall_clock
+        self.rate = rate
+        self.playing = playing
+        self.sync(current_time)
+
+    def now(self):
+        """
+        Return the extrapolated simulation time.
+        """
+        if not self.playing:
+            return self._anchor_time
+        elapsed = (self._wall_clock() - self._anchor_wall) * self.rate
+        return self._anchor_time + timedelta64(int(round(elapsed * 1e6)), 'us')
+
+    def sync(self, current_time):
+        """
+        Anchor the clock to ``current_time`` at the present wall time.
+        """
+        self._anchor_wall = self._wall_clock()
+        self._anchor_time = datetime64(current_time, 'us')
+
+    def since_sync(self):
+        """
+        The number of wall seconds since the clock was last anchored.
+        """
+        return self._wall_clock() - self._anchor_wall
+
+    def play(self, rate):
+        self.sync(self.now())
+        self.rate = rate
+        self.playing = True
+
+    def pause(self):
+        self.sync(self.now())
+        self.playing = False
@@ -0,0 +1,207 @@
+"""
+A reference-counted store of the prepared columns of WWT table layers.
+
+The same dataset shown in several WWT viewers (or several times in the same
+viewer) needs the same columns to be prepared, e.g. coordinates transformed
+to ICRS. Layer artists acquire their columns from this store, so that each
+prepared column is only computed and held in memory once, and release them
+when they no longer need them.
+
+Inputs are identified by the layer and attribute they come from, along with
+version numbers that are bumped when glue reports that the data or subset
+changed, so that preparing a table doesn't require hashing its contents.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+from weakref import WeakSet
+
+import numpy as np
+
+from glue.core.component_id import ComponentID
+from glue.core.hub import HubListener
+from glue.core.message import (ComponentsChangedMessage, ExternallyDerivableComponentsChangedMessage,
+                               NumericalDataChangedMessage, SubsetUpdateMessage)
+from glue.core.subset import Subset
+
+from .reprojection_cache import _hash_array
+
+__all__ = ['ColumnStore', 'array_key', 'chunk_keys', 'COLUMN_STORE']
+
+# The number of rows hashed together by chunk_keys
+CHUNK_SIZE = 65536
+
+# The priority of the store's hub subscriptions, which is higher than that of
+# the viewers so that inputs are invalidated before the layers are updated
+INVALIDATE_PRIORITY = 1000
+
+
+def chunk_keys(array):
+    """
+    Return a list of keys identifying the contents of consecutive chunks of
+    ``CHUNK_SIZE`` rows of ``array``, which can be compared to find the rows
+    that changed.
+    """
+    array = np.asarray(array)
+    keys = []
+    for start in range(0, len(array), CHUNK_SIZE):
+        hasher = hashlib.sha1()
+        _hash_array(hasher, array[start:start + CHUNK_SIZE])
+        keys.append(hasher.hexdigest())
+    return keys
+
+
+def array_key(array, chunks=None):
+    """
+    Return a key identifying the contents of ``array``. If the keys of its
+    chunks were already computed with `chunk_keys`, they can be passed as
+    ``chunks`` to avoid hashing the array again.
+    """
+    array = np.asarray(array)
+    if chunks is None:
+        chunks = chunk_keys(array)
+    hasher = hashlib.sha1()
+    hasher.update(str(array.dtype).encode('ascii'))
+    hasher.update(str(array.shape).encode('ascii'))
+    for key in chunks:
+        hasher.update(key.encode('ascii'))
+    return hasher.hexdigest()
+
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    return getattr(value, 'nbytes', 0)
+
+
+class ColumnStore(HubListener):
+    """
+    A store of prepared columns, keyed by a hashable description of the
+    input data and the transformation applied to it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._versions = {}
+        self._hubs = WeakSet()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def acquire(self, key, factory):
+        """
+        Return the value stored under ``key``, calling ``factory`` to compute
+        it if it isn't in the store yet, and add a reference to it. Each call
+        to `acquire` should be matched by a call to `release`.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [factory(), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def get(self, key):
+        """
+        Return the value stored under ``key`` without adding a reference to
+        it, or `None` if there is no such value.
+        """
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def release(self, key):
+        """
+        Remove a reference to the value stored under ``key``, and remove the
+        value from the store if this was the last reference.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            self._entries.pop(key)
+
+    def refcount(self, key):
+        entry = self._entries.get(key)
+        return 0 if entry is None else entry[1]
+
+    @property
+    def nbytes(self):
+        """
+        The total memory used by the values in the store, in bytes.
+        """
+        return sum(_nbytes(entry[0]) for entry in self._entries.values())
+
+    def report(self):
+        """
+        Return a list of ``(key, nbytes, refcount)`` tuples for all the values
+        in the store, largest first.
+        """
+        report = [(key, _nbytes(value), refcount) for key, (value, refcount) in self._entries.items()]
+        return sorted(report, key=lambda item: item[1], reverse=True)
+
+    def input_key(self, layer, att, array):
+        """
+        Return a key identifying the values of ``att`` in ``layer`` (a dataset
+        or subset), which are given as ``array``. The key changes when glue
+        reports that these values may have changed. For datasets that are not
+        in a data collection, no changes are reported, so the key is computed
+        from the contents of ``array`` instead.
+        """
+        data = layer.data
+        if data.hub is None:
+            return ('content', array_key(array))
+        self.register_to_hub(data.hub)
+        key = (layer.uuid, att.uuid, self._versions.get(data.uuid, 0))
+        if any(att is cid for cid in data.main_components):
+            key += (self._versions.get((data.uuid, att.uuid), 0),)
+        else:
+            # Derived and linked values may depend on any dataset
+            key += (self._versions.get('any', 0),)
+        if isinstance(layer, Subset):
+            # The subset may depend on any attribute of any dataset
+            key += (self._versions.get(layer.uuid, 0), self._versions.get('any', 0))
+        return key
+
+    def invalidate(self, *names):
+        """
+        Change the input keys depending on each of ``names``, which can be the
+        uuid of a dataset or subset, a ``(data uuid, component uuid)`` tuple,
+        or ``'any'`` for values that may depend on any dataset.
+        """
+        for name in names:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def register_to_hub(self, hub):
+        if hub in self._hubs:
+            return
+        self._hubs.add(hub)
+        hub.subscribe(self, NumericalDataChangedMessage, handler=self._numerical_data_changed,
+                      priority=INVALIDATE_PRIORITY)
+        hub.subscribe(self, ComponentsChangedMessage, handler=self._components_changed,
+                      priority=INVALIDATE_PRIORITY)
+        hub.subscribe(self, ExternallyDerivableComponentsChangedMessage, handler=self._components_changed,
+                      priority=INVALIDATE_PRIORITY)
+        hub.subscribe(self, SubsetUpdateMessage, handler=self._subset_changed,
+                      filter=lambda message: message.attribute == 'subset_state',
+                      priority=INVALIDATE_PRIORITY)
+
+    def _numerical_data_changed(self, message):
+        data = message.data
+        components = getattr(message, 'components_changed', None) or ()
+        if components and all(isinstance(cid, ComponentID) for cid in components):
+            self.invalidate('any', *[(data.uuid, cid.uuid) for cid in components])
+        else:
+            self.invalidate('any', data.uuid)
+
+    def _components_changed(self, message):
+        self.invalidate('any', message.data.uuid)
+
+    def _subset_changed(self, message):
+        self.invalidate(message.subset.uuid)
+
+
+COLUMN_STORE = ColumnStore()
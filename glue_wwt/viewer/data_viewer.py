@@ -2,18 +2,26 @@
 
 from __future__ import absolute_import, division, print_function
 
+from contextlib import contextmanager
+
 from astropy.coordinates import SkyCoord
 from astropy.time import Time
 import astropy.units as u
+from glue.config import settings
+from glue.core import Subset
+from glue.core.subset import ElementSubsetState
 from glue.core.coordinates import WCSCoordinates
 from glue.logger import logger
-from pywwt import ViewerNotAvailableError
-from pywwt.layers import guess_lon_lat_columns
 from numpy import datetime64
 
-from .image_layer import WWTImageLayerArtist
+from .clock import WWTClock
+from .imagery import IMAGERY_CATALOG
+from .metrics import WWTMetrics
+from .image_layer import WWTImageLayerArtist, WWTImageSubsetLayerArtist
+from .regions import SkyConeSubsetState, SkyPolygonSubsetState, view_footprint
 from .table_layer import WWTTableLayerArtist
-from .viewer_state import WWTDataViewerState
+from .session_payloads import SESSION_PAYLOADS
+from .viewer_state import MODES_3D, WWTDataViewerState
 
 # We import the following to register the refresh tool
 from . import tools as wwt_tools  # noqa
@@ -24,9 +32,38 @@ __all__ = ['WWTDataViewerBase']
 class WWTDataViewerBase(object):
     LABEL = 'Earth/Planet/Sky Viewer (WWT)'
     _wwt = None
+    _current_time_timer = None
+
+    # Settings changed in a transaction are only pushed to WWT when the
+    # outermost transaction ends, as a single batch
+    _settings_transaction_depth = 0
+    _settings_flush_count = 0
+    _settings_message_count = 0
+
+    # How often (in seconds) the displayed time is updated while WWT's clock
+    # is playing, and how often we resynchronize our local model of the clock
+    # with WWT itself.
+    _TIME_UPDATE_INTERVAL = 1
+    _TIME_RESYNC_INTERVAL = 60
+
+    # The largest separation (in degrees) between a source clicked in WWT,
+    # as reported by WWT, and the row of a table layer it is matched to
+    _PICK_TOLERANCE = 1e-3
+
+    # Whether the messages sent to WWT and the duration of calls to WWT are
+    # recorded in the viewer's metrics, and how often (in seconds) they are
+    # refreshed when shown
+    _COLLECT_METRICS = True
+    _METRICS_UPDATE_INTERVAL = 1
 
     _state_cls = WWTDataViewerState
 
+    # The catalogue of imagery layers, which is shared between all viewers,
+    # and how often, in seconds, to check whether it has been downloaded
+    # again while it is refreshed
+    _imagery_catalog = IMAGERY_CATALOG
+    _CATALOG_POLL_INTERVAL = 0.2
+
     _GLUE_TO_WWT_ATTR_MAP = {
         "galactic": "galactic_mode",
         "equatorial_grid": "grid",
@@ -53,15 +90,38 @@ class WWTDataViewerBase(object):
     _IMAGERY_UPDATE_SETTINGS = ["foreground", "background", "foreground_opacity", "galactic"]
 
     def __init__(self):
-        self._initialize_wwt()
+        self._pending_settings = {}
+        # Viewers restored from a session only create their layers in WWT
+        # once they are first shown
+        self._layers_deferred = self.state._restored
+        self.state._restored = False
+        self._metrics_shown = False
+
+        # The imagery catalogue is shared between all viewers, so that it
+        # is only downloaded by the first one.
+        with self._imagery_catalog.patch_pywwt():
+            self._initialize_wwt()
+        self.metrics = WWTMetrics(enabled=self._COLLECT_METRICS)
+        self._instrument_wwt()
         self._wwt.actual_planet_scale = True
-        self.state.imagery_layers = list(self._wwt.available_layers)
+        self.state.imagery_layers = self._imagery_catalog.names()
+        self._imagery_catalog.add_listener(self._update_imagery_layers)
+        self._wait_for_imagery_catalog()
 
         # The more obvious thing to do would be to listen to the WWT widget's "wwt_view_state" message,
         # which contains information about WWT's internal time. But we only get those messages when something
-        # changes with the WWT view, so we can't rely on that here.
-        # This just kicks off the first timer; the method repeatedly time-calls itself
-        self._setup_time_timer()
+        # changes with the WWT view, so we can't rely on that here. Instead, we extrapolate WWT's time locally
+        # and only run a timer (started in _update_wwt) to refresh the displayed time while the clock is playing.
+        self._clock = WWTClock(self.state.current_time, rate=self.state.clock_rate, playing=self.state.play_time)
+        self._last_clock_time = None
+
+        # The (layer artist, row) of the source last clicked in WWT
+        self.picked = None
+        self._wwt.set_selection_change_callback(self._on_wwt_selection)
+
+        # Functions called when WWT reports that its view changed
+        self._camera_callbacks = []
+        self._wwt._set_message_type_callback('wwt_view_state', self._on_wwt_view_state)
 
         self.state.add_global_callback(self._update_wwt)
 
@@ -70,7 +130,39 @@ class WWTDataViewerBase(object):
     def _initialize_wwt(self):
         raise NotImplementedError('subclasses should set _wwt here')
 
+    def _instrument_wwt(self):
+        """
+        Record the messages sent by the WWT client in the viewer's metrics,
+        and time their delivery.
+        """
+
+        send_msg = self._wwt._send_msg
+        actually_send_msg = self._wwt._actually_send_msg
+
+        def _send_msg(**kwargs):
+            self.metrics.add_message(kwargs)
+            return send_msg(**kwargs)
+
+        def _actually_send_msg(payload):
+            with self.metrics.timed('send'):
+                return actually_send_msg(payload)
+
+        self._wwt._send_msg = _send_msg
+        self._wwt._actually_send_msg = _actually_send_msg
+
+    def _query_wwt(self, name):
+        """
+        Call the WWT client's ``name`` method, which waits for WWT, and
+        record how long it took.
+        """
+        with self.metrics.timed(name):
+            return getattr(self._wwt, name)()
+
     def _update_wwt(self, force=False, **kwargs):
+        with self.settings_transaction():
+            self._update_wwt_in_transaction(force=force, **kwargs)
+
+    def _update_wwt_in_transaction(self, force=False, **kwargs):
         if force or 'mode' in kwargs:
             self._wwt.set_view(self.state.mode)
             # Only show SDSS data when in Universe mode
@@ -80,17 +172,27 @@ class WWTDataViewerBase(object):
             force = True
 
         if force or 'constellation_boundaries' in kwargs:
-            self._wwt.constellation_boundaries = self.state.constellation_boundaries != 'None'
-            self._wwt.constellation_selection = self.state.constellation_boundaries == 'Selection only'
+            self._set_wwt_setting('constellation_boundaries', self.state.constellation_boundaries != 'None')
+            self._set_wwt_setting('constellation_selection',
+                                  self.state.constellation_boundaries == 'Selection only')
 
         try:
-            if force or 'current_time' in kwargs:
+            # Times that come from our own clock model are already what WWT
+            # shows, so there is no need to send them back.
+            if (force or 'current_time' in kwargs) and self.state.current_time != self._last_clock_time:
+                self._clock.sync(self.state.current_time)
                 self._wwt.set_current_time(Time(self.state.current_time))
 
             if force or any(setting in kwargs for setting in self._CLOCK_SETTINGS):
                 if self.state.play_time:
+                    self._clock.play(self.state.clock_rate)
                     self._wwt.play_time(self.state.clock_rate)
+                    self._setup_time_timer()
                 else:
+                    self._cleanup_time_timer()
+                    if self._clock.playing:
+                        self._update_time()
+                    self._clock.pause()
                     self._wwt.pause_time()
         except RuntimeError:
             pass
@@ -107,11 +209,74 @@ class WWTDataViewerBase(object):
 
     def _update_wwt_setting_from_state(self, setting):
         wwt_attr = self._GLUE_TO_WWT_ATTR_MAP.get(setting, setting)
-        setattr(self._wwt, wwt_attr, getattr(self.state, setting, None))
+        self._set_wwt_setting(wwt_attr, getattr(self.state, setting, None))
+
+    def _set_wwt_setting(self, wwt_attr, value):
+        if self._settings_transaction_depth > 0:
+            # Only the last value set for each setting is sent
+            self._pending_settings.pop(wwt_attr, None)
+            self._pending_settings[wwt_attr] = value
+        else:
+            setattr(self._wwt, wwt_attr, value)
+
+    @contextmanager
+    def settings_transaction(self):
+        """
+        Collect the WWT settings changed in this context, and push them to
+        WWT as a single batch when the outermost transaction ends.
+        """
+        self._settings_transaction_depth += 1
+        try:
+            yield
+        finally:
+            self._settings_transaction_depth -= 1
+            if self._settings_transaction_depth == 0:
+                self._flush_settings()
+
+    def _flush_settings(self):
+        pending, self._pending_settings = self._pending_settings, {}
+        if not pending:
+            return
+
+        self._settings_flush_count += 1
+
+        # Each setting that actually changes results in a message to WWT.
+        # We capture these and deliver them together.
+        messages = []
+        actually_send_msg = self._wwt._actually_send_msg
+        self._wwt._actually_send_msg = messages.append
+        try:
+            for wwt_attr, value in pending.items():
+                setattr(self._wwt, wwt_attr, value)
+        finally:
+            self._wwt._actually_send_msg = actually_send_msg
+
+        if messages:
+            self._settings_message_count += len(messages)
+            self._send_message_batch(messages)
+
+    def _send_message_batch(self, messages):
+        """
+        Send several messages to WWT. Subclasses can override this if their
+        transport can deliver several messages at once.
+        """
+        for message in messages:
+            self._wwt._actually_send_msg(message)
 
     def get_layer_artist(self, cls, **kwargs):
         "In this package, we must override to append the wwt_client argument."
-        return cls(self.state, wwt_client=self._wwt, **kwargs)
+        return cls(self.state, wwt_client=self._wwt, deferred=self._layers_deferred, **kwargs)
+
+    def _materialize_layers(self):
+        """
+        Create in WWT any layers that were deferred until the viewer is shown.
+        """
+        if not self._layers_deferred:
+            return
+        self._layers_deferred = False
+        with self.settings_transaction():
+            for layer_artist in self._layer_artist_container:
+                layer_artist.materialize()
 
     def get_data_layer_artist(self, layer=None, layer_state=None):
         if len(layer.pixel_component_ids) == 2:
@@ -123,46 +288,130 @@ class WWTDataViewerBase(object):
         else:
             raise ValueError('WWT does not know how to render the data of {}'.format(layer.label))
 
-        return cls(self.state, wwt_client=self._wwt, layer=layer, layer_state=layer_state)
+        return self.get_layer_artist(cls, layer=layer, layer_state=layer_state)
 
     def get_subset_layer_artist(self, layer=None, layer_state=None):
-        # At some point maybe we'll use different classes for this?
+        # Image subsets are shown as a mask overlay rather than as a second
+        # copy of the image data.
+        if len(layer.data.pixel_component_ids) == 2:
+            if not isinstance(layer.data.coords, WCSCoordinates):
+                raise ValueError('WWT cannot render image layer {}: it must have WCS coordinates'.format(layer.label))
+            return self.get_layer_artist(WWTImageSubsetLayerArtist, layer=layer, layer_state=layer_state)
         return self.get_data_layer_artist(layer=layer, layer_state=layer_state)
 
+    def camera_state(self):
+        """
+        Return the current view of WWT as a dictionary with the ``ra``,
+        ``dec`` and ``fov`` (and ``roll``, if the client supports it), in
+        degrees.
+        """
+        center = self._query_wwt('get_center')
+        camera = {
+            "ra": center.ra.deg,
+            "dec": center.dec.deg,
+            "fov": self._query_wwt('get_fov').value
+        }
+        if hasattr(self._wwt, 'get_roll'):
+            camera["roll"] = self._query_wwt('get_roll').value
+        return camera
+
+    def set_camera_state(self, camera, instant=True):
+        """
+        Move the view of WWT to ``camera``, a dictionary as returned by
+        `camera_state` (missing values default to a 60 degree view of
+        ``(0, 0)``).
+        """
+        ra = camera.get("ra", 0)
+        dec = camera.get("dec", 0)
+        fov = camera.get("fov", 60)
+        roll = camera.get("roll", None)
+        camera_kwargs = dict(fov=fov * u.deg, instant=instant)
+        if hasattr(self._wwt, 'get_roll') and roll is not None:
+            camera_kwargs["roll"] = roll * u.deg
+        self._wwt.center_on_coordinates(SkyCoord(ra, dec, unit=u.deg), **camera_kwargs)
+
+    def add_camera_callback(self, callback):
+        """
+        Call ``callback(viewer)`` each time WWT reports that the view of this
+        viewer changed.
+        """
+        if callback not in self._camera_callbacks:
+            self._camera_callbacks.append(callback)
+
+    def remove_camera_callback(self, callback):
+        if callback in self._camera_callbacks:
+            self._camera_callbacks.remove(callback)
+
+    def _on_wwt_view_state(self, wwt, updated):
+        for callback in list(self._camera_callbacks):
+            callback(self)
+
+    def _wait_for_imagery_catalog(self):
+        """
+        Wait for the imagery catalogue to be downloaded if it is being
+        refreshed, then update all the viewers that use it.
+        """
+        if self._imagery_catalog.refreshing:
+            self._call_later(self._CATALOG_POLL_INTERVAL, self._wait_for_imagery_catalog)
+        else:
+            self._imagery_catalog.notify()
+
+    def _update_imagery_layers(self):
+        # pywwt checks the foreground and background against the catalogue it
+        # was created with, so the new layers are added to it
+        self._wwt._available_layers.update(self._imagery_catalog.layers())
+        self.state.imagery_layers = self._imagery_catalog.names()
+
+    def _call_later(self, delay, callback):
+        """
+        Call ``callback`` after ``delay`` seconds, on the same thread as the
+        rest of the user interface.
+        """
+        raise NotImplementedError()
+
     def __gluestate__(self, context):
+        from pywwt import ViewerNotAvailableError
         state = super(WWTDataViewerBase, self).__gluestate__(context)
         try:
-            center = self._wwt.get_center()
-            camera = {
-                "ra": center.ra.deg,
-                "dec": center.dec.deg,
-                "fov": self._wwt.get_fov().value
-            }
-            if hasattr(self._wwt, 'get_roll'):
-                camera["roll"] = self._wwt.get_roll().value
-            state["camera"] = camera
+            state["camera"] = self.camera_state()
         except ViewerNotAvailableError:
             logger.error("Unable to export camera parameters as WWT viewer is not responding.")
+
+        # Glue saves sessions with the session directory as the current
+        # directory, so the payload paths are relative to the session file.
+        if settings.WWT_SESSION_PAYLOADS:
+            payloads = {}
+            for layer_artist in self._layer_artist_container:
+                session_payload = getattr(layer_artist, 'session_payload', None)
+                payload = None if session_payload is None else session_payload()
+                if payload is not None:
+                    path = SESSION_PAYLOADS.save(*payload)
+                    if path is not None:
+                        payloads[payload[0]] = path
+            if payloads:
+                state["payloads"] = payloads
+
         return state
 
     @classmethod
     def __setgluestate__(cls, rec, context):
+        # Glue restores sessions with the session directory as the current
+        # directory, so this makes the payloads saved with it available.
+        for fingerprint, path in rec.get("payloads", {}).items():
+            SESSION_PAYLOADS.register(fingerprint, path)
+
+        # Restored layers are only uploaded to WWT once the viewer is shown
+        # (see WWTDataViewerState.__setgluestate__), so that viewers that are
+        # hidden don't slow down loading the session
         viewer = super(WWTDataViewerBase, cls).__setgluestate__(rec, context)
         if "camera" in rec:
-            camera = rec["camera"]
-            ra = camera.get("ra", 0)
-            dec = camera.get("dec", 0)
-            fov = camera.get("fov", 60)
-            roll = camera.get("roll", None)
-            camera_kwargs = dict(fov=fov * u.deg, instant=True)
-            if hasattr(viewer._wwt, 'get_roll') and roll is not None:
-                camera_kwargs["roll"] = roll * u.deg
-            viewer._wwt.center_on_coordinates(SkyCoord(ra, dec, unit=u.deg), **camera_kwargs)
+            viewer.set_camera_state(rec["camera"])
         return viewer
 
     def add_data(self, data):
         add = super().add_data(data)
         if add and len(self.state.layers) == 1:
+            from pywwt.layers import guess_lon_lat_columns
             colnames = [c.label for c in data.components]
             lon, lat = guess_lon_lat_columns(colnames)
             if lon is not None and lat is not None:
@@ -170,8 +419,184 @@ class WWTDataViewerBase(object):
                 self.state.lat_att = data.id[lat]
         return add
 
-    def _update_time(self):
+    def _view_aspect_ratio(self):
+        """
+        The ratio of the width to the height of the WWT view.
+        """
+        return 1
+
+    def sky_region_subset_state(self, shape='cone'):
+        """
+        Return a subset state selecting the region of the sky currently shown:
+        the largest circle that fits in the view if ``shape`` is ``'cone'``, or
+        the whole view if ``shape`` is ``'polygon'``.
+        """
+
+        if self.state.mode != 'Sky':
+            raise ValueError('Regions can only be selected in Sky mode')
+        if self.state.lon_att is None or self.state.lat_att is None:
+            raise ValueError('Regions can only be selected once the longitude and latitude are set')
+
+        center = self._query_wwt('get_center').icrs
+        fov = self._query_wwt('get_fov').to_value(u.deg)
+        kwargs = dict(lon_att=self.state.lon_att, lat_att=self.state.lat_att, frame=self.state.frame)
+
+        if shape == 'cone':
+            return SkyConeSubsetState(lon=center.ra.deg, lat=center.dec.deg, radius=fov / 2, **kwargs)
+        elif shape == 'polygon':
+            roll = self._query_wwt('get_roll').to_value(u.deg) if hasattr(self._wwt, 'get_roll') else 0
+            lon, lat = view_footprint(center.ra.deg, center.dec.deg, fov,
+                                      aspect_ratio=self._view_aspect_ratio(), roll=roll)
+            return SkyPolygonSubsetState(lon=lon, lat=lat, **kwargs)
+        else:
+            raise ValueError("shape should be 'cone' or 'polygon'")
+
+    def select_sky_region(self, shape='cone'):
+        """
+        Create or update a subset with the region of the sky currently shown
+        (see `sky_region_subset_state`).
+        """
+
+        subset_state = self.sky_region_subset_state(shape)
+
+        # The subset state uses the spatial indices of the data layers shown,
+        # which are built here if needed, rather than scanning all the rows.
+        for layer_artist in self._layer_artist_container:
+            if isinstance(layer_artist, WWTTableLayerArtist) and not isinstance(layer_artist.layer, Subset):
+                layer_artist.spatial_index
+
+        self.apply_subset_state(subset_state)
+
+    def pick(self, lon, lat, max_radius=None):
+        """
+        Return a ``(layer_artist, row)`` tuple for the row closest to
+        ``(lon, lat)`` (in ICRS, in degrees) among the table layers shown,
+        where ``row`` is a row of the dataset of the layer, or `None` if there
+        are no rows within ``max_radius`` degrees (if given).
+        """
+
+        if self.state.mode != 'Sky' and self.state.mode not in MODES_3D:
+            return None
+
+        best = None
+        for layer_artist in self._layer_artist_container:
+            if not isinstance(layer_artist, WWTTableLayerArtist) or not layer_artist.visible:
+                continue
+            result = layer_artist.pick(lon, lat, max_radius=max_radius)
+            if result is not None and (best is None or result[1] < best[2]):
+                best = layer_artist, result[0], result[1]
+
+        if best is None:
+            return None
+
+        layer_artist, row = best[:2]
+        if isinstance(layer_artist.layer, Subset):
+            row = layer_artist.layer.to_index_list()[row]
+        return layer_artist, int(row)
+
+    def _on_wwt_selection(self, wwt, updated):
+        if 'most_recent_source' not in updated:
+            return
+        source = wwt.most_recent_source
         try:
-            self.state.current_time = datetime64(self._wwt.get_current_time().to_string())
-        except ViewerNotAvailableError:
-            pass
+            lon, lat = float(source['ra']), float(source['dec'])
+        except (KeyError, TypeError, ValueError):
+            return
+        self.picked = self.pick(lon, lat, max_radius=self._PICK_TOLERANCE)
+        self._show_picked()
+
+    def _show_picked(self):
+        """
+        Show the row last picked in WWT. Subclasses can override this.
+        """
+        pass
+
+    def _describe_picked(self, max_components=5):
+        """
+        Return a short description of the row last picked in WWT.
+        """
+        if self.picked is None:
+            return None
+        layer_artist, row = self.picked
+        data = layer_artist.layer.data
+        values = ', '.join('{0}={1}'.format(cid.label, data[cid, row])
+                           for cid in data.main_components[:max_components])
+        return '{0} row {1}: {2}'.format(data.label, row, values)
+
+    def traffic_by_layer(self):
+        """
+        Return a dictionary giving the number of messages and bytes sent to
+        WWT for each layer shown in the viewer, by layer label. The traffic
+        that isn't about these layers (such as settings, or layers since
+        removed) is given for the `None` key.
+        """
+
+        labels = {}
+        for layer_artist in self._layer_artist_container:
+            wwt_layers = [layer_artist.wwt_layer, getattr(layer_artist, '_tail_layer', None)]
+            wwt_layers.extend(parked[0] for parked in getattr(layer_artist, '_parked', {}).values())
+            for wwt_layer in wwt_layers:
+                if wwt_layer is not None:
+                    labels[wwt_layer.id] = layer_artist.layer.label
+
+        traffic = {}
+        for layer_id, count in self.metrics.messages.items():
+            label = labels.get(layer_id)
+            messages, nbytes = traffic.get(label, (0, 0))
+            traffic[label] = messages + count, nbytes + self.metrics.bytes[layer_id]
+        return traffic
+
+    def metrics_report(self):
+        """
+        Return a multi-line report of the viewer's metrics.
+        """
+        lines = [self.metrics.summary()]
+        for label, (messages, nbytes) in sorted(self.traffic_by_layer().items(),
+                                                key=lambda item: -item[1][1]):
+            lines.append('{0}: {1} messages, {2} bytes'.format('Viewer' if label is None else label,
+                                                               messages, nbytes))
+        return '\n'.join(lines)
+
+    def show_metrics(self, show=True):
+        """
+        Show (or hide) the viewer's metrics, refreshed every
+        ``_METRICS_UPDATE_INTERVAL`` seconds.
+        """
+        self._metrics_shown = show
+        self._display_metrics(show)
+
+    def _display_metrics(self, show):
+        """
+        Start or stop showing the viewer's metrics. Subclasses can override
+        this.
+        """
+        pass
+
+    def select_picked(self):
+        """
+        Create or update a subset with the row last picked in WWT.
+        """
+        if self.picked is None:
+            raise ValueError('No source has been picked in WWT')
+        layer_artist, row = self.picked
+        self.apply_subset_state(ElementSubsetState(indices=[row], data=layer_artist.layer.data))
+
+    def _setup_time_timer(self):
+        """
+        Start calling ``_update_time`` every ``_TIME_UPDATE_INTERVAL`` seconds,
+        if this is not already happening.
+        """
+        raise NotImplementedError()
+
+    def _cleanup_time_timer(self):
+        raise NotImplementedError()
+
+    def _update_time(self):
+        if self._clock.since_sync() >= self._TIME_RESYNC_INTERVAL:
+            from pywwt import ViewerNotAvailableError
+            try:
+                self._clock.sync(datetime64(self._query_wwt('get_current_time').to_string()))
+            except ViewerNotAvailableError:
+                pass
+        self._last_clock_time = self._clock.now()
+        self.state.current_time = self._last_clock_time
@@ -1,9 +1,12 @@
 from __future__ import absolute_import, division, print_function
 
+import hashlib
 import random
 import numpy as np
 
 from astropy.wcs import WCS
+from matplotlib import colormaps
+from matplotlib.colors import to_rgb
 
 from glue.logger import logger
 from glue.core.data_combo_helper import ComponentIDComboHelper
@@ -14,13 +17,26 @@ from echo import (CallbackProperty,
                   SelectionCallbackProperty,
                   keep_in_sync)
 
-from pywwt.layers import VALID_COLORMAPS, VALID_STRETCHES
+from .reprojection_cache import apply_pixel_map, nearest_pixel_map, prepare_image_for_wwt
 
 
-__all__ = ['WWTImageLayerArtist']
+__all__ = ['WWTImageLayerArtist', 'WWTImageSubsetLayerArtist']
 
 RESET_IMAGE_PROPERTIES = ()
 
+# Sequential colormaps that can be used to show a subset mask, since WWT image
+# layers can't be drawn in a single color.
+MASK_COLORMAPS = ['Reds', 'Oranges', 'Greens', 'Blues', 'Purples', 'gray', 'Greys']
+
+
+def mask_cmap_for_color(color):
+    """
+    Return the name of the colormap whose top color is closest to ``color``.
+    """
+    rgb = np.array(to_rgb(color))
+    distances = [np.sum((np.array(colormaps[name](1.)[:3]) - rgb) ** 2) for name in MASK_COLORMAPS]
+    return MASK_COLORMAPS[int(np.argmin(distances))]
+
 
 class WWTImageLayerState(LayerState):
     """A state object for WWT image layers
@@ -33,18 +49,18 @@ class WWTImageLayerState(LayerState):
     vmax = CallbackProperty()
 
     img_data_att = SelectionCallbackProperty(default_index=0)
-    stretch = SelectionCallbackProperty(
-        default_index=0,
-        choices=VALID_STRETCHES
-    )
-    cmap = SelectionCallbackProperty(
-        default_index=0,
-        choices=VALID_COLORMAPS
-    )
+    stretch = SelectionCallbackProperty(default_index=0)
+    cmap = SelectionCallbackProperty(default_index=0)
 
     def __init__(self, layer=None, **kwargs):
         super(WWTImageLayerState, self).__init__(layer=layer)
 
+        # pywwt is only imported once a layer is actually created, since
+        # importing it is slow.
+        from pywwt.layers import VALID_COLORMAPS, VALID_STRETCHES
+        WWTImageLayerState.stretch.set_choices(self, VALID_STRETCHES)
+        WWTImageLayerState.cmap.set_choices(self, VALID_COLORMAPS)
+
         self.color = self.layer.style.color
         self.alpha = self.layer.style.alpha
 
@@ -75,12 +91,13 @@ class WWTImageLayerArtist(LayerArtist):
     _layer_state_cls = WWTImageLayerState
     _removed = False
 
-    def __init__(self, viewer_state, wwt_client=None, layer_state=None, layer=None):
+    def __init__(self, viewer_state, wwt_client=None, layer_state=None, layer=None, deferred=False):
         super(WWTImageLayerArtist, self).__init__(viewer_state,
                                                   layer_state=layer_state,
                                                   layer=layer)
 
         self.wwt_layer = None
+        self._deferred = deferred
         self.layer_id = "{0:08x}".format(random.getrandbits(32))
         self.wwt_client = wwt_client
         self.zorder = self.state.zorder
@@ -99,8 +116,22 @@ class WWTImageLayerArtist(LayerArtist):
         self._removed = True
         self.clear()
 
+    def materialize(self):
+        """
+        Create the WWT layer if this was deferred until the viewer is shown.
+        """
+        if self._deferred:
+            self._deferred = False
+            self._update_presentation(force=True)
+
     def _update_presentation(self, force=False, **kwargs):
-        changed = set() if force else self.pop_changed_properties()
+        if self._deferred:
+            return
+
+        # The changed properties are also popped when forcing an update, so
+        # that the next update doesn't see them all as changed (and rebuild
+        # the WWT layer).
+        changed = self.pop_changed_properties()
 
         logger.debug("updating WWT for 2D image %s" % self.layer.label)
 
@@ -125,7 +156,10 @@ class WWTImageLayerArtist(LayerArtist):
                 self.disable_invalid_attributes(self.state.img_data_att)
                 return
 
-            self.wwt_layer = self.wwt_client.layers.add_image_layer((data, wcs))
+            # Images with non-native WCS are reprojected once and cached on
+            # disk, so that re-adding them (e.g. when toggling visibility or
+            # restoring a session) does not repeat the reprojection.
+            self.wwt_layer = self.wwt_client.layers.add_image_layer(prepare_image_for_wwt(data, wcs))
             default_lims = np.percentile(data, [5., 95.])
             self.state.vmin = default_lims[0]
             self.state.vmax = default_lims[1]
@@ -158,3 +192,169 @@ class WWTImageLayerArtist(LayerArtist):
 
     def update(self):
         self._update_presentation(force=True)
+
+
+class WWTImageSubsetLayerState(LayerState):
+    """A state object for WWT image subset layers
+
+    """
+    layer = CallbackProperty()
+    color = CallbackProperty()
+    alpha = CallbackProperty()
+
+    cmap = SelectionCallbackProperty(default_index=0)
+
+    def __init__(self, layer=None, **kwargs):
+        super(WWTImageSubsetLayerState, self).__init__(layer=layer)
+
+        from pywwt.layers import VALID_COLORMAPS
+        WWTImageSubsetLayerState.cmap.set_choices(self, VALID_COLORMAPS)
+
+        self.color = self.layer.style.color
+        self.alpha = self.layer.style.alpha
+
+        self._sync_color = keep_in_sync(self, 'color', self.layer.style, 'color')
+        self._sync_alpha = keep_in_sync(self, 'alpha', self.layer.style, 'alpha')
+
+        self.add_callback('color', self._on_color_change)
+        self._on_color_change()
+
+        self.update_from_dict(kwargs)
+
+    def _on_color_change(self, *args):
+        if self.color is not None:
+            self.cmap = mask_cmap_for_color(self.color)
+
+
+class WWTImageSubsetLayerArtist(LayerArtist):
+    """
+    A layer artist that shows an image subset as a mask overlay on the same
+    grid as the parent image, rather than as a second copy of the image.
+    """
+
+    _layer_state_cls = WWTImageSubsetLayerState
+    _removed = False
+
+    def __init__(self, viewer_state, wwt_client=None, layer_state=None, layer=None, deferred=False):
+        super(WWTImageSubsetLayerArtist, self).__init__(viewer_state,
+                                                        layer_state=layer_state,
+                                                        layer=layer)
+
+        self.wwt_layer = None
+        self._mask_hash = None
+        self._deferred = deferred
+        self.layer_id = "{0:08x}".format(random.getrandbits(32))
+        self.wwt_client = wwt_client
+        self.zorder = self.state.zorder
+        self.visible = self.state.visible
+
+        self.state.add_global_callback(self._update_presentation)
+        self._viewer_state.add_global_callback(self._update_presentation)
+        self._update_presentation(force=True)
+
+    def clear(self):
+        if self.wwt_layer is not None:
+            self.wwt_layer.remove()
+            self.wwt_layer = None
+            self._mask_hash = None
+
+    def remove(self):
+        self._removed = True
+        self.clear()
+
+    def materialize(self):
+        """
+        Create the WWT layer if this was deferred until the viewer is shown.
+        """
+        if self._deferred:
+            self._deferred = False
+            self._update_presentation(force=True)
+
+    def _update_mask(self):
+        """
+        Upload the subset mask if it changed since it was last sent. Returns
+        `True` if a new WWT layer was created.
+        """
+
+        try:
+            mask = self.layer.to_mask()
+        except IncompatibleAttribute:
+            self.clear()
+            self.disable_incompatible_subset()
+            return False
+
+        # The mask is compared in its packed 1-bit form, so that unchanged
+        # subsets (e.g. a style change) never cause a new upload.
+        mask_hash = hashlib.sha1(np.packbits(mask)).hexdigest() + str(mask.shape)
+        if mask_hash == self._mask_hash:
+            return False
+
+        self.clear()
+
+        if not isinstance(self.layer.data.coords, WCS):
+            raise ValueError('WWT cannot render image subset {}: it must have WCS '
+                             'coordinates'.format(self.layer.label))
+
+        # The mask is put on the grid the parent image is shown on by looking
+        # up the nearest pixels, which are only computed once per image, so
+        # that changing the selection never reprojects anything.
+        wcs, index = nearest_pixel_map(self.layer.data.coords, mask.shape)
+        mask = apply_pixel_map(mask, index, fill=False)
+
+        # Only the part of the grid containing the subset is sent. pywwt
+        # converts every image to floating point, and only blank pixels are
+        # transparent in WWT, so the overlay is 1 in the subset and NaN
+        # elsewhere rather than an integer mask.
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        self._mask_hash = mask_hash
+        if len(rows) == 0:
+            return False
+        view = slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1)
+        overlay = np.where(mask[view], np.float32(1), np.float32(np.nan))
+
+        self.wwt_layer = self.wwt_client.layers.add_image_layer((overlay, wcs[view]))
+        self.wwt_layer.vmin = 0
+        self.wwt_layer.vmax = 1
+
+        return True
+
+    def _update_presentation(self, force=False, **kwargs):
+        if self._removed or self._deferred:
+            return
+
+        # The changed properties are also popped when forcing an update, so
+        # that the next update doesn't see them all as changed (and rebuild
+        # the WWT layer).
+        changed = self.pop_changed_properties()
+
+        logger.debug("updating WWT for 2D image subset %s" % self.layer.label)
+
+        if self.visible is False:
+            self.clear()
+            return
+
+        if 'mode' in changed:
+            self.clear()
+
+        if force or self.wwt_layer is None:
+            # Only a new WWT layer needs all of its settings sent again
+            force = self._update_mask()
+            if self.wwt_layer is None:
+                return
+
+        if force or 'alpha' in changed:
+            if self.state.alpha is not None:
+                self.wwt_layer.opacity = float(self.state.alpha)
+
+        if force or 'cmap' in changed:
+            if self.state.cmap is not None:
+                self.wwt_layer.cmap = self.state.cmap
+
+        self.enable()
+
+    def redraw(self):
+        pass
+
+    def update(self):
+        self._update_presentation(force=True)
@@ -0,0 +1,213 @@
+"""
+A cache of the catalogue of imagery layers available in WWT, shared by all
+viewers in a process and persisted on disk between sessions.
+
+Every pywwt client downloads and parses the catalogue of available imagery
+when it is created. With this cache, the catalogue is downloaded at most once
+per process (and refreshed in the background), and later viewers reuse it.
+Viewers listen to the catalogue, so that they are all updated when it is
+refreshed.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from glue.config import CFG_DIR
+from glue.logger import logger
+
+__all__ = ['ImageryCatalog', 'IMAGERY_CATALOG']
+
+DEFAULT_CACHE_PATH = os.path.join(CFG_DIR, 'wwt', 'imagery_layers.json')
+
+
+def _fetch_imagery_layers():
+    from pywwt.core import DEFAULT_SURVEYS_URL
+    from pywwt.imagery import get_imagery_layers
+    return get_imagery_layers(DEFAULT_SURVEYS_URL)
+
+
+class ImageryCatalog(object):
+    """
+    A process-wide cache of the available imagery layers.
+
+    Parameters
+    ----------
+    path : str, optional
+        The file in which the catalogue is persisted between sessions.
+    fetch : callable, optional
+        A function returning the catalogue as a dictionary mapping layer
+        names to layer information. Defaults to downloading the catalogue
+        that pywwt uses.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, fetch=_fetch_imagery_layers):
+        self.path = path
+        self._fetch = fetch
+        self._layers = None
+        self._names = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._refreshed = False
+        self._listeners = []
+        self._version = 0
+        self._notified_version = 0
+
+    def _set_layers(self, layers):
+        with self._lock:
+            self._layers = OrderedDict(layers)
+            self._names = sorted(self._layers)
+            self._version += 1
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, layers):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(self.path))
+            with os.fdopen(fd, 'w') as f:
+                json.dump(layers, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning("Could not write the WWT imagery catalogue to %s", self.path)
+
+    def layers(self):
+        """
+        Return the catalogue, as a dictionary mapping layer names to layer
+        information.
+
+        The catalogue is taken from memory if possible, then from disk (in
+        which case it is refreshed in the background), and is only downloaded
+        if neither is available.
+        """
+        if self._layers is None:
+            layers = self._load()
+            if layers is None:
+                self.refresh()
+            else:
+                self._set_layers(layers)
+                self.refresh_in_background()
+        return self._layers
+
+    def names(self):
+        """
+        Return the sorted names of the available imagery layers.
+        """
+        self.layers()
+        return self._names
+
+    def refresh(self):
+        """
+        Download the catalogue again and update the cache.
+        """
+        layers = self._fetch()
+        self._set_layers(layers)
+        self._save(self._layers)
+        self._refreshed = True
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.warning("Could not refresh the WWT imagery catalogue")
+
+    @property
+    def refreshing(self):
+        """
+        Whether the catalogue is being downloaded in the background.
+        """
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    def refresh_in_background(self, force=False):
+        """
+        Download the catalogue again in a background thread, unless this has
+        already been done in this process (or ``force`` is `True`). If the
+        download fails, the current catalogue is kept.
+        """
+        if self.refreshing or (not force and (self._refreshed or self._refresh_thread is not None)):
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_quietly, daemon=True)
+        self._refresh_thread.start()
+
+    def add_listener(self, callback):
+        """
+        Call ``callback`` whenever `notify` finds that the catalogue changed.
+        ``callback`` should be a method, of which only a weak reference is
+        kept.
+        """
+        self._listeners.append(weakref.WeakMethod(callback))
+
+    def remove_listener(self, callback):
+        """
+        Stop calling ``callback`` when the catalogue changes.
+        """
+        self._listeners = [ref for ref in self._listeners if ref() is not None and ref() != callback]
+
+    def notify(self):
+        """
+        Call the listeners if the catalogue changed since they were last
+        called.
+
+        The catalogue is refreshed in a background thread, from which the
+        user interface can't be updated, so rather than being called by the
+        refresh itself, this is called from the thread of the user interface
+        once the refresh is done.
+        """
+        if self._version == self._notified_version:
+            return
+        self._notified_version = self._version
+        for ref in list(self._listeners):
+            callback = ref()
+            if callback is None:
+                self._listeners.remove(ref)
+            else:
+                callback()
+
+    def invalidate(self):
+        """
+        Discard the cached catalogue, both in memory and on disk.
+        """
+        with self._lock:
+            self._layers = None
+            self._names = None
+            self._refreshed = False
+            self._refresh_thread = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    @contextmanager
+    def patch_pywwt(self):
+        """
+        Make pywwt clients created in this context use the cached catalogue
+        instead of downloading it again.
+        """
+        import pywwt.core
+        original = pywwt.core.get_imagery_layers
+
+        def get_imagery_layers(url):
+            # Only the default catalogue is cached
+            if url != pywwt.core.DEFAULT_SURVEYS_URL:
+                return original(url)
+            return OrderedDict(self.layers())
+
+        pywwt.core.get_imagery_layers = get_imagery_layers
+        try:
+            yield
+        finally:
+            pywwt.core.get_imagery_layers = original
+
+
+IMAGERY_CATALOG = ImageryCatalog()
@@ -0,0 +1,73 @@
+"""
+Layer options for the Jupyter viewer that are only built when they are shown.
+
+glue-jupyter builds the options panel of every layer as soon as the layer is
+added, which with many subsets means a lot of widgets to create, keep in the
+kernel and sync with the frontend. Here only the panel of the layer selected
+in the "Layers" tab exists: it is built when the layer is selected, and closed
+and disconnected from the layer state when another layer is selected. All the
+options are stored in the layer state, so nothing is lost in between. Panels
+are disconnected through their ``disconnect`` method, which panels built on
+`~glue_wwt.viewer.jupyter.utils.LinkedOptionsPanel` provide.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from ipywidgets import Widget
+
+from glue_jupyter.widgets.layer_options import LayerOptionsWidget
+
+__all__ = ['LazyLayerOptionsWidget', 'close_widget']
+
+
+def close_widget(widget):
+    """
+    Close ``widget`` and all the widgets it contains (children, layouts, ...).
+    """
+    for name in widget.keys:
+        value = getattr(widget, name, None)
+        for item in value if isinstance(value, (list, tuple)) else (value,):
+            if isinstance(item, Widget):
+                close_widget(item)
+    widget.close()
+
+
+class LazyLayerOptionsWidget(LayerOptionsWidget):
+    """
+    A layer selector that only builds the options panel of the selected layer.
+    """
+
+    _panel_artist = None
+
+    def layer_to_dict(self, layer_artist, index):
+        data = self.layer_data(layer_artist)
+        data['index'] = index
+        return data
+
+    def _update_current_layer_info(self, index):
+        if index < len(self.layers):
+            self.current_layer = self.current_layers_data[index]
+            layer_artist = self.viewer.layers[index]
+            if layer_artist is not self._panel_artist:
+                self._release_panel()
+                self.current_panel = self._make_panel(layer_artist)
+                self._panel_artist = layer_artist
+        else:
+            self._release_panel()
+
+    def _make_panel(self, layer_artist):
+        widget_cls = self.viewer._layer_style_widget_cls
+        if isinstance(widget_cls, dict):
+            widget_cls = widget_cls[type(layer_artist)]
+        return widget_cls(layer_artist.state)
+
+    def _release_panel(self):
+        panel = self.current_panel
+        self.current_panel = None
+        self._panel_artist = None
+        if panel is not None:
+            # The widgets are linked to the layer state with callbacks that
+            # keep them alive (and up to date) until the panel disconnects them
+            if hasattr(panel, 'disconnect'):
+                panel.disconnect()
+            close_widget(panel)
@@ -0,0 +1,158 @@
+"""
+A scheduler for periodic tasks shared by all Jupyter WWT viewers.
+
+Rather than running a thread per viewer, tasks are run as callbacks on the
+asyncio event loop of the kernel, so that they always run on the same thread
+as the rest of the kernel code and can safely modify echo state.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import weakref
+
+from glue.logger import logger
+
+__all__ = ['PeriodicTask', 'Scheduler', 'get_scheduler']
+
+
+def _get_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.get_event_loop()
+
+
+class PeriodicTask(object):
+    """
+    A callback that is called every ``interval`` seconds while it is running.
+
+    Tasks are created with `Scheduler.register` and are initially stopped.
+    Bound methods are only weakly referenced, so a task never keeps its owner
+    alive and is cancelled once the owner no longer exists.
+    """
+
+    def __init__(self, scheduler, owner, callback, interval):
+        self._scheduler = scheduler
+        self._owner = weakref.ref(owner)
+        if hasattr(callback, '__self__'):
+            self._callback = weakref.WeakMethod(callback)
+        else:
+            self._callback = lambda: callback
+        self.interval = interval
+        self._handle = None
+        self._cancelled = False
+
+    @property
+    def running(self):
+        return self._handle is not None
+
+    def start(self):
+        """
+        Start calling the callback, if it is not already being called.
+        """
+        if self._cancelled or self.running:
+            return
+        self._schedule()
+
+    def stop(self):
+        """
+        Stop calling the callback until `start` is called again.
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def cancel(self):
+        """
+        Stop the task permanently and remove it from the scheduler.
+        """
+        self.stop()
+        self._cancelled = True
+        self._scheduler._remove(self)
+
+    def _schedule(self):
+        self._handle = self._scheduler.loop.call_later(self.interval, self._run)
+
+    def _run(self):
+        self._handle = None
+        callback = self._callback()
+        if callback is None:
+            self.cancel()
+            return
+        try:
+            callback()
+        except Exception:
+            logger.exception("Error in periodic WWT task")
+        # The callback may itself have stopped or restarted the task
+        if not self._cancelled and self._handle is None:
+            self._schedule()
+
+
+class Scheduler(object):
+    """
+    Runs `PeriodicTask` objects on an asyncio event loop, keeping track of
+    which tasks belong to which owner. Owners are only weakly referenced, and
+    forgotten (along with their tasks) once they no longer exist.
+
+    Parameters
+    ----------
+    loop : `asyncio.AbstractEventLoop`, optional
+        The event loop on which to run tasks. Defaults to the loop of the
+        thread on which the first task is started.
+    """
+
+    def __init__(self, loop=None):
+        self._loop = loop
+        self._tasks = weakref.WeakKeyDictionary()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            self._loop = _get_loop()
+        return self._loop
+
+    def register(self, owner, callback, interval):
+        """
+        Create a stopped task calling ``callback`` every ``interval`` seconds
+        on behalf of ``owner``.
+        """
+        task = PeriodicTask(self, owner, callback, interval)
+        self._tasks.setdefault(owner, []).append(task)
+        return task
+
+    def tasks(self, owner):
+        """
+        Return the tasks registered for ``owner``.
+        """
+        return list(self._tasks.get(owner, []))
+
+    def unregister(self, owner):
+        """
+        Cancel all the tasks registered for ``owner``.
+        """
+        for task in self.tasks(owner):
+            task.cancel()
+
+    def _remove(self, task):
+        owner = task._owner()
+        if owner is None:
+            return
+        tasks = self._tasks.get(owner, [])
+        if task in tasks:
+            tasks.remove(task)
+        if not tasks:
+            self._tasks.pop(owner, None)
+
+
+_SCHEDULER = None
+
+
+def get_scheduler():
+    """
+    Return the scheduler shared by all Jupyter WWT viewers.
+    """
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = Scheduler()
+    return _SCHEDULER
@@ -26,3 +26,16 @@ class TestJupyterWWTDataViewer(BaseTestWWTDataViewer):
 
     def _create_new_viewer(self):
         self.viewer = self.application.new_data_viewer(WWTJupyterViewer)
+
+    def test_deferred_layers_displayed(self):
+
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+        self.viewer._layers_deferred = True
+        self.viewer.add_data(self.d)
+
+        # Layers are created once the frontend reports that the widget is
+        # displayed, even if it was displayed without calling show()
+        self.viewer._on_widget_message(self.viewer._wwt, {'type': 'wwt_jupyter_widget_status', 'alive': True}, [])
+        assert not self.viewer._layers_deferred
+        assert self.viewer.layers[0].wwt_layer is not None
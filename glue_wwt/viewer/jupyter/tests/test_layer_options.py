@@ -0,0 +1,86 @@
+import pytest
+
+from glue.core import Data
+from glue_jupyter.app import JupyterApplication
+
+from ..layer_options import LazyLayerOptionsWidget
+from ..utils import LinkedOptionsPanel, linked_checkbox
+
+try:
+    from ipykernel.kernelbase import Kernel
+except ImportError:
+    Kernel = None
+
+
+@pytest.fixture(autouse=True)
+def no_kernel():
+    # Widgets only send their comm messages through a kernel if there is one,
+    # and the kernel instance left by other tests (e.g. by pywwt) can't send
+    # them outside of a running kernel
+    if Kernel is not None:
+        Kernel.clear_instance()
+    yield
+    if Kernel is not None:
+        Kernel.clear_instance()
+
+
+class Panel(LinkedOptionsPanel):
+
+    built = 0
+
+    def __init__(self, layer_state):
+        Panel.built += 1
+        super().__init__(layer_state)
+        self.visible = linked_checkbox(self.state, 'visible', description='Visible', links=self.links)
+        self.children = (self.visible,)
+
+
+def callback_count(state):
+    return sum(len(callbacks[state].callbacks)
+               for _, prop in state.iter_callback_properties()
+               for callbacks in (prop._callbacks, prop._2arg_callbacks) if state in callbacks)
+
+
+def make_options(count=3):
+    app = JupyterApplication()
+    datasets = [app.add_data(Data(x=[1, 2], y=[3, 4], label='data{0}'.format(index)))[0]
+                for index in range(count)]
+    viewer = app.scatter2d(data=datasets[0], show=False)
+    for data in datasets[1:]:
+        viewer.add_data(data)
+    viewer._layer_style_widget_cls = Panel
+    return viewer, LazyLayerOptionsWidget(viewer)
+
+
+def test_only_selected_panel_built():
+    built = Panel.built
+    viewer, options = make_options()
+    assert Panel.built == built + 1
+    assert options.current_panel.state is viewer.layers[0].state
+    assert all('layer_panel' not in layer for layer in options.layers)
+
+
+def test_panel_freed_on_deselect():
+    viewer, options = make_options()
+    state = viewer.layers[0].state
+    options._release_panel()
+    callbacks = callback_count(state)
+    options._update_current_layer_info(0)
+    panel = options.current_panel
+    assert callback_count(state) > callbacks
+
+    options.selected = 1
+    assert panel.comm is None
+    assert panel.visible.comm is None
+    assert callback_count(state) == callbacks
+    assert options.current_panel.state is viewer.layers[1].state
+
+
+def test_state_kept():
+    viewer, options = make_options()
+    options.current_panel.visible.value = False
+    options.selected = 1
+    assert viewer.layers[0].state.visible is False
+    viewer.layers[0].state.visible = True
+    options.selected = 0
+    assert options.current_panel.visible.value is True
@@ -0,0 +1,81 @@
+import asyncio
+import gc
+
+from ..scheduler import Scheduler
+
+
+class Owner(object):
+
+    def __init__(self):
+        self.calls = 0
+
+    def tick(self):
+        self.calls += 1
+
+
+def run_for(loop, seconds):
+    loop.run_until_complete(asyncio.sleep(seconds))
+
+
+def test_register_start_stop():
+
+    loop = asyncio.new_event_loop()
+    try:
+        scheduler = Scheduler(loop=loop)
+        owner = Owner()
+        task = scheduler.register(owner, owner.tick, 0.01)
+
+        # Tasks don't run until they are started
+        run_for(loop, 0.05)
+        assert owner.calls == 0
+
+        task.start()
+        assert task.running
+        run_for(loop, 0.1)
+        assert owner.calls > 0
+
+        task.stop()
+        calls = owner.calls
+        run_for(loop, 0.05)
+        assert owner.calls == calls
+    finally:
+        loop.close()
+
+
+def test_unregister():
+
+    loop = asyncio.new_event_loop()
+    try:
+        scheduler = Scheduler(loop=loop)
+        owner1, owner2 = Owner(), Owner()
+        scheduler.register(owner1, owner1.tick, 0.01).start()
+        scheduler.register(owner2, owner2.tick, 0.01).start()
+
+        scheduler.unregister(owner1)
+        assert scheduler.tasks(owner1) == []
+        assert len(scheduler.tasks(owner2)) == 1
+
+        run_for(loop, 0.05)
+        assert owner1.calls == 0
+        assert owner2.calls > 0
+    finally:
+        loop.close()
+
+
+def test_owner_not_kept_alive():
+
+    loop = asyncio.new_event_loop()
+    try:
+        scheduler = Scheduler(loop=loop)
+        owner = Owner()
+        task = scheduler.register(owner, owner.tick, 0.01)
+        task.start()
+        del owner
+        gc.collect()
+        run_for(loop, 0.05)
+        assert not task.running
+        # Tasks aren't kept by owner id, which a new owner could reuse
+        assert len(scheduler._tasks) == 0
+        assert scheduler.tasks(Owner()) == []
+    finally:
+        loop.close()
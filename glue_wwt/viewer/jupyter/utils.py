@@ -1,33 +1,133 @@
-from ipywidgets import Checkbox, ColorPicker, FloatText, Layout
+from ipywidgets import Checkbox, ColorPicker, Dropdown, FloatText, Layout, VBox
 
-from glue.utils import color2hex
-from glue_jupyter.link import dlink, link
+from glue.utils import avoid_circular, color2hex
+from glue_jupyter.link import dlink
+from glue_jupyter.widgets.linked_dropdown import get_choices
 
-__all__ = ['linked_checkbox', 'linked_color_picker', 'set_enabled_from_checkbox']
+__all__ = ['linked_checkbox', 'linked_color_picker', 'linked_dropdown', 'set_enabled_from_checkbox',
+           'StateLink', 'StateDropdownLink', 'LinkedOptionsPanel']
 
 
 def opposite(value):
     return not value
 
 
-def linked_checkbox(state, attr, description='', layout=None):
+def identity(value):
+    return value
+
+
+class StateLink(object):
+    """
+    Keep the ``attr`` property of ``state`` and the ``trait`` of ``widget`` in
+    sync, until `disconnect` is called. ``to_widget`` and ``to_state`` convert
+    the values going each way.
+    """
+
+    def __init__(self, state, attr, widget, trait='value', to_widget=None, to_state=None):
+        self.state = state
+        self.attr = attr
+        self.widget = widget
+        self.trait = trait
+        self._to_widget = to_widget or identity
+        self._to_state = to_state or identity
+        self.state.add_callback(self.attr, self._update_widget)
+        self.widget.observe(self._update_state, self.trait)
+        self._update_widget()
+
+    @avoid_circular
+    def _update_widget(self, *args):
+        value = self._to_widget(getattr(self.state, self.attr))
+        if value != getattr(self.widget, self.trait):
+            setattr(self.widget, self.trait, value)
+
+    @avoid_circular
+    def _update_state(self, change):
+        value = self._to_state(change['new'])
+        if value != getattr(self.state, self.attr):
+            setattr(self.state, self.attr, value)
+
+    def disconnect(self):
+        self.state.remove_callback(self.attr, self._update_widget)
+        self.widget.unobserve(self._update_state, self.trait)
+
+
+class StateDropdownLink(StateLink):
+    """
+    A `StateLink` between a selection property and a dropdown, whose options
+    are kept to the choices of the property.
+    """
+
+    @avoid_circular
+    def _update_widget(self, *args):
+        # The choices are compared by identity, since component IDs
+        # overload ==
+        choices, labels = get_choices(self.state, self.attr)
+        value = getattr(self.state, self.attr)
+        self.widget.options = list(zip(labels, choices))
+        for choice, label in zip(choices, labels):
+            if choice is value or (isinstance(value, str) and label == value):
+                self.widget.value = choice
+                break
+        else:
+            self.widget.value = None
+
+    @avoid_circular
+    def _update_state(self, change):
+        setattr(self.state, self.attr, change['new'])
+
+
+def _add_link(link, links):
+    if links is not None:
+        links.append(link)
+
+
+def linked_checkbox(state, attr, description='', layout=None, links=None):
     widget = Checkbox(getattr(state, 'attr', False), description=description,
                       indent=False, layout=layout or Layout())
-    link((state, attr), (widget, 'value'))
+    _add_link(StateLink(state, attr, widget), links)
     return widget
 
 
-def linked_color_picker(state, attr, description='', layout=None):
+def linked_color_picker(state, attr, description='', layout=None, links=None):
     widget = ColorPicker(concise=True, layout=layout or Layout(), description=description)
-    link((state, attr), (widget, 'value'), color2hex)
+    _add_link(StateLink(state, attr, widget, to_widget=color2hex), links)
     return widget
 
 
-def linked_float_text(state, attr, default=0, description='', layout=None):
+def linked_float_text(state, attr, default=0, description='', layout=None, links=None):
     widget = FloatText(description=description, layout=layout or Layout())
-    link((state, attr), (widget, 'value'), lambda value: value or default)
+    _add_link(StateLink(state, attr, widget, to_widget=lambda value: value or default), links)
+    return widget
+
+
+def linked_dropdown(state, attr, description='', layout=None, links=None):
+    widget = Dropdown(description=description, layout=layout or Layout())
+    _add_link(StateDropdownLink(state, attr, widget), links)
     return widget
 
 
 def set_enabled_from_checkbox(widget, checkbox):
     dlink((checkbox, 'value'), (widget, 'disabled'), opposite)
+
+
+class LinkedOptionsPanel(VBox):
+    """
+    A panel of widgets linked to the properties of ``state``. The links are
+    gathered in ``links``, so that `disconnect` can remove all the callbacks
+    the panel added to the state once it is not shown anymore.
+    """
+
+    def __init__(self, state, **kwargs):
+        super(LinkedOptionsPanel, self).__init__(**kwargs)
+        self.state = state
+        self.links = []
+
+    def link(self, attr, widget, trait='value', to_widget=None, to_state=None):
+        self.links.append(StateLink(self.state, attr, widget, trait=trait,
+                                    to_widget=to_widget, to_state=to_state))
+        return widget
+
+    def disconnect(self):
+        for link in self.links:
+            link.disconnect()
+        self.links = []
@@ -1,21 +1,27 @@
 from __future__ import absolute_import, division, print_function
 from datetime import datetime
-from threading import Timer
+import html
 
 from glue_jupyter.view import IPyWidgetView
 from glue_jupyter.link import link, dlink
-from glue_jupyter.widgets import LinkedDropdown, Color, Size
+from glue_jupyter.widgets import LinkedDropdown
+from glue.config import colormaps
+from glue.utils import color2hex
 
-from pywwt.jupyter import WWTJupyterWidget
-
-from ipywidgets import Accordion, GridBox, HBox, Label, Layout, Output, Tab, VBox, FloatSlider, FloatText
+from ipywidgets import (Accordion, ColorPicker, Dropdown, GridBox, HBox, HTML, Label, Layout, Output,
+                        RadioButtons, Tab, VBox, FloatSlider, FloatText)
 from ipywidgets.widgets.widget_datetime import NaiveDatetimePicker
 from numpy import datetime64
 
 from ..data_viewer import WWTDataViewerBase
-from ..image_layer import WWTImageLayerArtist
-from .utils import linked_checkbox, linked_color_picker, linked_float_text, set_enabled_from_checkbox
+from ..image_layer import WWTImageLayerArtist, WWTImageSubsetLayerArtist
+from .utils import (LinkedOptionsPanel, linked_checkbox, linked_color_picker, linked_dropdown, linked_float_text,
+                    set_enabled_from_checkbox)
 from ..table_layer import WWTTableLayerArtist
+from ..throttle import Throttle, time_slider_interval
+from ..time_bounds import update_time_bounds
+from .layer_options import LazyLayerOptionsWidget
+from .scheduler import get_scheduler
 
 from glue_jupyter.registries import viewer_registry
 
@@ -145,6 +151,7 @@ class JupterViewerOptions(VBox):
         self.widget_current_time = FloatSlider(readout=False, min=0, max=1, step=0.001)
         self.state.add_callback('min_time', self._update_slider_fraction)
         self.state.add_callback('max_time', self._update_slider_fraction)
+        self.state.add_callback('layers', self._update_time_bounds)
 
         # We can't just use `link` here because the time granularity of the slider will not be the same as WWT
         # and so when we update the time, we'll get a time -> slider -> time update
@@ -152,6 +159,11 @@ class JupterViewerOptions(VBox):
         self.state.add_callback('current_time', self._on_current_time_update)
         self.widget_current_time.observe(self._on_slider_update, names=["value"])
 
+        # Dragging the slider only updates the time (and so WWT and the time
+        # series layers) a limited number of times per second
+        self._time_throttle = Throttle(self._set_current_time, time_slider_interval(),
+                                       get_scheduler().loop.call_later)
+
         self.widget_min_time = NaiveDatetimePicker(description="Min Time:")
         link((self.state, 'min_time'), (self.widget_min_time, 'value'),
              lambda time: self._datetime64_to_utc_datetime(time),
@@ -206,64 +218,124 @@ class JupterViewerOptions(VBox):
         n_steps = (self.widget_current_time.max - self.widget_current_time.min) / self.widget_current_time.step
         step_timegap = (self.state.max_time - self.state.min_time) / n_steps
         if abs(time - self.state.current_time) >= step_timegap:
-            self.state.current_time = time
+            self._time_throttle(time)
+
+    def _set_current_time(self, time):
+        self.state.current_time = time
+
+    def _update_time_bounds(self, *args):
+        update_time_bounds(self.state)
 
 
-class JupyterImageLayerOptions(VBox):
+class JupyterImageLayerOptions(LinkedOptionsPanel):
     def __init__(self, layer_state):
-        self.state = layer_state
+        super().__init__(layer_state)
 
-        self.data_att = LinkedDropdown(self.state, 'img_data_att', 'Component')
+        self.data_att = linked_dropdown(self.state, 'img_data_att', 'Component', links=self.links)
 
         if self.state.alpha is None:
             self.state.alpha = 1.0
-        self.alpha = FloatSlider(description='alpha', min=0, max=1, value=self.state.alpha, step=0.01)
-        link((self.state, 'alpha'), (self.alpha, 'value'))
+        self.alpha = self.link('alpha', FloatSlider(description='alpha', min=0, max=1,
+                                                    value=self.state.alpha, step=0.01))
 
-        self.cmap = LinkedDropdown(self.state, 'cmap', 'Colormap')
-        self.stretch = LinkedDropdown(self.state, 'stretch', 'Stretch')
+        self.cmap = linked_dropdown(self.state, 'cmap', 'Colormap', links=self.links)
+        self.stretch = linked_dropdown(self.state, 'stretch', 'Stretch', links=self.links)
 
-        self.vmin = linked_float_text(self.state, 'vmin', description='Min Val')
-        self.vmax = linked_float_text(self.state, 'vmax', description='Max Val', default=1)
+        self.vmin = linked_float_text(self.state, 'vmin', description='Min Val', links=self.links)
+        self.vmax = linked_float_text(self.state, 'vmax', description='Max Val', default=1, links=self.links)
         self.lims = VBox([self.vmin, self.vmax])
 
-        super().__init__([self.data_att, self.alpha, self.cmap, self.stretch, self.lims])
+        self.children = (self.data_att, self.alpha, self.cmap, self.stretch, self.lims)
 
 
-class JupyterTableLayerOptions(VBox):
+class JupyterImageSubsetLayerOptions(LinkedOptionsPanel):
     def __init__(self, layer_state):
-        self.state = layer_state
-        self.color_widgets = Color(state=self.state)
-        self.size_widgets = Size(state=self.state)
+        super().__init__(layer_state)
+
+        self.alpha = self.link('alpha', FloatSlider(description='alpha', min=0, max=1,
+                                                    value=self.state.alpha, step=0.01))
+
+        self.cmap = linked_dropdown(self.state, 'cmap', 'Colormap', links=self.links)
+
+        self.children = (self.alpha, self.cmap)
+
+
+def show_if(options, index):
+    return lambda value: None if value == options[index] else 'none'
+
+
+class JupyterTableLayerOptions(LinkedOptionsPanel):
+    def __init__(self, layer_state):
+        super().__init__(layer_state)
+
+        # The same widgets as glue-jupyter's Color and Size, linked so that
+        # they can be disconnected from the layer state
+        self.color_widgets = self._color_widgets()
+        self.size_widgets = self._size_widgets()
 
-        self.widget_time_series = linked_checkbox(self.state, 'time_series', description="Time series")
-        self.widget_time_att = LinkedDropdown(self.state, 'time_att', 'Time att')
+        self.widget_time_series = linked_checkbox(self.state, 'time_series', description="Time series",
+                                                  links=self.links)
+        self.widget_time_att = linked_dropdown(self.state, 'time_att', 'Time att', links=self.links)
         self.widget_time_decay_value = linked_float_text(self.state, 'time_decay_value',
-                                                         default=0, description='Time decay')
-        self.widget_time_decay_unit = LinkedDropdown(self.state, 'time_decay_unit', label='')
+                                                         default=0, description='Time decay', links=self.links)
+        self.widget_time_decay_unit = linked_dropdown(self.state, 'time_decay_unit', links=self.links)
         self.time_decay_widgets = HBox([self.widget_time_decay_value, self.widget_time_decay_unit])
         self.time_widgets = VBox([self.widget_time_series, self.widget_time_att, self.time_decay_widgets])
 
         # self.recenter_widget = Button(description='Center view on layer')
         # self.recenter_widget.on_click(viewer_state.)
 
-        super().__init__([self.size_widgets, self.color_widgets, self.time_widgets])
+        self.children = (self.size_widgets, self.color_widgets, self.time_widgets)
 
+    def _color_widgets(self):
+        color = self.link('color', ColorPicker(description='color'), to_widget=color2hex)
 
-class RepeatTimer(Timer):
-    def run(self):
-        while not self.finished.wait(self.interval):
-            self.function(*self.args, **self.kwargs)
+        options = type(self.state).color_mode.get_choice_labels(self.state)
+        color_mode = self.link('color_mode', RadioButtons(options=options, description='cmap mode'))
+
+        cmap_att = linked_dropdown(self.state, 'cmap_att', 'color attribute', links=self.links)
+        cmap_vmin = linked_float_text(self.state, 'cmap_vmin', description='color min', links=self.links)
+        cmap_vmax = linked_float_text(self.state, 'cmap_vmax', default=1, description='color max', links=self.links)
+        cmap_v = VBox([cmap_vmin, cmap_vmax])
+
+        cmap = self.link('cmap', Dropdown(options=colormaps, description='colormap'), trait='label',
+                         to_widget=colormaps.name_from_cmap, to_state=lambda name: colormaps[name])
+
+        dlink((color_mode, 'value'), (color.layout, 'display'), show_if(options, 0))
+        for widget in (cmap, cmap_att, cmap_v):
+            dlink((color_mode, 'value'), (widget.layout, 'display'), show_if(options, 1))
+
+        return VBox([color_mode, color, cmap_att, cmap_v, cmap])
+
+    def _size_widgets(self):
+        size = self.link('size', FloatSlider(description='size', min=0, max=10, value=self.state.size))
+        scaling = self.link('size_scaling', FloatSlider(description='scale', min=0, max=2,
+                                                        value=self.state.size_scaling))
+
+        options = type(self.state).size_mode.get_choice_labels(self.state)
+        size_mode = self.link('size_mode', RadioButtons(options=options, description='size mode'))
+
+        size_att = linked_dropdown(self.state, 'size_att', 'size attribute', links=self.links)
+        size_vmin = linked_float_text(self.state, 'size_vmin', description='size min', links=self.links)
+        size_vmax = linked_float_text(self.state, 'size_vmax', default=1, description='size max', links=self.links)
+        size_v = VBox([size_vmin, size_vmax])
+
+        dlink((size_mode, 'value'), (size.layout, 'display'), show_if(options, 0))
+        for widget in (size_att, size_v):
+            dlink((size_mode, 'value'), (widget.layout, 'display'), show_if(options, 1))
+
+        return VBox([size_mode, size, scaling, size_att, size_v])
 
 
 @viewer_registry("wwt")
 class WWTJupyterViewer(WWTDataViewerBase, IPyWidgetView):
     _layer_style_widget_cls = {
         WWTImageLayerArtist: JupyterImageLayerOptions,
+        WWTImageSubsetLayerArtist: JupyterImageSubsetLayerOptions,
         WWTTableLayerArtist: JupyterTableLayerOptions,
     }
 
-    tools = ["wwt:refresh_cache"]
+    tools = ["wwt:refresh_cache", "wwt:select_cone", "wwt:select_polygon", "wwt:select_picked"]
 
     def __init__(self, session, state=None):
         IPyWidgetView.__init__(self, session, state=state)
@@ -281,21 +353,79 @@ class WWTJupyterViewer(WWTDataViewerBase, IPyWidgetView):
         self._layout = HBox([self.figure_widget, self._layout_tab], layout=Layout(height="400px"))
 
     def __del__(self):
-        self._cleanup_time_timer()
+        get_scheduler().unregister(self)
+
+    def cleanup(self):
+        get_scheduler().unregister(self)
+        self._imagery_catalog.remove_listener(self._update_imagery_layers)
+        self._current_time_timer = None
+        self._metrics_task = None
+        super(WWTJupyterViewer, self).cleanup()
 
     def _initialize_wwt(self):
+        from pywwt.jupyter import WWTJupyterWidget
         self._wwt = WWTJupyterWidget()
+        self._wwt.on_msg(self._on_widget_message)
+
+    def _on_widget_message(self, widget, content, buffers):
+        # The frontend tells pywwt when a view of the widget is ready, i.e.
+        # when the widget is first displayed (whether through show() or as
+        # part of another layout), which is when deferred layers are needed
+        if content.get('type') == 'wwt_jupyter_widget_status' and content.get('alive'):
+            self._materialize_layers()
+
+    def initialize_layer_options(self):
+        # Only the options of the selected layer are built
+        self._layout_layer_options = LazyLayerOptionsWidget(self)
+
+    # The metrics are shown in an extra tab, which is only added (and only
+    # refreshed) once they are shown.
+
+    _layout_metrics = None
+    _metrics_task = None
+
+    def _display_metrics(self, show):
+        if show:
+            if self._layout_metrics is None:
+                self._layout_metrics = HTML()
+                self._layout_tab.children = tuple(self._layout_tab.children) + (self._layout_metrics,)
+                self._layout_tab.set_title(len(self._layout_tab.children) - 1, "Metrics")
+                self._metrics_task = get_scheduler().register(self, self._update_metrics_panel,
+                                                              self._METRICS_UPDATE_INTERVAL)
+            self._metrics_task.start()
+            self._update_metrics_panel()
+        elif self._metrics_task is not None:
+            self._metrics_task.stop()
+
+    def _update_metrics_panel(self):
+        self._layout_metrics.value = '<pre>{0}</pre>'.format(html.escape(self.metrics_report()))
 
     def redraw(self):
         self._update_wwt()
 
+    def show(self):
+        self._materialize_layers()
+        super(WWTJupyterViewer, self).show()
+
     @property
     def figure_widget(self):
         return self._wwt
 
+    # The time updates run on the kernel's event loop (shared by all viewers)
+    # rather than in a thread, so that echo state is only modified from the
+    # main thread.
+
     def _setup_time_timer(self):
-        self._current_time_timer = RepeatTimer(1.0, self._update_time)
+        if self._current_time_timer is not None:
+            return
+        self._current_time_timer = get_scheduler().register(self, self._update_time,
+                                                            self._TIME_UPDATE_INTERVAL)
         self._current_time_timer.start()
 
     def _cleanup_time_timer(self):
-        self._current_time_timer.cancel()
+        if self._current_time_timer is not None:
+            self._current_time_timer.cancel()
+            self._current_time_timer = None
+
+    def _call_later(self, delay, callback):
+        get_scheduler().loop.call_later(delay, callback)
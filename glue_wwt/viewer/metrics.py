@@ -0,0 +1,180 @@
+"""
+Metrics on the traffic between a viewer and WWT: how many messages and bytes
+are sent for each WWT layer (or for the viewer itself), and how long the
+calls that block on WWT take.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import StringIO
+
+import numpy as np
+from astropy import units as u
+from astropy.table import Table
+from astropy.time import Time
+
+__all__ = ['LatencyHistogram', 'WWTMetrics', 'message_size']
+
+# The upper edges (in seconds) of the bins of the latency histograms, the
+# last bin containing anything slower
+LATENCY_BINS = (1e-4, 3e-4, 1e-3, 3e-3, 1e-2, 3e-2, 0.1, 0.3, 1, 3, 10)
+
+# The length above which strings in messages are assumed to be payloads
+_LONG_STRING = 1024
+
+
+def _table_size(table):
+    csv = StringIO()
+    table.write(csv, format='ascii.basic', delimiter=',', comment=False)
+    # pywwt sends tables as base64 encoded CSV with lines ending with \r\n
+    size = len(csv.getvalue()) + len(table) + 1
+    return 4 * ((size + 2) // 3)
+
+
+def _json_default(value):
+    if isinstance(value, u.Quantity):
+        return value.value.tolist()
+    elif isinstance(value, Time):
+        return value.isot
+    elif isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    elif hasattr(value, 'name'):
+        # e.g. Matplotlib colormaps, which pywwt sends by name
+        return value.name
+    else:
+        return str(value)
+
+
+def message_size(message):
+    """
+    Return the size in bytes of the JSON encoding of the message ``message``
+    (a dictionary), with any Astropy table in it encoded as pywwt does.
+    """
+    size = 0
+    payloads = {}
+    for key, value in message.items():
+        if isinstance(value, Table):
+            size += _table_size(value)
+            payloads[key] = ''
+        elif isinstance(value, str) and len(value) > _LONG_STRING:
+            # Long strings are encoded tables or images, which don't need to
+            # be escaped, so we avoid encoding them again
+            size += len(value)
+            payloads[key] = ''
+    if payloads:
+        message = dict(message, **payloads)
+    return size + len(json.dumps(message, default=_json_default, separators=(',', ':')))
+
+
+class LatencyHistogram(object):
+    """
+    A histogram of the durations of a call, in the bins ``LATENCY_BINS``.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(len(LATENCY_BINS) + 1, dtype=int)
+        self.total = 0.
+        self.max = 0.
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+    def add(self, seconds):
+        self.counts[np.searchsorted(LATENCY_BINS, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """
+        Return the upper edge of the bin containing the ``q`` quantile of the
+        durations (or the longest duration, if it is in the last bin).
+        """
+        if not self.count:
+            return 0.
+        index = np.searchsorted(np.cumsum(self.counts), q * self.count)
+        return LATENCY_BINS[index] if index < len(LATENCY_BINS) else self.max
+
+
+class WWTMetrics(object):
+    """
+    Counts of the messages and bytes sent to WWT by layer id (`None` for the
+    messages that are not about a layer), and histograms of the durations of
+    named calls to WWT. Nothing is recorded while ``enabled`` is `False`.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.messages = {}
+        self.bytes = {}
+        self.latencies = OrderedDict()
+
+    def add_message(self, message):
+        """
+        Record a message sent to WWT.
+        """
+        if not self.enabled:
+            return
+        layer_id = message.get('id')
+        self.messages[layer_id] = self.messages.get(layer_id, 0) + 1
+        self.bytes[layer_id] = self.bytes.get(layer_id, 0) + message_size(message)
+
+    def add_latency(self, name, seconds):
+        """
+        Record that a call named ``name`` took ``seconds``.
+        """
+        if not self.enabled:
+            return
+        if name not in self.latencies:
+            self.latencies[name] = LatencyHistogram()
+        self.latencies[name].add(seconds)
+
+    @contextmanager
+    def timed(self, name):
+        """
+        Record the time taken by the code in this context as a call named
+        ``name``.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_latency(name, time.perf_counter() - start)
+
+    @property
+    def total_messages(self):
+        return sum(self.messages.values())
+
+    @property
+    def total_bytes(self):
+        return sum(self.bytes.values())
+
+    def summary(self):
+        """
+        Return a one-line summary of the traffic and of the latencies.
+        """
+        parts = ['{0} messages, {1}'.format(self.total_messages, _format_bytes(self.total_bytes))]
+        for name, histogram in self.latencies.items():
+            parts.append('{0}: {1:.1f} ms mean, {2:.1f} ms max ({3} calls)'.format(
+                name, histogram.mean * 1e3, histogram.max * 1e3, histogram.count))
+        return ' | '.join(parts)
+
+
+def _format_bytes(size):
+    if size < 1000:
+        return '{0} B'.format(size)
+    for unit in ('kB', 'MB', 'GB'):
+        size /= 1000
+        if size < 1000 or unit == 'GB':
+            return '{0:.1f} {1}'.format(size, unit)
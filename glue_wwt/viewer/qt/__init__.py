@@ -1,4 +1,9 @@
 def setup():
+    # This needs to be imported before the Qt application is constructed
+    try:
+        from qtpy.QtWebEngineWidgets import QWebEnginePage  # noqa
+    except ImportError:
+        pass
     from .viewer import WWTQtViewer
     from glue.config import qt_client
     qt_client.add(WWTQtViewer)
@@ -14,3 +14,17 @@ class WWTImageStyleEditor(QtWidgets.QWidget):
         self.ui = load_ui('image_style_editor.ui', self, directory=os.path.dirname(__file__))
         connect_kwargs = {'alpha': dict(value_range=(0, 1))}
         self._connections = autoconnect_callbacks_to_qt(layer.state, self.ui, connect_kwargs)
+
+
+class WWTImageSubsetStyleEditor(WWTImageStyleEditor):
+    """
+    Style editor for image subsets, which are shown as a mask so only have an
+    opacity and colormap.
+    """
+
+    def __init__(self, layer):
+        super(WWTImageSubsetStyleEditor, self).__init__(layer)
+        for widget in (self.ui.label_stretch, self.ui.combosel_stretch,
+                       self.ui.label_vmin, self.ui.valuetext_vmin,
+                       self.ui.label_vmax, self.ui.valuetext_vmax):
+            widget.hide()
@@ -2,11 +2,13 @@ from __future__ import absolute_import, division, print_function
 
 import os
 
-from qtpy import QtWidgets
+from qtpy import QtCore, QtWidgets
 from glue_qt.utils import load_ui
 from echo.qt import autoconnect_callbacks_to_qt
 
 from .utils import enabled_if_combosel_in, set_enabled_from_checkbox
+from ..throttle import Throttle, time_slider_interval
+from ..time_bounds import update_time_bounds
 from ..viewer_state import MODES_BODIES
 
 __all__ = ['WWTOptionPanel']
@@ -31,6 +33,10 @@ class WWTOptionPanel(QtWidgets.QWidget):
 
         self._changing_slider_from_time = False
 
+        # Dragging the slider only updates the time (and so WWT and the time
+        # series layers) a limited number of times per second
+        self._time_throttle = Throttle(self._set_current_time, time_slider_interval(), self._call_later)
+
         self._viewer_state.add_callback('mode', self._update_visible_options)
         self._viewer_state.add_callback('frame', self._update_visible_options)
         self._viewer_state.add_callback('current_time', self._on_current_time_update)
@@ -122,16 +128,14 @@ class WWTOptionPanel(QtWidgets.QWidget):
         slider_min = self.ui.slider_current_time.minimum()
         slider_max = self.ui.slider_current_time.maximum()
         fraction = (value - slider_min) / (slider_max - slider_min)
-        self._viewer_state.current_time = self._viewer_state.min_time + \
-            fraction * (self._viewer_state.max_time - self._viewer_state.min_time)
+        self._time_throttle(self._viewer_state.min_time +
+                            fraction * (self._viewer_state.max_time - self._viewer_state.min_time))
+
+    def _set_current_time(self, time):
+        self._viewer_state.current_time = time
+
+    def _call_later(self, delay, callback):
+        QtCore.QTimer.singleShot(int(delay * 1000), callback)
 
     def _update_time_bounds(self, *args):
-        min_time = self._viewer_state.min_time
-        max_time = self._viewer_state.max_time
-        for layer_state in self._viewer_state.layers:
-            if getattr(layer_state, 'time_att', None) is not None:
-                min_time = min(min_time, min(layer_state.layer[layer_state.time_att]))
-                max_time = max(max_time, max(layer_state.layer[layer_state.time_att]))
-
-        self._viewer_state.min_time = min_time
-        self._viewer_state.max_time = max_time
+        update_time_bounds(self._viewer_state)
@@ -0,0 +1,127 @@
+"""
+Rendering a series of frames from the WWT Qt widget, e.g. for a movie.
+
+Each frame is rendered by moving WWT to the time and view of its keyframe,
+letting it draw for a while, and grabbing the widget, all without blocking the
+event loop. Grabbed frames are converted and encoded by a
+`~glue_wwt.viewer.render.FramePipeline` while the next ones are rendered.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from qtpy import QtCore, QtGui
+
+from glue.logger import logger
+
+from ..render import FramePipeline, Keyframe
+
+__all__ = ['FrameRenderer', 'qimage_to_array']
+
+
+def qimage_to_array(image):
+    """
+    Return a Qt image as a ``(height, width, 3)`` array of 8-bit RGB values.
+    """
+    image = image.convertToFormat(QtGui.QImage.Format_RGB32)
+    bits = image.constBits()
+    if hasattr(bits, 'setsize'):
+        # PyQt returns a pointer rather than a buffer
+        bits.setsize(image.height() * image.bytesPerLine())
+    array = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine() // 4, 4)
+    # The pixels are stored as BGRA on little-endian systems
+    return np.ascontiguousarray(array[:, :image.width(), 2::-1])
+
+
+class FrameRenderer(QtCore.QObject):
+    """
+    Render a frame of ``viewer`` for each of the ``keyframes`` (`Keyframe`
+    objects or ``(time, camera)`` tuples), waiting ``settle`` seconds after
+    each update for WWT to draw, and write them with ``writer``.
+
+    Rendering starts when `start` is called and then runs in the background,
+    emitting ``progress`` with the number of frames rendered so far, and then
+    ``finished`` with the `~glue_wwt.viewer.render.RenderStats`, or
+    ``failed`` with an error message.
+    """
+
+    progress = QtCore.Signal(int)
+    finished = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+
+    # Emitted from the worker threads, to resume rendering on the GUI thread
+    _frame_written = QtCore.Signal()
+
+    def __init__(self, viewer, keyframes, writer, settle=0.1, workers=None, parent=None):
+        super(FrameRenderer, self).__init__(parent=parent)
+        self.viewer = viewer
+        self.keyframes = [Keyframe(*keyframe) for keyframe in keyframes]
+        self.settle = settle
+        self.running = False
+        self._pipeline = FramePipeline(writer, convert=qimage_to_array, workers=workers,
+                                       on_written=self._frame_written.emit)
+        self._frame_written.connect(self._on_frame_written, QtCore.Qt.QueuedConnection)
+        self._index = 0
+        self._waiting = False
+
+    def start(self):
+        self.running = True
+        self._next()
+
+    def cancel(self):
+        """
+        Stop rendering after the frames already grabbed are written.
+        """
+        if self.running:
+            self._finish('Rendering cancelled')
+
+    def _next(self):
+        if not self.running:
+            return
+        if self._pipeline.error is not None:
+            self._finish('Could not write frame: {0}'.format(self._pipeline.error))
+        elif self._index == len(self.keyframes):
+            # Only finish once the last frames are written, so that the
+            # event loop keeps running in the meantime
+            self._waiting = self._pipeline.pending > 0
+            if not self._waiting:
+                self._finish()
+        elif self._pipeline.full:
+            self._waiting = True
+        else:
+            keyframe = self.keyframes[self._index]
+            if keyframe.time is not None:
+                self.viewer.state.current_time = np.datetime64(keyframe.time)
+            if keyframe.camera is not None:
+                self.viewer.set_camera_state(keyframe.camera)
+            QtCore.QTimer.singleShot(int(self.settle * 1000), self._grab)
+
+    def _grab(self):
+        if not self.running:
+            return
+        widget = self.viewer._wwt.widget
+        image = QtGui.QImage(widget.size(), QtGui.QImage.Format_RGB32)
+        painter = QtGui.QPainter(image)
+        widget.render(painter)
+        painter.end()
+        self._pipeline.submit(self._index, image)
+        self._index += 1
+        self.progress.emit(self._index)
+        self._next()
+
+    def _on_frame_written(self):
+        if self._waiting:
+            self._waiting = False
+            self._next()
+
+    def _finish(self, error=None):
+        self.running = False
+        try:
+            stats = self._pipeline.close()
+        except Exception as exc:
+            error = error or 'Could not write frame: {0}'.format(exc)
+        if error is None:
+            self.finished.emit(stats)
+        else:
+            logger.error(error)
+            self.failed.emit(error)
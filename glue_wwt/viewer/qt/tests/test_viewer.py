@@ -1,7 +1,9 @@
 import io
 import os
 import sys
+import time
 
+import numpy as np
 import pytest
 
 from unittest.mock import patch
@@ -9,7 +11,9 @@ from unittest.mock import patch
 from qtpy import compat
 
 from glue_qt.app import GlueApplication
+from glue_qt.utils import get_qapp
 
+from ..tour import TourExport
 from ..viewer import WWTQtViewer
 
 from ...tests.test_base import BaseTestWWTDataViewer
@@ -49,15 +53,68 @@ class TestQtWWTDataViewer(BaseTestWWTDataViewer):
         app = GlueApplication.restore_session(os.path.join(DATA, 'wwt_pre_split.glu'))
         assert isinstance(app.viewers[0][0], WWTQtViewer)
 
-    # @pytest.mark.skipif(sys.platform == 'win32', reason="Test causes issues on Windows")
-    @pytest.mark.xfail(reason="'asynchronous' keyword unsupported by some JavaScript versions")
+    def _wait_for_tour(self, export, timeout=60):
+        app = get_qapp()
+        start = time.time()
+        while export.running and time.time() - start < timeout:
+            app.processEvents()
+        assert not export.running
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason="Test causes issues on Windows")
     def test_save_tour(self, tmpdir):
 
         filename = tmpdir.join('mytour.wtt').strpath
         self.viewer.add_data(self.d)
         with patch.object(compat, 'getsavefilename', return_value=(filename, None)):
             self.viewer.toolbar.tools['save'].subtools[1].activate()
+        self._wait_for_tour(self.viewer._tour_export)
 
         assert os.path.exists(filename)
+        assert not os.path.exists(filename + '.part')
         with io.open(filename, newline='') as f:
             assert f.read().startswith("<?xml version='1.0' encoding='UTF-8'?>\r\n<FileCabinet")
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason="Test causes issues on Windows")
+    def test_save_tour_slides(self, tmpdir):
+
+        filename = tmpdir.join('slides.wtt').strpath
+        cameras = [dict(ra=10, dec=20, fov=30), dict(ra=100, dec=-20, fov=5, roll=10)]
+        export = self.viewer.save_tour(filename, cameras=cameras)
+        with pytest.raises(RuntimeError):
+            self.viewer.save_tour(filename)
+        self._wait_for_tour(export)
+
+        with io.open(filename, newline='') as f:
+            assert f.read().count('<TourStop ') == 2
+
+    def test_save_tour_timeout(self, tmpdir):
+
+        # The export gives up if WWT doesn't send anything
+        filename = tmpdir.join('timeout.wtt').strpath
+        export = TourExport(self.viewer, filename, cameras=[dict(ra=10, dec=20, fov=30)], timeout=0.1)
+        errors = []
+        export.failed.connect(errors.append)
+        with patch('glue_wwt.viewer.qt.tour._run_javascript'):
+            export.start()
+            self._wait_for_tour(export, timeout=10)
+
+        assert errors == ['WWT stopped sending the tour']
+        assert not os.path.exists(filename)
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason="Test causes issues on Windows")
+    def test_render_frames(self, tmpdir):
+
+        pattern = tmpdir.join('frames', '{0:03d}.png').strpath
+        keyframes = [('2020-01-01', dict(ra=10, dec=20, fov=30)),
+                     ('2020-06-01', None),
+                     (None, dict(ra=100, dec=-20, fov=5))]
+        renderer = self.viewer.render_frames(keyframes, pattern, settle=0.01)
+        app = get_qapp()
+        start = time.time()
+        while renderer.running and time.time() - start < 60:
+            app.processEvents()
+        assert not renderer.running
+
+        for index in range(3):
+            assert os.path.exists(pattern.format(index))
+        assert self.viewer.state.current_time == np.datetime64('2020-06-01')
@@ -1,12 +1,10 @@
 from __future__ import absolute_import, division, print_function
 
-import io
-import time
 from qtpy import compat
 
+from glue.logger import logger
 from glue.viewers.common.tool import Tool
 from glue.config import viewer_tool
-from glue_qt.utils import get_qapp
 
 
 @viewer_tool
@@ -32,33 +30,6 @@ class SaveTool(Tool):
         self.viewer._wwt.render(filename)
 
 
-SAVE_TOUR_CODE = """
-function getViewAsTour() {
-
-  // Get current view as XML and save to the tourxml variable
-
-  wwtlib.WWTControl.singleton.createTour()
-  editor = wwtlib.WWTControl.singleton.tourEdit
-  editor.addSlide()
-  tour = editor.get_tour()
-  blb = tour.saveToBlob()
-
-  const reader = new FileReader();
-
-  reader.addEventListener('loadend', (e) => {
-  const text = e.srcElement.result;
-  tourxml += text;
-  });
-
-  // Start reading the blob as text.
-  reader.readAsText(blb);
-
-}
-
-getViewAsTour()
-"""
-
-
 @viewer_tool
 class SaveTourTool(Tool):
 
@@ -69,8 +40,6 @@ class SaveTourTool(Tool):
 
     def activate(self):
 
-        app = get_qapp()
-
         filename, _ = compat.getsavefilename(caption='Save File',
                                              basedir='mytour.wtt',
                                              filters='WWT Tour File (*.wtt);;',
@@ -83,32 +52,8 @@ class SaveTourTool(Tool):
         if not filename.endswith('.wtt'):
             filename = filename + '.wtt'
 
-        self.viewer._wwt.widget.page.runJavaScript("tourxml = '';", asynchronous=False)
-        tourxml = self.viewer._wwt.widget.page.runJavaScript('tourxml;', asynchronous=False)
-
-        self.viewer._wwt.widget.page.runJavaScript(SAVE_TOUR_CODE)
-
-        start = time.time()
-        tourxml = None
-        while time.time() - start < 10:
-            time.sleep(0.1)
-            app.processEvents()
-            tourxml = self.viewer._wwt.widget.page.runJavaScript('tourxml;', asynchronous=False)
-            if tourxml:
-                break
-
-        if not tourxml:
-            raise Exception("Failed to save tour")
-
-        # Patch the altUnit so that it is correct for the Windows client (since
-        # the web client currently has other bugs with relation to loading tours).
-        # https://github.com/WorldWideTelescope/wwt-web-client/issues/248
-        for unit_int in range(1, 11):
-            altunit_str = 'AltUnit="{0}"'.format(unit_int)
-            if altunit_str in tourxml:
-                altunit_str_new = 'AltUnit="{0}"'.format(unit_int - 1)
-                print('Changing {0} to {1} in {2}'.format(altunit_str, altunit_str_new, filename))
-                tourxml = tourxml.replace(altunit_str, altunit_str_new)
-
-        with io.open(filename, 'w', newline='') as f:
-            f.write(tourxml)
+        # The tour is saved in the background
+        try:
+            self.viewer.save_tour(filename)
+        except RuntimeError as exc:
+            logger.warning(str(exc))
@@ -0,0 +1,189 @@
+"""
+Exporting tours from the WWT Qt widget without blocking the user interface.
+
+WWT builds the tour and sends its XML back as a series of console messages,
+which pywwt's page forwards to Python as they arrive. The chunks are then
+written straight to disk by a `~glue_wwt.viewer.tour.TourWriter`, so there is
+no polling and no limit on how long large tours take to export, as long as
+WWT keeps sending chunks.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import itertools
+import json
+
+from qtpy import QtCore
+from qtpy.QtWebEngineWidgets import QWebEnginePage, WEBENGINE
+
+from glue.logger import logger
+
+from ..tour import TourWriter
+
+__all__ = ['TourExport']
+
+# The number of characters of tour XML sent in each message
+CHUNK_SIZE = 2 ** 16
+
+# The type of the messages sent back by the tour export code
+MESSAGE_TYPE = 'glue_wwt_tour'
+
+# How long (in seconds) to wait for the next message from WWT before giving up
+TIMEOUT = 30
+
+EXPORT_TOUR_CODE = """
+(function () {
+
+  var exportId = %(export_id)d;
+  var chunkSize = %(chunk_size)d;
+  var cameras = %(cameras)s;
+
+  function post(payload) {
+    payload.type = '%(message_type)s';
+    payload.exportId = exportId;
+    console.log('pywwtMessage:' + JSON.stringify(payload));
+  }
+
+  try {
+
+    // Build a tour with a slide for each camera, or for the current view
+
+    var control = wwtlib.WWTControl.singleton;
+    control.createTour();
+    var editor = control.tourEdit;
+    if (cameras.length === 0) {
+      editor.addSlide();
+    }
+    cameras.forEach(function (camera) {
+      control.gotoRADecZoom(camera.ra / 15, camera.dec, camera.fov * 6, true, camera.roll);
+      editor.addSlide();
+    });
+    var blob = editor.get_tour().saveToBlob();
+
+    // Read the tour as text, and send it back in chunks
+
+    var reader = new FileReader();
+    reader.addEventListener('loadend', function () {
+      if (reader.error) {
+        post({error: String(reader.error)});
+        return;
+      }
+      var text = reader.result;
+      for (var start = 0; start < text.length; start += chunkSize) {
+        post({chunk: text.substring(start, start + chunkSize)});
+      }
+      post({done: true});
+    });
+    reader.readAsText(blob);
+
+  } catch (error) {
+    post({error: String(error)});
+  }
+
+})();
+"""
+
+_EXPORT_IDS = itertools.count()
+
+
+def _run_javascript(page, code):
+    # pywwt's page waits for the result of the code, which we don't need
+    if WEBENGINE:
+        QWebEnginePage.runJavaScript(page, code)
+    else:
+        page.runJavaScript(code)
+
+
+class TourExport(QtCore.QObject):
+    """
+    Export a tour from the WWT Qt ``viewer`` to ``filename``, with a slide
+    for each of the ``cameras`` (dictionaries as returned by
+    `~glue_wwt.viewer.data_viewer.WWTDataViewerBase.camera_state`), or for
+    the current view if none are given.
+
+    The export starts when `start` is called and then runs in the background,
+    emitting ``finished`` with the file name once the tour has been saved, or
+    ``failed`` with an error message, including if WWT sends nothing for
+    ``timeout`` seconds.
+    """
+
+    finished = QtCore.Signal(str)
+    failed = QtCore.Signal(str)
+
+    def __init__(self, viewer, filename, cameras=None, timeout=TIMEOUT, parent=None):
+        super(TourExport, self).__init__(parent=parent)
+        self.viewer = viewer
+        self.filename = filename
+        self.cameras = [dict(ra=float(camera['ra']), dec=float(camera['dec']),
+                             fov=float(camera['fov']), roll=float(camera.get('roll', 0)))
+                        for camera in cameras or []]
+        self.export_id = next(_EXPORT_IDS)
+        self.running = False
+        self._writer = None
+        self._view = None
+        self._previous_callback = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(int(timeout * 1000))
+        self._timer.timeout.connect(self._on_timeout)
+
+    def start(self):
+        page = self.viewer._wwt.widget.page
+        self._writer = TourWriter(self.filename)
+        if self.cameras:
+            self._view = self.viewer.camera_state()
+        self._previous_callback = page.app_message_callback
+        page.app_message_callback = self._on_app_message
+        self.running = True
+        self._timer.start()
+        _run_javascript(page, EXPORT_TOUR_CODE % dict(export_id=self.export_id, chunk_size=CHUNK_SIZE,
+                                                      cameras=json.dumps(self.cameras),
+                                                      message_type=MESSAGE_TYPE))
+
+    def cancel(self):
+        """
+        Stop the export, without saving the tour.
+        """
+        if self.running:
+            self._finish('Tour export cancelled')
+
+    def _on_app_message(self, payload):
+        if payload.get('type') != MESSAGE_TYPE or payload.get('exportId') != self.export_id:
+            if self._previous_callback is not None:
+                self._previous_callback(payload)
+            return
+        if not self.running:
+            return
+        self._timer.start()
+        if 'error' in payload:
+            self._finish('WWT could not export the tour: {0}'.format(payload['error']))
+        elif payload.get('done'):
+            self._finish()
+        else:
+            try:
+                self._writer.write(payload['chunk'])
+            except (KeyError, OSError) as exc:
+                self._finish('Could not write the tour: {0}'.format(exc))
+
+    def _on_timeout(self):
+        if self.running:
+            self._finish('WWT stopped sending the tour')
+
+    def _finish(self, error=None):
+        self.running = False
+        self._timer.stop()
+        self.viewer._wwt.widget.page.app_message_callback = self._previous_callback
+        if self._view is not None:
+            self.viewer.set_camera_state(self._view, instant=True)
+        if error is None:
+            try:
+                self._writer.close()
+            except OSError as exc:
+                error = 'Could not write the tour: {0}'.format(exc)
+        else:
+            self._writer.abort()
+        if error is None:
+            self.finished.emit(self.filename)
+        else:
+            logger.error(error)
+            self.failed.emit(error)
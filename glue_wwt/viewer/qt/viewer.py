@@ -1,15 +1,20 @@
 from __future__ import absolute_import, division, print_function
 
+import json
+
 from qtpy import QtCore
 
 from glue_qt.viewers.common.data_viewer import DataViewer
 
 from ..data_viewer import WWTDataViewerBase
-from ..image_layer import WWTImageLayerArtist
+from ..image_layer import WWTImageLayerArtist, WWTImageSubsetLayerArtist
+from ..render import ImageSequenceWriter, VideoWriter
 from ..table_layer import WWTTableLayerArtist
 from .options_widget import WWTOptionPanel
-from .image_style_editor import WWTImageStyleEditor
+from .image_style_editor import WWTImageStyleEditor, WWTImageSubsetStyleEditor
 from .table_style_editor import WWTTableStyleEditor
+from .render import FrameRenderer
+from .tour import TourExport
 
 # We import the following to register the save tool
 from . import tools as wwt_tools  # noqa
@@ -22,11 +27,18 @@ class WWTQtViewer(WWTDataViewerBase, DataViewer):
 
     _layer_style_widget_cls = {
         WWTImageLayerArtist: WWTImageStyleEditor,
+        WWTImageSubsetLayerArtist: WWTImageSubsetStyleEditor,
         WWTTableLayerArtist: WWTTableStyleEditor,
     }
 
     subtools = {'save': ['wwt:save', 'wwt:savetour']}
-    tools = ["save", "wwt:refresh_cache"]
+    tools = ["save", "wwt:refresh_cache", "wwt:select_cone", "wwt:select_polygon", "wwt:select_picked"]
+
+    _DEFAULT_STATUS = 'NOTE ON ZOOMING: use the z/x keys to zoom in/out if scrolling does not work'
+
+    _metrics_timer = None
+    _tour_export = None
+    _frame_renderer = None
 
     def __init__(self, session, parent=None, state=None):
         DataViewer.__init__(self, session, parent=None, state=state)
@@ -41,7 +53,7 @@ class WWTQtViewer(WWTDataViewerBase, DataViewer):
 
         self._wwt.widget.page.wwt_ready.connect(self._on_wwt_ready)
 
-        self.set_status('NOTE ON ZOOMING: use the z/x keys to zoom in/out if scrolling does not work')
+        self.set_status(self._DEFAULT_STATUS)
 
     def __del__(self):
         self._cleanup_time_timer()
@@ -50,8 +62,104 @@ class WWTQtViewer(WWTDataViewerBase, DataViewer):
         from pywwt.qt import WWTQtClient
         self._wwt = WWTQtClient()
 
+    def _send_message_batch(self, messages):
+        # Each call to runJavaScript blocks until the page responds, so we
+        # deliver all the messages in a single script.
+        code = ''.join('pywwtSendMessage({0});'.format(json.dumps(message)) for message in messages)
+        with self.metrics.timed('runJavaScript'):
+            self._wwt.widget.page.runJavaScript(code)
+
+    def _view_aspect_ratio(self):
+        size = self._wwt.widget.size()
+        return size.width() / max(size.height(), 1)
+
+    def save_tour(self, filename, cameras=None):
+        """
+        Start saving a tour to ``filename``, with a slide for each of the
+        ``cameras`` (as returned by `camera_state`), or for the current view if
+        none are given. The tour is saved in the background, and the
+        `~glue_wwt.viewer.qt.tour.TourExport` returned emits ``finished`` or
+        ``failed`` once it is done.
+        """
+        if self._tour_export is not None and self._tour_export.running:
+            raise RuntimeError('A tour is already being saved')
+        self._tour_export = TourExport(self, filename, cameras=cameras, parent=self)
+        self._tour_export.finished.connect(self._on_tour_saved)
+        self._tour_export.start()
+        return self._tour_export
+
+    def _on_tour_saved(self, filename):
+        self.set_status('Saved tour to {0}'.format(filename))
+
+    def render_frames(self, keyframes, output, fps=25, settle=0.1, workers=None):
+        """
+        Start rendering a frame for each of the ``keyframes`` (``(time,
+        camera)`` tuples, where ``camera`` is as returned by `camera_state` and
+        either can be `None` to keep the current one), waiting ``settle``
+        seconds for WWT to draw each of them.
+
+        If ``output`` contains ``{``, the frames are saved as images named by
+        formatting it with the frame index, e.g. ``'frames/{0:05d}.png'``.
+        Otherwise, they are saved as a video at ``fps`` frames per second,
+        which requires imageio.
+
+        Frames are rendered in the background, and encoded by ``workers``
+        threads while the next ones are rendered. The
+        `~glue_wwt.viewer.qt.render.FrameRenderer` returned emits ``finished``
+        with the number of frames and the frame rate achieved, or ``failed``.
+        """
+        if self._frame_renderer is not None and self._frame_renderer.running:
+            raise RuntimeError('Frames are already being rendered')
+        if '{' in output:
+            writer = ImageSequenceWriter(output)
+        else:
+            writer = VideoWriter(output, fps=fps)
+        self._frame_renderer = FrameRenderer(self, keyframes, writer, settle=settle,
+                                             workers=workers, parent=self)
+        self._frame_renderer.progress.connect(self._on_frame_rendered)
+        self._frame_renderer.finished.connect(self._on_frames_rendered)
+        self._frame_renderer.start()
+        return self._frame_renderer
+
+    def _on_frame_rendered(self, count):
+        self.set_status('Rendered frame {0} of {1}'.format(count, len(self._frame_renderer.keyframes)))
+
+    def _on_frames_rendered(self, stats):
+        self.set_status('Rendered {0} frames in {1:.1f} s ({2:.1f} frames per second)'.format(
+            stats.frames, stats.seconds, stats.fps))
+
+    def _show_picked(self):
+        self.set_status(self._describe_picked() or self._DEFAULT_STATUS)
+
+    def _display_metrics(self, show):
+        if show:
+            if self._metrics_timer is None:
+                self._metrics_timer = QtCore.QTimer()
+                self._metrics_timer.setInterval(int(self._METRICS_UPDATE_INTERVAL * 1000))
+                self._metrics_timer.timeout.connect(self._update_metrics_status)
+            self._metrics_timer.start()
+            self._update_metrics_status()
+        else:
+            if self._metrics_timer is not None:
+                self._metrics_timer.stop()
+            self.set_status(self._DEFAULT_STATUS)
+
+    def _update_metrics_status(self):
+        self.set_status(self.metrics.summary())
+
+    def showEvent(self, event):
+        self._materialize_layers()
+        return super(WWTQtViewer, self).showEvent(event)
+
     def closeEvent(self, event):
         self._cleanup_time_timer()
+        self._imagery_catalog.remove_listener(self._update_imagery_layers)
+        if self._tour_export is not None:
+            self._tour_export.cancel()
+        if self._frame_renderer is not None:
+            self._frame_renderer.cancel()
+        if self._metrics_timer is not None:
+            self._metrics_timer.stop()
         self._wwt.widget.close()
         return super(WWTQtViewer, self).closeEvent(event)
 
@@ -62,8 +170,10 @@ class WWTQtViewer(WWTDataViewerBase, DataViewer):
     # NOTE: Qt needs to use its own QTimer class instead of threading
 
     def _setup_time_timer(self):
+        if self._current_time_timer is not None:
+            return
         self._current_time_timer = QtCore.QTimer()
-        self._current_time_timer.setInterval(1000)
+        self._current_time_timer.setInterval(int(self._TIME_UPDATE_INTERVAL * 1000))
         self._current_time_timer.timeout.connect(self._update_time)
         self._current_time_timer.start()
 
@@ -71,3 +181,6 @@ class WWTQtViewer(WWTDataViewerBase, DataViewer):
         if self._current_time_timer is not None:
             self._current_time_timer.stop()
             self._current_time_timer = None
+
+    def _call_later(self, delay, callback):
+        QtCore.QTimer.singleShot(int(delay * 1000), callback)
@@ -0,0 +1,154 @@
+"""
+Subset states for regions of the sky, such as those selected in the WWT view.
+
+The regions are defined in ICRS coordinates, and the rows of a dataset that
+fall in them are found with a `~glue_wwt.viewer.spatial_index.SpatialIndex`
+rather than by computing the separation of every row from the region. If a
+WWT table layer already built an index of the same coordinates, it is reused.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.core.subset import SubsetState
+
+from .column_store import COLUMN_STORE
+from .spatial_index import SpatialIndex, _tangent_basis, _unit_vectors
+
+__all__ = ['SkyConeSubsetState', 'SkyPolygonSubsetState', 'view_footprint']
+
+
+def view_footprint(lon, lat, fov, aspect_ratio=1, roll=0):
+    """
+    Return the longitudes and latitudes (in degrees) of the corners of a view
+    centered on ``(lon, lat)`` with a vertical field of view ``fov`` (in
+    degrees), the given width to height ratio, and rotated by ``roll``
+    degrees.
+    """
+
+    center = _unit_vectors(lon, lat)
+    east, north = _tangent_basis(center)
+
+    half_height = np.tan(np.radians(min(fov, 179)) / 2)
+    x = np.array([-1, 1, 1, -1]) * half_height * aspect_ratio
+    y = np.array([-1, -1, 1, 1]) * half_height
+
+    roll = np.radians(roll)
+    x, y = x * np.cos(roll) - y * np.sin(roll), x * np.sin(roll) + y * np.cos(roll)
+
+    corners = center + x[:, None] * east + y[:, None] * north
+    corners /= np.linalg.norm(corners, axis=1)[:, None]
+
+    return (np.degrees(np.arctan2(corners[:, 1], corners[:, 0])) % 360,
+            np.degrees(np.arcsin(np.clip(corners[:, 2], -1, 1))))
+
+
+class SkyRegionSubsetState(SubsetState):
+    """
+    Base class for subset states selecting the rows of a dataset whose
+    ``lon_att`` and ``lat_att`` coordinates, in the celestial ``frame``, fall
+    in a region of the sky.
+    """
+
+    def __init__(self, lon_att=None, lat_att=None, frame='ICRS'):
+        super(SkyRegionSubsetState, self).__init__()
+        self.lon_att = lon_att
+        self.lat_att = lat_att
+        self.frame = frame
+        self._index = None
+
+    @property
+    def attributes(self):
+        return (self.lon_att, self.lat_att)
+
+    def _spatial_index(self, data):
+
+        lon = data[self.lon_att]
+        lat = data[self.lat_att]
+
+        # The keys match those used by the table layer artists for the
+        # coordinates they show in the sky, so their indices are reused.
+        coords_key = ('coords', COLUMN_STORE.input_key(data, self.lon_att, lon),
+                      COLUMN_STORE.input_key(data, self.lat_att, lat), 'Sky', self.frame)
+        index_key = ('index',) + coords_key[1:]
+
+        index = COLUMN_STORE.get(index_key)
+        if index is not None:
+            return index
+
+        if self._index is None or self._index[0] != index_key:
+            coords = COLUMN_STORE.get(coords_key)
+            if coords is None:
+                from astropy.coordinates import SkyCoord
+                coord = SkyCoord(lon, lat, unit='deg', frame=self.frame.lower()).icrs
+                coords = coord.spherical.lon.degree, coord.spherical.lat.degree
+            self._index = index_key, SpatialIndex(*coords)
+
+        return self._index[1]
+
+    def _select(self, index):
+        raise NotImplementedError()
+
+    def to_mask(self, data, view=None):
+        mask = np.zeros(data.shape, dtype=bool)
+        mask[self._select(self._spatial_index(data))] = True
+        if view is not None:
+            mask = mask[view]
+        return mask
+
+
+class SkyConeSubsetState(SkyRegionSubsetState):
+    """
+    Select the rows within ``radius`` degrees of ``(lon, lat)`` (in ICRS).
+    """
+
+    def __init__(self, lon_att=None, lat_att=None, frame='ICRS', lon=0, lat=0, radius=0):
+        super(SkyConeSubsetState, self).__init__(lon_att=lon_att, lat_att=lat_att, frame=frame)
+        self.lon = float(lon)
+        self.lat = float(lat)
+        self.radius = float(radius)
+
+    def _select(self, index):
+        return index.cone(self.lon, self.lat, self.radius)
+
+    def copy(self):
+        return SkyConeSubsetState(lon_att=self.lon_att, lat_att=self.lat_att, frame=self.frame,
+                                  lon=self.lon, lat=self.lat, radius=self.radius)
+
+    def __gluestate__(self, context):
+        return dict(lon_att=context.id(self.lon_att), lat_att=context.id(self.lat_att),
+                    frame=self.frame, lon=self.lon, lat=self.lat, radius=self.radius)
+
+    @classmethod
+    def __setgluestate__(cls, rec, context):
+        return cls(lon_att=context.object(rec['lon_att']), lat_att=context.object(rec['lat_att']),
+                   frame=rec['frame'], lon=rec['lon'], lat=rec['lat'], radius=rec['radius'])
+
+
+class SkyPolygonSubsetState(SkyRegionSubsetState):
+    """
+    Select the rows inside the spherical polygon with vertices ``lon`` and
+    ``lat`` (in ICRS).
+    """
+
+    def __init__(self, lon_att=None, lat_att=None, frame='ICRS', lon=(), lat=()):
+        super(SkyPolygonSubsetState, self).__init__(lon_att=lon_att, lat_att=lat_att, frame=frame)
+        self.lon = [float(value) for value in lon]
+        self.lat = [float(value) for value in lat]
+
+    def _select(self, index):
+        return index.polygon(self.lon, self.lat)
+
+    def copy(self):
+        return SkyPolygonSubsetState(lon_att=self.lon_att, lat_att=self.lat_att, frame=self.frame,
+                                     lon=self.lon, lat=self.lat)
+
+    def __gluestate__(self, context):
+        return dict(lon_att=context.id(self.lon_att), lat_att=context.id(self.lat_att),
+                    frame=self.frame, lon=self.lon, lat=self.lat)
+
+    @classmethod
+    def __setgluestate__(cls, rec, context):
+        return cls(lon_att=context.object(rec['lon_att']), lat_att=context.object(rec['lat_att']),
+                   frame=rec['frame'], lon=rec['lon'], lat=rec['lat'])
@@ -0,0 +1,165 @@
+"""
+Writing frames rendered from WWT to an image sequence or a video.
+
+Rendering a frame means updating WWT, waiting for it to draw and grabbing the
+result, which has to happen on the GUI thread, whereas converting and encoding
+the frame doesn't. A `FramePipeline` encodes frames in worker threads while the
+next ones are rendered, and keeps track of the throughput.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+__all__ = ['Keyframe', 'ImageSequenceWriter', 'VideoWriter', 'FramePipeline', 'RenderStats']
+
+
+Keyframe = namedtuple('Keyframe', ['time', 'camera'])
+Keyframe.__doc__ = """
+The state of a frame: the time shown by WWT (anything `numpy.datetime64`
+accepts), and its view (a dictionary as returned by
+`~glue_wwt.viewer.data_viewer.WWTDataViewerBase.camera_state`). Either can
+be `None` to keep the current one.
+"""
+
+
+class ImageSequenceWriter(object):
+    """
+    Write frames to images named by formatting ``pattern`` with the frame
+    index, e.g. ``'frame_{0:05d}.png'``, in any format supported by Pillow.
+    Frames can be written in any order, by several threads at once.
+    """
+
+    ordered = False
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        directory = os.path.dirname(pattern.format(0))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, index, frame):
+        from PIL import Image
+        Image.fromarray(frame).save(self.pattern.format(index))
+
+    def close(self):
+        pass
+
+
+class VideoWriter(object):
+    """
+    Write frames to a video at ``fps`` frames per second, with imageio (which
+    needs to be installed, along with its ffmpeg plugin for most formats).
+    Frames have to be written in order, by one thread at a time.
+    """
+
+    ordered = True
+
+    def __init__(self, filename, fps=25, **kwargs):
+        try:
+            import imageio
+        except ImportError:
+            raise ImportError('imageio is required to write videos')
+        self.filename = filename
+        self._writer = imageio.get_writer(filename, fps=fps, **kwargs)
+
+    def write(self, index, frame):
+        self._writer.append_data(frame)
+
+    def close(self):
+        self._writer.close()
+
+
+class RenderStats(namedtuple('RenderStats', ['frames', 'seconds'])):
+    """
+    The number of frames rendered, and how long it took in seconds.
+    """
+
+    @property
+    def fps(self):
+        return self.frames / self.seconds if self.seconds > 0 else 0.
+
+
+class FramePipeline(object):
+    """
+    Convert frames with ``convert`` (e.g. from a Qt image to an RGB array)
+    and write them with ``writer`` in ``workers`` threads (a single one if
+    the writer needs frames in order).
+
+    At most ``max_pending`` frames wait to be written at any time, so that
+    rendering doesn't get too far ahead of encoding: `full` tells whether to
+    wait before submitting more frames. ``on_written`` is called (in a worker
+    thread) after each frame is written.
+    """
+
+    def __init__(self, writer, convert=None, workers=None, max_pending=None, on_written=None):
+        self.writer = writer
+        self.convert = convert
+        if writer.ordered:
+            workers = 1
+        elif workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or 2 * workers
+        self.on_written = on_written
+        self.error = None
+        self.written = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._start = None
+        self._stop = None
+        self._closed = False
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @property
+    def full(self):
+        return self._pending >= self.max_pending
+
+    def submit(self, index, frame):
+        """
+        Queue ``frame`` to be converted and written as frame ``index``.
+        """
+        if self._start is None:
+            self._start = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        self._executor.submit(self._write, index, frame)
+
+    def _write(self, index, frame):
+        try:
+            if self.error is None:
+                if self.convert is not None:
+                    frame = self.convert(frame)
+                self.writer.write(index, frame)
+                with self._lock:
+                    self.written += 1
+                    self._stop = time.perf_counter()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            with self._lock:
+                self._pending -= 1
+            if self.on_written is not None:
+                self.on_written()
+
+    def close(self):
+        """
+        Wait for the frames queued to be written, close the writer, and
+        return the `RenderStats`. If writing a frame failed, the error is
+        raised instead.
+        """
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+            self.writer.close()
+        if self.error is not None:
+            raise self.error
+        seconds = 0. if self._stop is None else self._stop - self._start
+        return RenderStats(self.written, seconds)
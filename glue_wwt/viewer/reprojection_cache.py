@@ -0,0 +1,285 @@
+"""
+Persistent on-disk cache of images reprojected for display in WWT.
+
+pywwt reprojects every image it is given onto an ICRS/TAN grid before sending
+it to the frontend. For images whose WCS is already ICRS/TAN this is cheap,
+but for other frames, projections or distortions the reprojection dominates
+the time taken to show the layer. We therefore do the expensive reprojection
+ourselves (using the same target grid as pywwt) and keep the result on disk,
+so that the same image is only reprojected once per machine.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from astropy.wcs import WCS
+
+from glue.config import CFG_DIR
+from glue.logger import logger
+
+__all__ = ['ReprojectionCache', 'is_native_wcs', 'prepare_image_for_wwt',
+           'nearest_pixel_map', 'apply_pixel_map', 'REPROJECTION_CACHE']
+
+DEFAULT_CACHE_DIR = os.path.join(CFG_DIR, 'wwt', 'reprojection')
+
+# Maximum total size of the files in the cache, in bytes
+DEFAULT_MAX_SIZE = 1024 ** 3
+
+CACHE_EXTENSION = '.npz'
+
+# The number of pixel maps kept in memory by nearest_pixel_map
+MAX_PIXEL_MAPS = 4
+
+
+def is_native_wcs(wcs):
+    """
+    Whether an image with this WCS can be shown by WWT without any change of
+    celestial frame, projection or distortion.
+    """
+    if wcs.naxis != 2 or not wcs.has_celestial:
+        return False
+    if tuple(wcs.wcs.ctype) != ('RA---TAN', 'DEC--TAN'):
+        return False
+    if wcs.wcs.radesys.strip() != 'ICRS':
+        return False
+    return wcs.sip is None and wcs.cpdis1 is None and wcs.cpdis2 is None and wcs.det2im1 is None
+
+
+def _hash_array(hasher, array):
+    array = np.ascontiguousarray(array)
+    hasher.update(str(array.dtype).encode('ascii'))
+    hasher.update(str(array.shape).encode('ascii'))
+    hasher.update(array.view(np.uint8).ravel())
+
+
+class ReprojectionCache(object):
+    """
+    A size-bounded cache of reprojected images, stored as one ``.npz`` file
+    per image and evicted in least-recently-used order.
+
+    Parameters
+    ----------
+    directory : str, optional
+        The directory in which to store the cached images.
+    max_size : int, optional
+        The maximum total size of the cached files, in bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    @staticmethod
+    def key(data, wcs_in, wcs_out, order='bilinear'):
+        """
+        Return the cache key for ``data`` with WCS ``wcs_in`` reprojected onto
+        ``wcs_out``.
+        """
+        hasher = hashlib.sha256()
+        _hash_array(hasher, data)
+        hasher.update(wcs_in.to_header_string(relax=True).encode('ascii'))
+        hasher.update(wcs_out.to_header_string(relax=True).encode('ascii'))
+        hasher.update(order.encode('ascii'))
+        return hasher.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_EXTENSION)
+
+    def get(self, key):
+        """
+        Return the ``(array, wcs)`` tuple stored under ``key``, or `None` if
+        there is no such entry.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as contents:
+                array = contents['array']
+                header = str(contents['header'])
+        except (OSError, KeyError, ValueError):
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return array, WCS(header)
+
+    def put(self, key, array, wcs):
+        """
+        Store ``array`` and ``wcs`` under ``key``, evicting the least recently
+        used entries if the cache grows beyond ``max_size``.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temporary file first so that other processes never
+            # see a partially written entry.
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, array=array, header=wcs.to_header_string(relax=True))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            logger.warning("Could not write reprojected image to the WWT cache in %s", self.directory)
+            return
+        self.evict()
+
+    def entries(self):
+        """
+        Return a list of ``(path, size, last_used)`` tuples for all entries,
+        least recently used first.
+        """
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(CACHE_EXTENSION):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    @property
+    def size(self):
+        """
+        The total size of the cached files, in bytes.
+        """
+        return sum(entry[1] for entry in self.entries())
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in ``max_size``.
+        """
+        entries = self.entries()
+        total = sum(entry[1] for entry in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+REPROJECTION_CACHE = ReprojectionCache()
+
+
+def prepare_image_for_wwt(data, wcs, cache=REPROJECTION_CACHE, order='bilinear'):
+    """
+    Return an ``(array, wcs)`` tuple for ``data`` that pywwt can show without
+    an expensive reprojection, using ``cache`` to avoid repeating work. If
+    ``cache`` is `None`, the reprojected image is not cached.
+
+    If the WCS is already native to WWT, or if the reproject package is not
+    available, the input is returned unchanged.
+    """
+
+    if is_native_wcs(wcs):
+        return data, wcs
+
+    try:
+        from astropy.coordinates import ICRS
+        from reproject import reproject_interp
+        from reproject.mosaicking import find_optimal_celestial_wcs
+    except ImportError:
+        return data, wcs
+
+    wcs_in = wcs.celestial
+    wcs_out, shape_out = find_optimal_celestial_wcs([(data, wcs_in)], frame=ICRS(), projection='TAN')
+
+    if cache is not None:
+        key = cache.key(data, wcs_in, wcs_out, order=order)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    array = reproject_interp((data, wcs_in), wcs_out, shape_out=shape_out,
+                             order=order, return_footprint=False)
+    # This matches the precision that pywwt uses for the images it sends
+    array = array.astype(np.float32)
+
+    if cache is not None:
+        cache.put(key, array, wcs_out)
+
+    return array, wcs_out
+
+
+_PIXEL_MAPS = OrderedDict()
+
+
+def nearest_pixel_map(wcs, shape):
+    """
+    Return a ``(wcs, index)`` tuple describing the grid on which an image of
+    this ``shape`` and WCS is shown in WWT (the one `prepare_image_for_wwt`
+    reprojects it onto), where ``index`` gives the flat index of the nearest
+    pixel of the image for each pixel of the grid, or -1 outside the image.
+
+    Arrays defined on the image, such as subset masks, can then be put on the
+    same grid with `apply_pixel_map` rather than being reprojected. ``index``
+    is `None` if the image doesn't need to be reprojected (or if reproject is
+    not available). Maps are computed once and kept in memory.
+    """
+
+    if is_native_wcs(wcs):
+        return wcs, None
+
+    try:
+        from astropy.coordinates import ICRS
+        from reproject import reproject_interp
+        from reproject.mosaicking import find_optimal_celestial_wcs
+    except ImportError:
+        return wcs, None
+
+    key = wcs.to_header_string(relax=True), tuple(shape)
+    if key in _PIXEL_MAPS:
+        _PIXEL_MAPS.move_to_end(key)
+        return _PIXEL_MAPS[key]
+
+    wcs_in = wcs.celestial
+    size = int(np.prod(shape))
+    indices = np.arange(size, dtype=float).reshape(shape)
+    wcs_out, shape_out = find_optimal_celestial_wcs([(indices, wcs_in)], frame=ICRS(), projection='TAN')
+    index = reproject_interp((indices, wcs_in), wcs_out, shape_out=shape_out,
+                             order='nearest-neighbor', return_footprint=False)
+    outside = np.isnan(index)
+    index[outside] = -1
+    index = index.astype(np.int32 if size < 2 ** 31 else np.int64)
+
+    _PIXEL_MAPS[key] = wcs_out, index
+    while len(_PIXEL_MAPS) > MAX_PIXEL_MAPS:
+        _PIXEL_MAPS.popitem(last=False)
+
+    return wcs_out, index
+
+
+def apply_pixel_map(array, index, fill=0):
+    """
+    Return ``array`` on the grid of a pixel map from `nearest_pixel_map`,
+    with ``fill`` outside of the original image.
+    """
+    if index is None:
+        return array
+    result = np.asarray(array).ravel()[np.maximum(index, 0)]
+    result[index < 0] = fill
+    return result
@@ -0,0 +1,93 @@
+"""
+Optional storage of prepared table layer payloads alongside session files.
+
+Preparing a table layer for WWT (transforming coordinates to ICRS, scaling
+altitudes, converting times) can be slow for large tables. If the
+``WWT_SESSION_PAYLOADS`` setting is enabled, the prepared columns are written
+to ``.npz`` files in a directory next to the session file when the session is
+saved, and are reused when the session is loaded again. Each payload is
+stored under a fingerprint of the data and settings that were used to prepare
+it, so a payload is only ever reused if nothing it depends on has changed.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from glue.config import settings
+from glue.logger import logger
+
+__all__ = ['SessionPayloads', 'payload_fingerprint', 'SESSION_PAYLOADS']
+
+settings.add('WWT_SESSION_PAYLOADS', False, validator=bool)
+
+# The directory, relative to the session file, in which payloads are stored
+PAYLOAD_DIRECTORY = 'wwt_payloads'
+
+
+def payload_fingerprint(column_keys):
+    """
+    Return a fingerprint for a payload made of columns with the given keys,
+    which describe the input data and how it was prepared (see
+    `~glue_wwt.viewer.column_store.ColumnStore`).
+    """
+    return hashlib.sha256(repr(sorted(column_keys.items())).encode('utf-8')).hexdigest()
+
+
+class SessionPayloads(object):
+    """
+    Keeps track of the payload files available for loading, by fingerprint.
+    """
+
+    def __init__(self):
+        self._paths = {}
+
+    def register(self, fingerprint, path):
+        """
+        Make the payload file at ``path`` available under ``fingerprint``.
+        """
+        self._paths[fingerprint] = os.path.abspath(path)
+
+    def load(self, fingerprint):
+        """
+        Return the columns stored under ``fingerprint``, or `None` if there is
+        no such payload or it cannot be read.
+        """
+        path = self._paths.get(fingerprint)
+        if path is None:
+            return None
+        try:
+            with np.load(path) as contents:
+                return dict((name, contents[name]) for name in contents.files)
+        except (OSError, ValueError):
+            logger.warning("Could not read WWT layer payload from %s", path)
+            self._paths.pop(fingerprint, None)
+            return None
+
+    def save(self, fingerprint, columns, directory=PAYLOAD_DIRECTORY):
+        """
+        Write ``columns`` to ``directory`` (relative to the current directory,
+        which is the session directory while a session is being saved) and
+        return the relative path of the file, or `None` if it could not be
+        written.
+        """
+        path = os.path.join(directory, fingerprint + '.npz')
+        if not os.path.exists(path):
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, **columns)
+                os.replace(tmp_path, path)
+            except OSError:
+                logger.warning("Could not write WWT layer payload to %s", directory)
+                return None
+        self.register(fingerprint, path)
+        return path
+
+
+SESSION_PAYLOADS = SessionPayloads()
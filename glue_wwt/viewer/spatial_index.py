@@ -0,0 +1,158 @@
+"""
+A spatial index of the positions of the rows of a WWT table layer.
+
+Positions are stored as unit vectors in a KD-tree, which makes it cheap to
+find the rows within some angle of a point (cone queries, e.g. for the field
+of view or for picking), and the rows are also sorted by latitude for box
+queries. An index is built once for the prepared coordinates of a layer and
+is shared through the column store, so it is reused by all the layers (and
+all the updates) that show the same coordinates.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+__all__ = ['SpatialIndex']
+
+
+def _unit_vectors(lon, lat):
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _tangent_basis(center):
+    # Unit vectors pointing east and north at ``center``
+    east = np.cross([0., 0., 1.], center)
+    if np.linalg.norm(east) < 1e-12:
+        east = np.array([0., 1., 0.])
+    east /= np.linalg.norm(east)
+    return east, np.cross(center, east)
+
+
+def _gnomonic(vectors, center):
+    # Project unit vectors on the plane tangent to the sphere at ``center``,
+    # where great circles become straight lines. Only valid for vectors in
+    # the hemisphere around ``center``.
+    east, north = _tangent_basis(center)
+    scale = 1 / (vectors @ center)
+    return (vectors @ east) * scale, (vectors @ north) * scale
+
+
+def _chord(radius):
+    # The distance between two unit vectors separated by ``radius`` degrees
+    return 2 * np.sin(np.radians(min(radius, 180)) / 2)
+
+
+class SpatialIndex(object):
+    """
+    An index of the positions given by ``lon`` and ``lat`` (in degrees).
+
+    Rows with non-finite coordinates are never returned by queries. All
+    queries return indices of rows of the original arrays, sorted in
+    increasing order.
+    """
+
+    def __init__(self, lon, lat):
+
+        from scipy.spatial import cKDTree
+
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+
+        self._size = len(lon)
+        self._rows = np.nonzero(np.isfinite(lon) & np.isfinite(lat))[0]
+        self._lon = lon[self._rows] % 360
+        self._lat = lat[self._rows]
+        # Unbalanced trees are much faster to build, and about as fast to query
+        self._tree = cKDTree(_unit_vectors(self._lon, self._lat),
+                             balanced_tree=False, compact_nodes=False)
+
+        # The latitude order is only computed for the first box query
+        self._lat_order = None
+        self._lat_sorted = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        """
+        An estimate of the memory used by the index, in bytes.
+        """
+        arrays = (self._rows, self._lon, self._lat, self._lat_order, self._lat_sorted)
+        # The tree holds a copy of the unit vectors and a permutation of rows
+        tree = len(self._rows) * (3 * 8 + 8)
+        return sum(array.nbytes for array in arrays if array is not None) + tree
+
+    def cone(self, lon, lat, radius):
+        """
+        Return the rows within ``radius`` degrees of ``(lon, lat)``.
+        """
+        if radius >= 180:
+            return self._rows.copy()
+        center = _unit_vectors(lon, lat)
+        found = self._tree.query_ball_point(center, _chord(radius))
+        return np.sort(self._rows[np.asarray(found, dtype=int)])
+
+    def box(self, lon_min, lon_max, lat_min, lat_max):
+        """
+        Return the rows with ``lat_min <= lat <= lat_max`` and a longitude
+        between ``lon_min`` and ``lon_max``, going east. The longitude range
+        wraps around if ``lon_min`` is larger than ``lon_max`` (modulo 360),
+        e.g. ``box(350, 10, ...)`` spans 20 degrees around longitude 0.
+        """
+        if self._lat_order is None:
+            self._lat_order = np.argsort(self._lat, kind='stable')
+            self._lat_sorted = self._lat[self._lat_order]
+        start = np.searchsorted(self._lat_sorted, lat_min, side='left')
+        stop = np.searchsorted(self._lat_sorted, lat_max, side='right')
+        candidates = self._lat_order[start:stop]
+        if lon_max - lon_min < 360:
+            offset = (self._lon[candidates] - lon_min) % 360
+            candidates = candidates[offset <= (lon_max - lon_min) % 360]
+        return np.sort(self._rows[candidates])
+
+    def polygon(self, lon, lat):
+        """
+        Return the rows inside the spherical polygon with vertices ``lon`` and
+        ``lat`` (in degrees), whose edges are great circle arcs. The polygon
+        has to fit in a hemisphere.
+        """
+
+        from glue.utils.geometry import points_inside_poly
+
+        vertices = _unit_vectors(np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))
+        center = vertices.sum(axis=0)
+        if np.linalg.norm(center) < 1e-12:
+            raise ValueError("Polygon has to fit in a hemisphere")
+        center /= np.linalg.norm(center)
+
+        # All the points inside the polygon are within the cone that contains
+        # its vertices, so we only need to test the rows in that cone.
+        cos_radius = (vertices @ center).min()
+        if cos_radius <= 0:
+            raise ValueError("Polygon has to fit in a hemisphere")
+        radius = np.degrees(np.arccos(cos_radius))
+        found = np.asarray(self._tree.query_ball_point(center, _chord(radius) * (1 + 1e-9)), dtype=int)
+        if len(found) == 0:
+            return found
+
+        x, y = _gnomonic(self._tree.data[found], center)
+        vx, vy = _gnomonic(vertices, center)
+        return np.sort(self._rows[found[points_inside_poly(x, y, vx, vy)]])
+
+    def nearest(self, lon, lat, max_radius=None):
+        """
+        Return the row closest to ``(lon, lat)``, or `None` if there are no
+        rows within ``max_radius`` degrees (if given).
+        """
+        if len(self._rows) == 0:
+            return None
+        bound = np.inf if max_radius is None else _chord(max_radius)
+        distance, index = self._tree.query(_unit_vectors(lon, lat), distance_upper_bound=bound)
+        if not np.isfinite(distance):
+            return None
+        return int(self._rows[index])
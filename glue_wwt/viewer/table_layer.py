@@ -1,12 +1,15 @@
 from __future__ import absolute_import, division, print_function
 
+from .column_store import COLUMN_STORE, array_key
+from .session_payloads import SESSION_PAYLOADS, payload_fingerprint
+from .spatial_index import SpatialIndex
 from .utils import center_fov
 from .viewer_state import MODES_3D
 
-from datetime import datetime
+from datetime import datetime, timezone
 import random
 
-from glue.config import colormaps
+from glue.config import colormaps, settings
 from glue.core.data_combo_helper import ComponentIDComboHelper
 from glue.core.exceptions import IncompatibleAttribute
 from glue.core.state_objects import StateAttributeLimitsHelper
@@ -19,19 +22,43 @@ from glue.viewers.common.state import LayerState
 
 from astropy import units as u
 from astropy.coordinates import SkyCoord
+try:
+    from astropy.coordinates import angular_separation
+except ImportError:
+    from astropy.coordinates.angle_utilities import angular_separation
 from astropy.table import Table
 
-from numpy import datetime_as_string, size
+from numpy import asarray, degrees, empty, isnan, isnat, nonzero, radians, size, zeros
 
 
 __all__ = ['WWTTableLayerArtist']
 
 
+# The maximum number of layers that each artist keeps hidden for modes other
+# than the current one
+MAX_PARKED_LAYERS = 2
+
+# pywwt can only replace the whole table of a layer, so rows appended to a
+# table are shown in a second WWT layer with the same settings, which only
+# holds these rows. This layer is merged into the main one (sending the whole
+# table again) once it holds more than this fraction of the rows of the main
+# layer, so that appending rows one at a time doesn't send them all each time.
+MAX_TAIL_FRACTION = 0.25
+
 RESET_TABLE_PROPERTIES = ('mode', 'frame', 'lon_att', 'lat_att', 'alt_att',
                           'alt_unit', 'size_att', 'cmap_att', 'size_mode',
                           'color_mode', 'time_series', 'time_att')
 
 
+def utc_datetimes(times):
+    """
+    Return an object array of timezone-aware datetimes for ``times``.
+    """
+    values = empty(len(times), dtype=object)
+    values[:] = [time.replace(tzinfo=timezone.utc) for time in times.astype(datetime)]
+    return values
+
+
 class WWTTableLayerState(LayerState):
     """
     A state object for WWT layers
@@ -153,14 +180,33 @@ class WWTTableLayerArtist(LayerArtist):
     _layer_state_cls = WWTTableLayerState
     _removed = False
 
-    def __init__(self, viewer_state, wwt_client=None, layer_state=None, layer=None):
+    def __init__(self, viewer_state, wwt_client=None, layer_state=None, layer=None, deferred=False):
         super(WWTTableLayerArtist, self).__init__(viewer_state,
                                                   layer_state=layer_state,
                                                   layer=layer)
 
         self.wwt_layer = None
+        self._deferred = deferred
         self._coords = [], []
 
+        # The keys and prepared columns of the table shown in WWT, the keys
+        # under which the columns are held in the column store, and the keys
+        # of the input arrays they were prepared from along with the arrays
+        self._payload = None
+        self._column_keys = []
+        self._inputs = {}
+        self._row_update_count = 0
+
+        # The WWT layer showing the rows appended since the main layer was
+        # last sent, and the number of rows in the main layer
+        self._tail_layer = None
+        self._main_rows = 0
+
+        # The reference frame of the layer shown, and the layers kept hidden
+        # for the other reference frames, keyed by reference frame
+        self._ref_frame = None
+        self._parked = {}
+
         self.layer_id = "{0:08x}".format(random.getrandbits(32))
         self.wwt_client = wwt_client
 
@@ -173,37 +219,150 @@ class WWTTableLayerArtist(LayerArtist):
         self._update_presentation(force=True)
 
     def clear(self):
+        if self._tail_layer is not None:
+            self._tail_layer.remove()
+            self._tail_layer = None
         if self.wwt_layer is not None:
             self.wwt_layer.remove()
             self.wwt_layer = None
             self._coords = [], []
+            self._payload = None
+        for key in self._column_keys:
+            COLUMN_STORE.release(key)
+        self._column_keys = []
 
     def remove(self):
         self._removed = True
         self.clear()
+        self._discard_parked()
+
+    def _park(self):
+        """
+        Hide the current WWT layer and keep it, along with its prepared
+        columns, so that it can be shown again if we come back to its mode.
+        """
+        if self._tail_layer is not None:
+            self._merge_tail(self._payload[1])
+        self.wwt_layer.opacity = 0
+        self.wwt_layer.selectable = False
+        if self._ref_frame in self._parked:
+            self._discard(self._parked.pop(self._ref_frame))
+        self._parked[self._ref_frame] = (self.wwt_layer, self._coords, self._payload,
+                                         self._column_keys, self._inputs)
+        while len(self._parked) > MAX_PARKED_LAYERS:
+            self._discard(self._parked.pop(next(iter(self._parked))))
+        self.wwt_layer = None
+        self._coords = [], []
+        self._payload = None
+        self._column_keys = []
+
+    def _unpark(self, arrays, ref_frame):
+        """
+        Show the layer parked for ``ref_frame`` again if it is still up to
+        date with ``arrays``. Returns `True` if this was possible.
+        """
+        parked = self._parked.pop(ref_frame, None)
+        if parked is None:
+            return False
+        column_keys, _ = self._column_keys_for(arrays, ref_frame)
+        if column_keys != parked[2][0]:
+            self._discard(parked)
+            return False
+        self.wwt_layer, self._coords, self._payload, self._column_keys, self._inputs = parked
+        self.wwt_layer.selectable = True
+        self._main_rows = len(self._coords[0])
+        self._ref_frame = ref_frame
+        return True
+
+    def _discard(self, parked):
+        parked[0].remove()
+        for key in parked[3]:
+            COLUMN_STORE.release(key)
+
+    def _discard_parked(self):
+        while self._parked:
+            self._discard(self._parked.popitem()[1])
+
+    def _derived(self, name, factory):
+        """
+        Return a value derived from the prepared coordinates, which is computed
+        by ``factory`` and acquired from the column store the first time it is
+        needed, and released along with the coordinates.
+        """
+        if self._payload is None:
+            return None
+        coords_key = next(key for key in self._column_keys if key[0] == 'coords')
+        key = (name,) + coords_key[1:]
+        if key in self._column_keys:
+            return COLUMN_STORE.get(key)
+        value = COLUMN_STORE.acquire(key, factory)
+        self._column_keys.append(key)
+        return value
+
+    @property
+    def spatial_index(self):
+        """
+        A `~glue_wwt.viewer.spatial_index.SpatialIndex` of the rows of this
+        layer, in the coordinates shown in WWT (ICRS in the sky and 3D modes),
+        or `None` if the layer isn't shown. The index is built the first time
+        it is needed and kept until the coordinates change.
+        """
+        return self._derived('index', lambda: SpatialIndex(*self._coords))
+
+    def pick(self, lon, lat, max_radius=None):
+        """
+        Return a ``(row, separation)`` tuple for the row of this layer closest
+        to ``(lon, lat)``, in the coordinates shown in WWT, and its separation
+        in degrees, or `None` if there are no rows within ``max_radius``
+        degrees (if given).
+        """
+        index = self.spatial_index
+        if index is None:
+            return None
+        row = index.nearest(lon, lat, max_radius=max_radius)
+        if row is None:
+            return None
+        separation = angular_separation(*radians([lon, lat, self._coords[0][row], self._coords[1][row]]))
+        return row, float(degrees(separation))
+
+    def materialize(self):
+        """
+        Create the WWT layer if this was deferred until the viewer is shown.
+        """
+        if self._deferred:
+            self._deferred = False
+            self._update_presentation(force=True)
 
     def _update_presentation(self, force=False, **kwargs):
-        if self._removed:
+        if self._removed or self._deferred:
             return
 
-        changed = set() if force else self.pop_changed_properties()
+        # The changed properties are also popped when forcing an update, so
+        # that the next update only sees what changed since this one (which
+        # matters to decide whether parked layers are still valid).
+        changed = self.pop_changed_properties()
 
         if self._viewer_state.lon_att is None or self._viewer_state.lat_att is None:
-            if self.wwt_layer is not None:
-                self.wwt_layer.remove()
-                self.wwt_layer = None
+            self.clear()
+            self._discard_parked()
             return
 
         logger.debug("updating WWT for table %s" % self.layer.label)
 
         if self.visible is False:
-            if self.wwt_layer is not None:
-                self.wwt_layer.remove()
-                self.wwt_layer = None
+            self.clear()
+            self._discard_parked()
             return
 
+        # Layers are parked rather than removed when the mode changes, so that
+        # switching back to a mode doesn't require sending the data again.
+        if 'mode' in changed and self.wwt_layer is not None:
+            self._park()
+
+        if any(x in changed for x in RESET_TABLE_PROPERTIES if x != 'mode'):
+            self._discard_parked()
+
         if force or 'mode' in changed or self.wwt_layer is None:
-            self.clear()
             force = True
 
         # FIXME: kpc isn't yet a valid unit in WWT/PyWWT:
@@ -212,59 +371,9 @@ class WWTTableLayerArtist(LayerArtist):
         # unit changes we need to refresh the data just in case
 
         if force or any(x in changed for x in RESET_TABLE_PROPERTIES):
-            try:
-                lon = self.layer[self._viewer_state.lon_att]
-            except IncompatibleAttribute:
-                self.disable_invalid_attributes(self._viewer_state.lon_att)
-                return
-
-            try:
-                lat = self.layer[self._viewer_state.lat_att]
-            except IncompatibleAttribute:
-                self.disable_invalid_attributes(self._viewer_state.lat_att)
-                return
-
-            if self._viewer_state.alt_att is not None:
-                try:
-                    alt = self.layer[self._viewer_state.alt_att]
-                except IncompatibleAttribute:
-                    self.disable_invalid_attributes(self._viewer_state.alt_att)
-                    return
-
-            if self.state.size_mode == 'Linear' and self.state.size_att is not None:
-                try:
-                    size_values = self.layer[self.state.size_att]
-                except IncompatibleAttribute:
-                    self.disable_invalid_attributes(self.state.size_att)
-                    return
-            else:
-                size_values = None
-
-            if self.state.color_mode == 'Linear' and self.state.cmap_att is not None:
-                try:
-                    cmap_values = self.layer[self.state.cmap_att]
-                except IncompatibleAttribute:
-                    self.disable_invalid_attributes(self.state.cmap_att)
-                    return
-            else:
-                cmap_values = None
-
-            if self.state.time_series and self.state.time_att is not None:
-                try:
-                    # Providing datetime objects as the time values offers noticeably better performance
-                    # than either datetime strings or astropy Time objects.
-                    # This is likely due to the time attribute value validation in pywwt
-                    time_values = [datetime.fromisoformat(datetime_as_string(t, unit='s', timezone='UTC'))
-                                   for t in self.layer[self.state.time_att]]
-                except IncompatibleAttribute:
-                    self.disable_invalid_attributes(self.state.time_att)
-                    return
-            else:
-                time_values = None
 
-            self.clear()
-
-            if not len(lon):
+            arrays = self._get_input_arrays()
+            if arrays is None:
                 return
 
             if self._viewer_state.mode in MODES_3D:
@@ -272,115 +381,453 @@ class WWTTableLayerArtist(LayerArtist):
             else:
                 ref_frame = self._viewer_state.mode
 
-            if ref_frame == 'Sky':
+            if self.wwt_layer is None and self._unpark(arrays, ref_frame):
+                logger.debug("showing parked WWT layer for table %s" % self.layer.label)
+            else:
+                # The previous columns are only released once the new ones have
+                # been acquired, so that unchanged columns are not prepared again.
+                previous_keys, self._column_keys = self._column_keys, []
                 try:
-                    coord = SkyCoord(lon, lat, unit=u.deg,
-                                     frame=self._viewer_state.frame.lower()).icrs
-                except Exception:
-                    if size(lat) < 5:
-                        angle_info = f"{lat}"
-                    else:
-                        angle_info = f"{lat.min()} deg <= angle <= {lat.max()} deg"
-                    disable_msg = f"Latitude angle(s) must be within -90 deg <= angle <= 90 deg, got {angle_info}"
-                    self.disable(disable_msg)
-                    return
+                    self.clear()
 
-                lon = coord.spherical.lon.degree
-                lat = coord.spherical.lat.degree
+                    if not len(arrays['lon']):
+                        return
 
-            # FIXME: kpc isn't yet a valid unit in WWT/PyWWT:
-            # https://github.com/WorldWideTelescope/wwt-web-client/pull/197
-            # for now we set unit to pc and scale values accordingly
-            if self._viewer_state.alt_att is not None and self._viewer_state.alt_unit == 'kpc':
-                alt = alt * 1000
+                    payload = self._prepare_columns(arrays, ref_frame)
+                finally:
+                    for key in previous_keys:
+                        COLUMN_STORE.release(key)
 
-            data_kwargs = {}
+                if payload is None:
+                    return
+                columns = payload[1]
 
-            tab = Table()
+                tab, data_kwargs = self._build_table(columns)
 
-            tab['lon'] = lon * u.degree
-            tab['lat'] = lat * u.degree
+                self.wwt_layer = self.wwt_client.layers.add_table_layer(tab, frame=ref_frame,
+                                                                        lon_att='lon', lat_att='lat',
+                                                                        selectable=True,
+                                                                        **data_kwargs)
 
-            if self._viewer_state.alt_att is not None:
-                # FIXME: allow arbitrary units
-                tab['alt'] = alt
-                data_kwargs['alt_att'] = 'alt'
+                self._coords = columns['lon'], columns['lat']
+                self._payload = payload
+                self._ref_frame = ref_frame
+                self._main_rows = len(columns['lon'])
 
-            if size_values is not None:
-                tab['size'] = size_values
-                data_kwargs['size_att'] = 'size'
+            self.wwt_layer.far_side_visible = self._viewer_state.mode in MODES_3D
 
-            if cmap_values is not None:
-                tab['cmap'] = cmap_values
-                data_kwargs['cmap_att'] = 'cmap'
+            force = True
 
-            if time_values is not None:
-                tab['time'] = time_values
-                data_kwargs['time_series'] = self.state.time_series
-                data_kwargs['time_att'] = 'time'
+        for wwt_layer in (self.wwt_layer, self._tail_layer):
+            if wwt_layer is not None:
+                self._update_style(wwt_layer, changed, force)
 
-            self.wwt_layer = self.wwt_client.layers.add_table_layer(tab, frame=ref_frame,
-                                                                    lon_att='lon', lat_att='lat',
-                                                                    selectable=False,
-                                                                    **data_kwargs)
-            self.wwt_layer.far_side_visible = self._viewer_state.mode in MODES_3D
+        self.enable()
 
-            self._coords = lon, lat
+        # TODO: deal with visible, zorder, frame
 
-            force = True
+    def _update_style(self, wwt_layer, changed, force=False):
+        """
+        Update the settings of ``wwt_layer`` that changed (or all of them if
+        ``force`` is set).
+        """
 
         if force or 'alt_unit' in changed:
             # FIXME: kpc isn't yet a valid unit in WWT/PyWWT:
             # https://github.com/WorldWideTelescope/wwt-web-client/pull/197
             # for now we set unit to pc and scale values accordingly
             if self._viewer_state.alt_unit == 'kpc':
-                self.wwt_layer.alt_unit = u.pc
+                wwt_layer.alt_unit = u.pc
             else:
-                self.wwt_layer.alt_unit = self._viewer_state.alt_unit
+                wwt_layer.alt_unit = self._viewer_state.alt_unit
 
         if force or 'alt_type' in changed:
-            self.wwt_layer.alt_type = self._viewer_state.alt_type.lower()
+            wwt_layer.alt_type = self._viewer_state.alt_type.lower()
 
         if force or 'size' in changed or 'size_mode' in changed or 'size_scaling' in changed:
             if self.state.size_mode == 'Linear':
-                self.wwt_layer.size_scale = self.state.size_scaling
+                wwt_layer.size_scale = self.state.size_scaling
             else:
-                self.wwt_layer.size_scale = self.state.size * 5 * self.state.size_scaling
+                wwt_layer.size_scale = self.state.size * 5 * self.state.size_scaling
 
         if force or 'color' in changed:
-            self.wwt_layer.color = self.state.color
+            wwt_layer.color = self.state.color
 
         if force or 'alpha' in changed:
-            self.wwt_layer.opacity = self.state.alpha
+            wwt_layer.opacity = self.state.alpha
 
         if force or 'size_vmin' in changed:
-            self.wwt_layer.size_vmin = self.state.size_vmin
+            wwt_layer.size_vmin = self.state.size_vmin
 
         if force or 'size_vmax' in changed:
-            self.wwt_layer.size_vmax = self.state.size_vmax
+            wwt_layer.size_vmax = self.state.size_vmax
 
         if force or 'cmap_vmin' in changed:
-            self.wwt_layer.cmap_vmin = self.state.cmap_vmin
+            wwt_layer.cmap_vmin = self.state.cmap_vmin
 
         if force or 'cmap_vmax' in changed:
-            self.wwt_layer.cmap_vmax = self.state.cmap_vmax
+            wwt_layer.cmap_vmax = self.state.cmap_vmax
 
         if force or 'cmap' in changed:
-            self.wwt_layer.cmap = self.state.cmap
+            wwt_layer.cmap = self.state.cmap
 
         if force or 'time_decay_value' in changed or 'time_decay_unit' in changed:
-            self.wwt_layer.time_decay = self.state.time_decay_value * self.state.time_decay_unit
-
-        self.enable()
-
-        # TODO: deal with visible, zorder, frame
+            wwt_layer.time_decay = self.state.time_decay_value * self.state.time_decay_unit
+
+    def _input_attributes(self):
+        """
+        Return the attributes the columns of the table shown in WWT are
+        prepared from, or `None` for the columns that are not shown.
+        """
+
+        attributes = {'lon': self._viewer_state.lon_att,
+                      'lat': self._viewer_state.lat_att,
+                      'alt': self._viewer_state.alt_att,
+                      'size': None, 'cmap': None, 'time': None}
+
+        if self.state.size_mode == 'Linear':
+            attributes['size'] = self.state.size_att
+        if self.state.color_mode == 'Linear':
+            attributes['cmap'] = self.state.cmap_att
+        if self.state.time_series:
+            attributes['time'] = self.state.time_att
+
+        return attributes
+
+    def _get_input_arrays(self):
+        """
+        Return the arrays needed to build the table shown in WWT, or `None`
+        if one of the attributes is not valid for this layer.
+        """
+
+        arrays = {}
+        for name, att in self._input_attributes().items():
+            if att is None:
+                arrays[name] = None
+                continue
+            try:
+                arrays[name] = self.layer[att]
+            except IncompatibleAttribute:
+                self.disable_invalid_attributes(att)
+                return None
+
+        return arrays
+
+    def _input_keys(self, arrays):
+        """
+        Return the keys identifying the given input arrays in the column store.
+        """
+        attributes = self._input_attributes()
+        return dict((name, COLUMN_STORE.input_key(self.layer, attributes[name], array))
+                    for name, array in arrays.items() if array is not None)
+
+    def _column_keys_for(self, arrays, ref_frame, input_keys=None):
+        """
+        Return the keys of the prepared columns for the given input arrays,
+        along with the keys of the input arrays (see `_input_keys`, unless
+        other ``input_keys`` are given).
+        """
+
+        if input_keys is None:
+            input_keys = self._input_keys(arrays)
+
+        column_keys = {'coords': ('coords', input_keys['lon'], input_keys['lat'],
+                                  ref_frame, self._viewer_state.frame)}
+        if 'alt' in input_keys:
+            column_keys['alt'] = ('alt', input_keys['alt'], self._viewer_state.alt_unit)
+        for name in ('size', 'cmap', 'time'):
+            if name in input_keys:
+                column_keys[name] = (name, input_keys[name])
+
+        return column_keys, input_keys
+
+    def _fingerprint(self, arrays, ref_frame):
+        """
+        Return the fingerprint of the payload prepared from ``arrays``, which
+        depends on their contents so that it stays valid between sessions.
+        """
+        input_keys = dict((name, array_key(array)) for name, array in arrays.items() if array is not None)
+        return payload_fingerprint(self._column_keys_for(arrays, ref_frame, input_keys=input_keys)[0])
+
+    def session_payload(self):
+        """
+        Return a ``(fingerprint, columns)`` tuple with the columns of the table
+        shown in WWT, to save along with a session, or `None` if there is no
+        table shown.
+        """
+        if self._payload is None:
+            return None
+        arrays = dict((name, array) for name, (_, array) in self._inputs.items())
+        return self._fingerprint(arrays, self._ref_frame), self._payload[1]
+
+    def _compute_column(self, name, arrays, ref_frame):
+        if name == 'coords':
+            return self._transform_coords(arrays['lon'], arrays['lat'], ref_frame)
+        elif name == 'alt' and self._viewer_state.alt_unit == 'kpc':
+            # FIXME: kpc isn't yet a valid unit in WWT/PyWWT:
+            # https://github.com/WorldWideTelescope/wwt-web-client/pull/197
+            # for now we set unit to pc and scale values accordingly
+            return arrays['alt'] * 1000
+        elif name == 'time':
+            return asarray(arrays['time']).astype('datetime64[s]')
+        else:
+            return asarray(arrays[name])
+
+    def _prepare_columns(self, arrays, ref_frame, rows=None):
+        """
+        Return a ``(column_keys, columns)`` tuple with the columns of the table
+        to show in WWT, or `None` if the coordinates are not valid.
+
+        Columns are acquired from the shared column store (and recorded in
+        ``_column_keys`` so that they can be released), so columns that were
+        already prepared for another layer are reused. If the
+        ``WWT_SESSION_PAYLOADS`` setting is enabled, columns saved with a
+        previous session are also reused if their fingerprint matches.
+
+        If ``rows`` is given, only these rows are prepared, and the other rows
+        are taken from the columns that are currently shown.
+        """
+
+        column_keys, input_keys = self._column_keys_for(arrays, ref_frame)
+
+        saved = None
+        if rows is None and settings.WWT_SESSION_PAYLOADS:
+            saved = SESSION_PAYLOADS.load(self._fingerprint(arrays, ref_frame))
+        previous = None if self._payload is None else self._payload[1]
+
+        def splice(old, new_rows):
+            column = empty(len(arrays['lon']), dtype=old.dtype)
+            column[:len(old)] = old
+            column[rows] = new_rows
+            return column
+
+        def prepare(name):
+            if saved is not None:
+                if name == 'coords':
+                    return saved['lon'], saved['lat']
+                return saved[name]
+            if rows is None:
+                return self._compute_column(name, arrays, ref_frame)
+            subset = dict((key, None if array is None else asarray(array)[rows])
+                          for key, array in arrays.items())
+            values = self._compute_column(name, subset, ref_frame)
+            if name == 'coords':
+                return splice(previous['lon'], values[0]), splice(previous['lat'], values[1])
+            return splice(previous[name], values)
+
+        columns = {}
+        for name, key in column_keys.items():
+            try:
+                value = COLUMN_STORE.acquire(key, lambda: prepare(name))
+            except ValueError as exc:
+                self.disable(str(exc))
+                return None
+            self._column_keys.append(key)
+            if name == 'coords':
+                columns['lon'], columns['lat'] = value
+            else:
+                columns[name] = value
+
+        if 'time' in columns:
+            # The time values sent to pywwt are kept along with the time
+            # column, and after a row update only the new rows are converted
+            key = ('time_values',) + column_keys['time'][1:]
+            previous_values = None
+            if rows is not None and 'time' in self._inputs:
+                previous_values = COLUMN_STORE.get(('time_values', self._inputs['time'][0]))
+
+            def convert():
+                if previous_values is None:
+                    return utc_datetimes(columns['time'])
+                return splice(previous_values, utc_datetimes(columns['time'][rows]))
+
+            COLUMN_STORE.acquire(key, convert)
+            self._column_keys.append(key)
+
+        self._inputs = dict((name, (key, arrays[name])) for name, key in input_keys.items())
+
+        return column_keys, columns
+
+    def _build_table(self, columns, start=0):
+        """
+        Return the table to send to WWT for the given prepared columns (from
+        row ``start`` on), and the keyword arguments describing its columns.
+        """
+
+        data_kwargs = {}
+        columns = dict((name, column[start:]) for name, column in columns.items())
+
+        # The table shares its memory with the column store
+        tab = Table([columns['lon'], columns['lat']], names=['lon', 'lat'], copy=False)
+        tab['lon'].unit = u.degree
+        tab['lat'].unit = u.degree
+
+        if 'alt' in columns:
+            # FIXME: allow arbitrary units
+            tab['alt'] = columns['alt']
+            data_kwargs['alt_att'] = 'alt'
+
+        if 'size' in columns:
+            tab['size'] = columns['size']
+            data_kwargs['size_att'] = 'size'
+
+        if 'cmap' in columns:
+            tab['cmap'] = columns['cmap']
+            data_kwargs['cmap_att'] = 'cmap'
+
+        if 'time' in columns:
+            # Providing datetime objects as the time values offers noticeably better performance
+            # than either datetime strings or astropy Time objects.
+            # This is likely due to the time attribute value validation in pywwt
+            key = next(key for key in self._column_keys if key[0] == 'time_values')
+            tab['time'] = COLUMN_STORE.get(key)[start:]
+            data_kwargs['time_series'] = self.state.time_series
+            data_kwargs['time_att'] = 'time'
+
+        return tab, data_kwargs
+
+    def _changed_rows(self, arrays):
+        """
+        Return the indices of the rows of ``arrays`` that differ from the
+        arrays currently shown, or `None` if rows were removed or the columns
+        changed, in which case the table has to be rebuilt.
+        """
+
+        n_old = len(self._coords[0])
+        n_new = len(arrays['lon'])
+        if n_new < n_old:
+            return None
+
+        present = set(name for name, array in arrays.items() if array is not None)
+        if present != set(self._inputs):
+            return None
+
+        input_keys = self._input_keys(arrays)
+
+        changed = zeros(n_new, dtype=bool)
+        changed[n_old:] = True
+        for name in present:
+            key, old = self._inputs[name]
+            if input_keys[name] == key:
+                continue
+            new = asarray(arrays[name])
+            if new is old:
+                # The values were changed in place, so we can't tell which
+                changed[:] = True
+                break
+            old = asarray(old)
+            if new.dtype != old.dtype:
+                return None
+            new = new[:n_old]
+            differs = old != new
+            if old.dtype.kind in 'fc':
+                differs &= ~(isnan(old) & isnan(new))
+            elif old.dtype.kind in 'mM':
+                differs &= ~(isnat(old) & isnat(new))
+            changed[:n_old] |= differs
+
+        return nonzero(changed)[0]
+
+    def _update_rows(self):
+        """
+        Update the WWT layer after the data changed, only preparing the rows
+        that were appended or modified. Returns `False` if the table has to
+        be rebuilt instead.
+        """
+
+        if self.wwt_layer is None or self._payload is None or self._deferred:
+            return False
+
+        arrays = self._get_input_arrays()
+        if arrays is None:
+            return False
+
+        rows = self._changed_rows(arrays)
+        if rows is None:
+            return False
+        if len(rows) == 0:
+            return True
+
+        if self._viewer_state.mode in MODES_3D:
+            ref_frame = 'Sky'
+        else:
+            ref_frame = self._viewer_state.mode
+
+        previous_keys, self._column_keys = self._column_keys, []
+        try:
+            payload = self._prepare_columns(arrays, ref_frame, rows=rows)
+        finally:
+            for key in previous_keys:
+                COLUMN_STORE.release(key)
+
+        if payload is None:
+            self.clear()
+            return True
+
+        # Unchanged rows are not prepared again, and if rows were only
+        # appended, only these are sent to WWT (see MAX_TAIL_FRACTION)
+        columns = payload[1]
+        n_rows = len(columns['lon'])
+        if rows[0] >= self._main_rows and n_rows - self._main_rows <= MAX_TAIL_FRACTION * self._main_rows:
+            self._update_tail(columns)
+        else:
+            self._merge_tail(columns)
+
+        self._coords = columns['lon'], columns['lat']
+        self._payload = payload
+        self._row_update_count += 1
+
+        return True
+
+    def _update_tail(self, columns):
+        """
+        Show the rows of ``columns`` that are not in the main WWT layer in the
+        tail layer, creating it if needed.
+        """
+        tab, data_kwargs = self._build_table(columns, start=self._main_rows)
+        if self._tail_layer is None:
+            self._tail_layer = self.wwt_client.layers.add_table_layer(tab, frame=self._ref_frame,
+                                                                      lon_att='lon', lat_att='lat',
+                                                                      selectable=True,
+                                                                      **data_kwargs)
+            self._tail_layer.far_side_visible = self.wwt_layer.far_side_visible
+            self._update_style(self._tail_layer, (), force=True)
+        else:
+            self._tail_layer.update_data(tab)
+
+    def _merge_tail(self, columns):
+        """
+        Replace the table of the main WWT layer with all the rows of
+        ``columns``, and remove the tail layer.
+        """
+        tab, _ = self._build_table(columns)
+        # This keeps the layer and its settings
+        self.wwt_layer.update_data(tab)
+        self._main_rows = len(columns['lon'])
+        if self._tail_layer is not None:
+            self._tail_layer.remove()
+            self._tail_layer = None
+
+    def _transform_coords(self, lon, lat, ref_frame):
+        if ref_frame != 'Sky':
+            return asarray(lon), asarray(lat)
+        try:
+            coord = SkyCoord(lon, lat, unit=u.deg,
+                             frame=self._viewer_state.frame.lower()).icrs
+        except Exception:
+            if size(lat) < 5:
+                angle_info = f"{lat}"
+            else:
+                angle_info = f"{lat.min()} deg <= angle <= {lat.max()} deg"
+            raise ValueError(f"Latitude angle(s) must be within -90 deg <= angle <= 90 deg, got {angle_info}")
+        return coord.spherical.lon.degree, coord.spherical.lat.degree
 
     def center(self, *args):
-        lon, lat = self._coords
-        if len(lon) == 0:
+        if len(self._coords[0]) == 0:
             return
 
-        lon_cen, lat_cen, sep_max = center_fov(lon, lat)
+        # The enclosing circle only depends on the prepared coordinates
+        lon_cen, lat_cen, sep_max = self._derived('fov', lambda: center_fov(*self._coords))
         if lon_cen is None:
             return
 
@@ -393,4 +840,5 @@ class WWTTableLayerArtist(LayerArtist):
         pass
 
     def update(self):
-        self._update_presentation(force=True)
+        if not self._update_rows():
+            self._update_presentation(force=True)
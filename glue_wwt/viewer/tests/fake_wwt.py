@@ -0,0 +1,363 @@
+"""
+A stand-in for the pywwt clients, which records the messages that would be
+sent to WWT instead of sending them, and a viewer using it. These are used to
+test and benchmark the viewer and layer artists without a browser or Qt.
+
+The client also estimates the size of each message, as the JSON pywwt would
+send (with tables encoded as base64 CSV, as pywwt does), and simulates the
+time taken to deliver them, so that tests can check how much traffic an
+operation causes::
+
+    with viewer._wwt.record() as record:
+        viewer.layers[0].state.cmap = cm.plasma
+    assert record.count <= 1 and record.nbytes <= 100
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+from glue.viewers.common.viewer import Viewer
+
+from ..data_viewer import WWTDataViewerBase
+from ..imagery import ImageryCatalog
+from ..metrics import message_size
+
+__all__ = ['FakeWWTClient', 'FakeWWTViewer', 'MessageRecord']
+
+
+class MessageRecord(object):
+    """
+    The messages sent by a `FakeWWTClient` while recording.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._start = len(client.messages)
+        self._start_deliveries = len(client.deliveries)
+        self._stop = None
+        self._stop_deliveries = None
+
+    def _finish(self):
+        self._stop = len(self._client.messages)
+        self._stop_deliveries = len(self._client.deliveries)
+
+    @property
+    def messages(self):
+        return self._client.messages[self._start:self._stop]
+
+    @property
+    def count(self):
+        """
+        The number of messages sent.
+        """
+        return len(self.messages)
+
+    @property
+    def nbytes(self):
+        """
+        The total size of the messages sent, in bytes.
+        """
+        return sum(message_size(message) for message in self.messages)
+
+    @property
+    def events(self):
+        """
+        The number of messages sent for each type of event.
+        """
+        return Counter(message.get('event', message.get('type')) for message in self.messages)
+
+    @property
+    def deliveries(self):
+        """
+        The number of times the client had to reach WWT, since several
+        messages can be delivered together.
+        """
+        return len(self._client.deliveries[self._start_deliveries:self._stop_deliveries])
+
+    @property
+    def latency(self):
+        """
+        The simulated time taken to deliver the messages, in seconds.
+        """
+        return sum(self._client._delivery_time(messages)
+                   for messages in self._client.deliveries[self._start_deliveries:self._stop_deliveries])
+
+
+def _unchanged(obj, name, value):
+    # Like the traitlets used by pywwt, only changes of value are sent
+    if name not in obj.__dict__:
+        return False
+    try:
+        return bool(obj.__dict__[name] == value)
+    except (TypeError, ValueError):
+        return False
+
+
+class FakeSettings(object):
+    """
+    An object whose public attributes are settings of WWT, e.g. the solar
+    system settings.
+    """
+
+    _prefix = ''
+
+    def __init__(self, client):
+        self._client = client
+
+    def __setattr__(self, name, value):
+        if _unchanged(self, name, value):
+            return
+        object.__setattr__(self, name, value)
+        if not name.startswith('_'):
+            self._client._send_msg(event='setting_set', setting=self._prefix + name, value=value)
+
+
+class FakeSolarSystem(FakeSettings):
+    _prefix = 'solarSystem.'
+
+
+class FakeLayer(object):
+
+    _kind = None
+
+    def __init__(self, client, data):
+        self._client = client
+        self._data = data
+        self._removed = False
+        self.id = str(uuid.uuid4())
+
+    def __setattr__(self, name, value):
+        if _unchanged(self, name, value):
+            return
+        object.__setattr__(self, name, value)
+        if not name.startswith('_') and name != 'id':
+            self._client._send_msg(event=self._kind + '_set', id=self.id, setting=name, value=value)
+
+    def remove(self):
+        self._removed = True
+        self._client.layers._layers.remove(self)
+        self._client._send_msg(event=self._kind + '_remove', id=self.id)
+
+
+class FakeTableLayer(FakeLayer):
+
+    _kind = 'table_layer'
+
+    def update_data(self, table):
+        self._data = table
+        self._client._send_msg(event='table_layer_update', id=self.id, table=table)
+
+
+class FakeImageLayer(FakeLayer):
+    _kind = 'image_layer'
+
+
+class FakeLayerManager(object):
+
+    def __init__(self, client):
+        self._client = client
+        self._layers = []
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __iter__(self):
+        return iter(self._layers)
+
+    def add_table_layer(self, table, frame='Sky', **kwargs):
+        layer = FakeTableLayer(self._client, table)
+        self._layers.append(layer)
+        self._client._send_msg(event='table_layer_create', id=layer.id, frame=frame, table=table)
+        for name, value in kwargs.items():
+            setattr(layer, name, value)
+        return layer
+
+    def add_image_layer(self, image):
+        layer = FakeImageLayer(self._client, image)
+        self._layers.append(layer)
+        self._client._send_msg(event='image_layer_create', id=layer.id, image=image)
+        return layer
+
+
+class FakeWWTClient(FakeSettings):
+    """
+    A stand-in for a pywwt client, which appends the messages it would send
+    to WWT to ``messages``, and the messages delivered together at each time
+    it reaches WWT to ``deliveries``.
+
+    Each delivery is simulated to take ``latency`` seconds, plus the time to
+    transfer the messages at ``bandwidth`` bytes per second (if not `None`).
+    """
+
+    latency = 0.
+    bandwidth = None
+
+    def __init__(self):
+        object.__setattr__(self, 'messages', [])
+        object.__setattr__(self, 'deliveries', [])
+        self._client = self
+        self._center = SkyCoord(0, 0, unit=u.deg)
+        self._fov = 60 * u.deg
+        self._roll = 0 * u.deg
+        self._current_time = Time('2020-01-01T00:00:00')
+        self._callbacks = {}
+        self._most_recent_source = None
+        self.layers = FakeLayerManager(self)
+        self.solar_system = FakeSolarSystem(self)
+
+    def __setattr__(self, name, value):
+        if name in ('layers', 'solar_system', 'latency', 'bandwidth'):
+            object.__setattr__(self, name, value)
+        else:
+            super(FakeWWTClient, self).__setattr__(name, value)
+
+    def _send_msg(self, **kwargs):
+        self._actually_send_msg(kwargs)
+
+    def _actually_send_msg(self, payload):
+        self._deliver([payload])
+
+    def _deliver(self, messages):
+        self.messages.extend(messages)
+        self.deliveries.append(messages)
+
+    def _delivery_time(self, messages):
+        if self.bandwidth is None:
+            return self.latency
+        return self.latency + sum(message_size(message) for message in messages) / self.bandwidth
+
+    @contextmanager
+    def record(self):
+        """
+        Record the messages sent in this context, in the `MessageRecord`
+        returned.
+        """
+        record = MessageRecord(self)
+        try:
+            yield record
+        finally:
+            record._finish()
+
+    def set_view(self, mode):
+        self._send_msg(event='load_image_collection', mode=mode)
+
+    def set_current_time(self, dt):
+        self._current_time = Time(dt)
+        self._send_msg(event='set_datetime', isot=self._current_time.isot)
+
+    def get_current_time(self):
+        return self._current_time
+
+    def play_time(self, rate=1):
+        self._send_msg(event='resume_time', rate=rate)
+
+    def pause_time(self):
+        self._send_msg(event='pause_time')
+
+    def get_center(self):
+        return self._center
+
+    def get_fov(self):
+        return self._fov
+
+    def get_roll(self):
+        return self._roll
+
+    def center_on_coordinates(self, coord, fov=60 * u.deg, roll=None, instant=True):
+        self._center = coord.icrs
+        self._fov = fov
+        if roll is not None:
+            self._roll = roll
+        self._send_msg(event='center_on_coordinates', ra=self._center.ra.deg,
+                       dec=self._center.dec.deg, fov=self._fov.to_value(u.deg), instant=instant)
+        # WWT reports its new view
+        callback = self._callbacks.get('wwt_view_state')
+        if callback is not None:
+            callback(self, [])
+
+    def _set_message_type_callback(self, ptype, callback):
+        self._callbacks[ptype] = callback
+
+    def set_selection_change_callback(self, callback):
+        self._set_message_type_callback('wwt_selection_state', callback)
+
+    @property
+    def most_recent_source(self):
+        return self._most_recent_source
+
+    def refresh_tile_cache(self):
+        self._send_msg(event='clear_tile_cache')
+
+
+class FakeImageryCatalog(ImageryCatalog):
+    """
+    An imagery catalogue that is never downloaded or saved.
+    """
+
+    def __init__(self, fetch=None):
+        if fetch is None:
+            layers = OrderedDict([('Digitized Sky Survey (Color)', {'thumbnail': None}),
+                                  ('Hydrogen Alpha Full Sky Map', {'thumbnail': None})])
+            fetch = lambda: layers  # noqa: E731
+        super(FakeImageryCatalog, self).__init__(path=None, fetch=fetch)
+
+    def _load(self):
+        return None
+
+    def _save(self, layers):
+        pass
+
+    @contextmanager
+    def patch_pywwt(self):
+        yield
+
+
+class FakeWWTViewer(WWTDataViewerBase, Viewer):
+    """
+    A WWT viewer without a user interface, using `FakeWWTClient`.
+    """
+
+    _imagery_catalog = FakeImageryCatalog()
+
+    # Estimating the size of the tables sent would dominate benchmarks, so
+    # the metrics are only collected when enabled explicitly
+    _COLLECT_METRICS = False
+
+    def __init__(self, session, state=None):
+        self.scheduled = []
+        Viewer.__init__(self, session, state=state)
+        WWTDataViewerBase.__init__(self)
+
+    def _initialize_wwt(self):
+        self._wwt = FakeWWTClient()
+        # pywwt clients keep their own copy of the imagery catalogue
+        self._wwt._available_layers = OrderedDict(self._imagery_catalog.layers())
+
+    def _send_message_batch(self, messages):
+        # Like the Qt viewer, deliver the messages together
+        with self.metrics.timed('send'):
+            self._wwt._deliver(messages)
+
+    def _setup_time_timer(self):
+        self._current_time_timer = True
+
+    def _cleanup_time_timer(self):
+        self._current_time_timer = None
+
+    def _call_later(self, delay, callback):
+        # There is no event loop, so calls are only made by run_scheduled
+        self.scheduled.append((delay, callback))
+
+    def run_scheduled(self):
+        """
+        Make the calls scheduled with ``_call_later``.
+        """
+        scheduled, self.scheduled = self.scheduled, []
+        for delay, callback in scheduled:
+            callback()
@@ -6,9 +6,14 @@ import os
 
 from unittest.mock import MagicMock
 
+import numpy as np
+from astropy.wcs import WCS
+
+from glue.config import settings
 from glue.core import ComponentLink, Data, message
 from glue.core.tests.test_state import clone
 
+from ..column_store import COLUMN_STORE
 from .test_utils import create_disabled_message
 
 DATA = os.path.join(os.path.dirname(__file__), 'data')
@@ -53,6 +58,11 @@ class BaseTestWWTDataViewer(object):
         self.viewer.state.lat_att = self.d.id['y']
         self.viewer.layers[0].center()
 
+        # The field of view is only computed once for the prepared coordinates
+        n_columns = len(COLUMN_STORE)
+        self.viewer.layers[0].center()
+        assert len(COLUMN_STORE) == n_columns
+
     def test_new_subset_group(self):
         # Make sure only the subset for data that is already inside the viewer
         # is added.
@@ -117,6 +127,138 @@ class BaseTestWWTDataViewer(object):
 
         application2.viewers[0][0]
 
+    def test_deferred_layers(self):
+
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+
+        # This is what happens to viewers restored from a session until they
+        # are shown
+        self.viewer._layers_deferred = True
+        self.viewer.add_data(self.d)
+        assert self.viewer.layers[0].wwt_layer is None
+
+        self.viewer._materialize_layers()
+        assert not self.viewer._layers_deferred
+        assert self.viewer.layers[0].wwt_layer is not None
+
+        # Layers in viewers restored from a session are usable once shown
+        application2 = clone(self.application)
+        viewer2 = application2.viewers[0][0]
+        assert viewer2._layers_deferred
+        viewer2._materialize_layers()
+        assert viewer2.layers[0].wwt_layer is not None
+
+    def test_session_payloads(self, tmpdir):
+
+        self.viewer.add_data(self.d)
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+
+        session_file = tmpdir.join('session.glu').strpath
+
+        self.application.save_session(session_file)
+        assert not tmpdir.join('wwt_payloads').exists()
+
+        settings.WWT_SESSION_PAYLOADS = True
+        try:
+            self.application.save_session(session_file)
+        finally:
+            settings.WWT_SESSION_PAYLOADS = False
+        assert len(tmpdir.join('wwt_payloads').listdir()) == 1
+
+    def test_column_store(self):
+
+        n_columns = len(COLUMN_STORE)
+
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+        self.viewer.add_data(self.d)
+        assert len(COLUMN_STORE) > n_columns
+
+        # Subsets have their own columns, since they change independently
+        self.d.new_subset(self.d.id['x'] > -1000)
+        assert len(COLUMN_STORE) == n_columns + 2
+
+        # Columns that didn't change are kept when the data changes
+        coords = [key for key in COLUMN_STORE._entries if key[0] == 'coords']
+        self.d.update_components({self.d.id['z']: [7, 8, 9]})
+        assert [key for key in COLUMN_STORE._entries if key[0] == 'coords'] == coords
+
+        self.viewer.remove_data(self.d)
+        assert len(COLUMN_STORE) == n_columns
+
+    def test_modified_rows(self):
+
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+        self.viewer.add_data(self.d)
+
+        layer = self.viewer.layers[0]
+        wwt_layer = layer.wwt_layer
+
+        # Only the modified rows are prepared again, and the WWT layer is kept
+        self.d.update_components({self.d.id['x']: np.array([1, 2, 5])})
+        assert layer.wwt_layer is wwt_layer
+        assert layer._row_update_count == 1
+        assert list(layer._coords[0]) == [1, 2, 5]
+
+    def test_mode_switch_reuses_layers(self):
+
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+        self.viewer.add_data(self.d)
+
+        layer = self.viewer.layers[0]
+        sky_layer = layer.wwt_layer
+
+        self.viewer.state.mode = 'Earth'
+        assert layer.wwt_layer is not sky_layer
+
+        # Switching back shows the parked layer again
+        self.viewer.state.mode = 'Sky'
+        assert layer.wwt_layer is sky_layer
+
+    def test_spatial_index(self):
+
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+        self.viewer.add_data(self.d)
+
+        n_columns = len(COLUMN_STORE)
+
+        # The index is built once, when it is first needed
+        layer = self.viewer.layers[0]
+        index = layer.spatial_index
+        assert layer.spatial_index is index
+        assert len(COLUMN_STORE) == n_columns + 1
+        assert list(index.cone(layer._coords[0][1], layer._coords[1][1], 0.1)) == [1]
+
+        # and is dropped when the coordinates change
+        self.d.update_components({self.d.id['x']: np.array([1, 2, 5])})
+        assert len(COLUMN_STORE) == n_columns
+        assert layer.spatial_index is not index
+
+    def test_pick(self):
+
+        self.viewer.state.lon_att = self.d.id['x']
+        self.viewer.state.lat_att = self.d.id['y']
+        self.viewer.add_data(self.d)
+        self.d.new_subset(self.d.id['x'] > 1.5)
+
+        layer_artist, row = self.viewer.pick(2.9, 3.9)
+        assert layer_artist.layer is self.d
+        assert row == 2
+        assert self.viewer.pick(10, 10, max_radius=1) is None
+
+        # Picking a source in WWT finds its row
+        self.viewer._wwt._most_recent_source = {'ra': 2., 'dec': 3.}
+        self.viewer._on_wwt_selection(self.viewer._wwt, ['most_recent_source'])
+        assert self.viewer.picked[1] == 1
+
+        self.viewer.select_picked()
+        assert self.d.subsets[-1].to_index_list().tolist() == [1]
+
     def test_changing_alt_back_to_none(self):
 
         # Regression test for a bug which caused an exception to
@@ -191,6 +333,59 @@ class BaseTestWWTDataViewer(object):
         assert self.viewer.state.lon_att is self.d.id['x']
         assert self.viewer.state.lat_att is self.d.id['y']
 
+    def test_time_timer_only_runs_while_playing(self):
+        assert self.viewer._current_time_timer is None
+        self.viewer.state.play_time = True
+        assert self.viewer._current_time_timer is not None
+        self.viewer.state.play_time = False
+        assert self.viewer._current_time_timer is None
+
+    def test_settings_transaction(self):
+
+        flush_count = self.viewer._settings_flush_count
+
+        with self.viewer.settings_transaction():
+            self.viewer.state.equatorial_grid = not self.viewer.state.equatorial_grid
+            self.viewer.state.ecliptic_grid = not self.viewer.state.ecliptic_grid
+            with self.viewer.settings_transaction():
+                self.viewer.state.crosshairs = not self.viewer.state.crosshairs
+            assert self.viewer._settings_flush_count == flush_count
+
+        assert self.viewer._settings_flush_count == flush_count + 1
+        assert self.viewer._wwt.grid == self.viewer.state.equatorial_grid
+        assert self.viewer._wwt.crosshairs == self.viewer.state.crosshairs
+
+        # Changes outside of a transaction are flushed straight away
+        self.viewer.state.crosshairs = not self.viewer.state.crosshairs
+        assert self.viewer._settings_flush_count == flush_count + 2
+
+    def test_image_subset_mask(self):
+
+        # Image subsets should be shown as a mask overlay, and the mask
+        # should only be sent again if it actually changes.
+        wcs = WCS(naxis=2)
+        wcs.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+        wcs.wcs.crval = [10, 20]
+        wcs.wcs.crpix = [5, 5]
+        wcs.wcs.cdelt = [-0.1, 0.1]
+        wcs.wcs.radesys = 'ICRS'
+        image = Data(x=np.arange(100.).reshape((10, 10)), coords=wcs, label='image')
+        self.dc.append(image)
+
+        self.register()
+        self.viewer.add_data(image)
+        subset = image.new_subset(image.id['x'] > 50)
+        subset_layer = self.viewer._layer_artist_container[subset][0]
+        assert type(subset_layer).__name__ == 'WWTImageSubsetLayerArtist'
+        assert subset_layer.wwt_layer is not None
+
+        wwt_layer = subset_layer.wwt_layer
+        subset.subset_state = image.id['x'] > 50
+        assert subset_layer.wwt_layer is wwt_layer
+
+        subset.subset_state = image.id['x'] > 20
+        assert subset_layer.wwt_layer is not wwt_layer
+
     # TODO: determine if the following test is the desired behavior
     # def test_subsets_not_live_added_if_data_not_present(self):
     #     self.register()
@@ -0,0 +1,77 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from glue.core import DataCollection
+from glue.core.session import Session
+
+from ..camera_link import CameraLink
+from .fake_wwt import FakeWWTViewer
+
+
+def make_viewers(count):
+    dc = DataCollection()
+    session = Session(data_collection=dc, hub=dc.hub)
+    return [FakeWWTViewer(session) for _ in range(count)]
+
+
+def camera_events(viewer):
+    return [message for message in viewer._wwt.messages if message['event'] == 'center_on_coordinates']
+
+
+def test_link():
+    first, second, third = make_viewers(3)
+    first.set_camera_state(dict(ra=10, dec=20, fov=30, roll=0))
+    link = CameraLink([first, second, third])
+    # Viewers are moved to the view of the first one when linked
+    assert second.camera_state()['ra'] == pytest.approx(10)
+
+    third.set_camera_state(dict(ra=50, dec=-10, fov=5, roll=0))
+    for viewer in (first, second):
+        assert viewer.camera_state() == pytest.approx(dict(ra=50, dec=-10, fov=5, roll=0))
+
+    link.remove(third)
+    third.set_camera_state(dict(ra=60, dec=0, fov=5, roll=0))
+    assert first.camera_state()['ra'] == pytest.approx(50)
+
+    link.disconnect()
+    assert link.viewers == []
+
+
+def test_slew_is_throttled():
+    source, target = make_viewers(2)
+    CameraLink([source, target], rate=1)
+    before = len(camera_events(target))
+
+    # Slewing the source only moves the target once straight away...
+    for step in range(100):
+        source.set_camera_state(dict(ra=step * 0.1, dec=0, fov=10, roll=0))
+    assert len(camera_events(target)) == before + 1
+    assert target.camera_state()['ra'] == pytest.approx(0)
+
+    # ...and once more to the latest view when the interval has elapsed
+    source.run_scheduled()
+    assert len(camera_events(target)) == before + 2
+    assert target.camera_state()['ra'] == pytest.approx(9.9)
+
+    # The target reporting its new view isn't propagated back
+    assert not target.scheduled
+    assert len(camera_events(source)) == 100
+
+
+def test_repeated_report():
+    source, target = make_viewers(2)
+    CameraLink([source, target])
+    source.set_camera_state(dict(ra=10, dec=20, fov=30, roll=0))
+    source.run_scheduled()
+    moves = len(camera_events(source))
+
+    # WWT can report the view the target was moved to more than once
+    for _ in range(2):
+        target._on_wwt_view_state(target._wwt, [])
+    assert not target.scheduled
+    assert len(camera_events(source)) == moves
+
+    # Once the target is moved elsewhere, its moves are propagated again
+    target.set_camera_state(dict(ra=40, dec=20, fov=30, roll=0))
+    assert source.camera_state()['ra'] == pytest.approx(40)
@@ -0,0 +1,58 @@
+from __future__ import absolute_import, division, print_function
+
+from numpy import datetime64
+
+from ..clock import WWTClock
+
+
+class FakeWallClock(object):
+
+    def __init__(self):
+        self.time = 100.
+
+    def __call__(self):
+        return self.time
+
+
+def test_paused_clock():
+    wall = FakeWallClock()
+    clock = WWTClock(datetime64('2020-01-01T00:00:00'), wall_clock=wall)
+    wall.time += 50
+    assert clock.now() == datetime64('2020-01-01T00:00:00')
+
+
+def test_extrapolation():
+    wall = FakeWallClock()
+    clock = WWTClock(datetime64('2020-01-01T00:00:00'), rate=10, playing=True, wall_clock=wall)
+    wall.time += 1.5
+    assert clock.now() == datetime64('2020-01-01T00:00:15')
+    assert clock.since_sync() == 1.5
+
+
+def test_play_pause_rate_change():
+
+    wall = FakeWallClock()
+    clock = WWTClock(datetime64('2020-01-01T00:00:00'), wall_clock=wall)
+
+    clock.play(60)
+    wall.time += 2
+    assert clock.now() == datetime64('2020-01-01T00:02:00')
+
+    # Changing the rate should not change the time reached so far
+    clock.play(1)
+    wall.time += 2
+    assert clock.now() == datetime64('2020-01-01T00:02:02')
+
+    clock.pause()
+    wall.time += 10
+    assert clock.now() == datetime64('2020-01-01T00:02:02')
+
+
+def test_sync():
+    wall = FakeWallClock()
+    clock = WWTClock(datetime64('2020-01-01T00:00:00'), playing=True, wall_clock=wall)
+    wall.time += 5
+    clock.sync(datetime64('2021-06-01T12:00:00'))
+    assert clock.since_sync() == 0
+    wall.time += 1
+    assert clock.now() == datetime64('2021-06-01T12:00:01')
@@ -0,0 +1,91 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.core import Data, DataCollection
+
+from ..column_store import CHUNK_SIZE, ColumnStore, array_key, chunk_keys
+
+
+def test_array_key():
+    array = np.arange(10.)
+    assert array_key(array) == array_key(array.copy())
+    assert array_key(array) != array_key(array + 1)
+    assert array_key(array) != array_key(array.astype(np.float32))
+
+
+def test_chunk_keys():
+
+    array = np.arange(CHUNK_SIZE * 2 + 10.)
+    keys = chunk_keys(array)
+    assert len(keys) == 3
+    assert array_key(array, chunks=keys) == array_key(array)
+
+    # Only the chunk containing the modified row changes
+    modified = array.copy()
+    modified[CHUNK_SIZE + 5] = -1
+    modified_keys = chunk_keys(modified)
+    assert [a == b for a, b in zip(keys, modified_keys)] == [True, False, True]
+
+    # Appending rows leaves the existing complete chunks unchanged
+    appended = np.hstack([array, [1., 2.]])
+    assert chunk_keys(appended)[:2] == keys[:2]
+
+
+def test_acquire_release():
+
+    store = ColumnStore()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return np.zeros(100)
+
+    first = store.acquire('a', factory)
+    second = store.acquire('a', factory)
+    assert first is second
+    assert len(calls) == 1
+    assert store.refcount('a') == 2
+    assert store.get('a') is first
+    assert store.get('c') is None
+    assert store.nbytes == 800
+
+    store.acquire('b', lambda: (np.zeros(10), np.zeros(10)))
+    assert store.nbytes == 960
+    assert [item[0] for item in store.report()] == ['a', 'b']
+
+    store.release('a')
+    assert 'a' in store
+    store.release('a')
+    assert 'a' not in store
+    store.release('b')
+    assert len(store) == 0
+    assert store.nbytes == 0
+
+    # Releasing unknown keys is harmless
+    store.release('c')
+
+
+def test_input_key():
+
+    store = ColumnStore()
+    data = Data(x=[1., 2., 3.], y=[4., 5., 6.], label='data')
+
+    # Without a hub, changes are not reported so the contents are used
+    assert store.input_key(data, data.id['x'], data['x']) == ('content', array_key(data['x']))
+
+    dc = DataCollection([data])
+    subset = dc.new_subset_group(subset_state=data.id['x'] > 1).subsets[0]
+    x, y, sx = [store.input_key(layer, layer.data.id[name], layer[name])
+                for layer, name in ((data, 'x'), (data, 'y'), (subset, 'x'))]
+
+    # Changing a component only changes the keys that depend on it
+    data.update_components({data.id['y']: [7., 8., 9.]})
+    assert store.input_key(data, data.id['x'], data['x']) == x
+    assert store.input_key(data, data.id['y'], data['y']) != y
+    assert store.input_key(subset, data.id['x'], subset['x']) != sx
+
+    sx = store.input_key(subset, data.id['x'], subset['x'])
+    subset.subset_state = data.id['x'] > 2
+    assert store.input_key(subset, data.id['x'], subset['x']) != sx
+    assert store.input_key(data, data.id['x'], data['x']) == x
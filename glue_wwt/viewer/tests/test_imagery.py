@@ -0,0 +1,140 @@
+from __future__ import absolute_import, division, print_function
+
+import threading
+from collections import OrderedDict
+
+from glue.core import DataCollection
+from glue.core.session import Session
+
+from ..imagery import ImageryCatalog
+from ..tools import RefreshTileCacheTool
+from .fake_wwt import FakeImageryCatalog, FakeWWTViewer
+
+
+class FakeFetch(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.layers = OrderedDict([('b', {'thumbnail': None}), ('a', {'thumbnail': 'a.jpg'})])
+
+    def __call__(self):
+        self.release.wait()
+        self.calls += 1
+        return self.layers
+
+
+def test_catalog_fetched_once(tmpdir):
+    fetch = FakeFetch()
+    catalog = ImageryCatalog(path=tmpdir.join('layers.json').strpath, fetch=fetch)
+    assert catalog.names() == ['a', 'b']
+    assert catalog.names() == ['a', 'b']
+    assert list(catalog.layers()) == ['b', 'a']
+    assert fetch.calls == 1
+
+
+def test_catalog_persisted(tmpdir):
+
+    path = tmpdir.join('layers.json').strpath
+
+    fetch = FakeFetch()
+    ImageryCatalog(path=path, fetch=fetch).names()
+
+    # A new catalogue (e.g. in a new session) uses the file on disk and
+    # refreshes it in the background.
+    fetch.layers = OrderedDict([('c', {'thumbnail': None})])
+    fetch.release.clear()
+    catalog = ImageryCatalog(path=path, fetch=fetch)
+    assert catalog.names() == ['a', 'b']
+    fetch.release.set()
+    catalog._refresh_thread.join()
+    assert catalog.names() == ['c']
+    assert fetch.calls == 2
+
+
+def test_catalog_invalidate(tmpdir):
+
+    path = tmpdir.join('layers.json')
+
+    fetch = FakeFetch()
+    catalog = ImageryCatalog(path=path.strpath, fetch=fetch)
+    catalog.names()
+    assert path.exists()
+
+    catalog.invalidate()
+    assert not path.exists()
+
+    fetch.layers = OrderedDict([('c', {'thumbnail': None})])
+    assert catalog.names() == ['c']
+    assert fetch.calls == 2
+
+
+def test_catalog_forced_refresh(tmpdir):
+
+    fetch = FakeFetch()
+    catalog = ImageryCatalog(path=tmpdir.join('layers.json').strpath, fetch=fetch)
+    catalog.names()
+
+    # Background refreshes only happen once, unless forced
+    catalog.refresh_in_background()
+    assert not catalog.refreshing
+    fetch.layers = OrderedDict([('c', {'thumbnail': None})])
+    fetch.release.clear()
+    catalog.refresh_in_background(force=True)
+    assert catalog.refreshing
+    assert catalog.names() == ['a', 'b']
+    fetch.release.set()
+    catalog._refresh_thread.join()
+    assert catalog.names() == ['c']
+
+
+def test_catalog_refresh_failed(tmpdir):
+
+    def fail():
+        raise OSError('offline')
+
+    path = tmpdir.join('layers.json').strpath
+    ImageryCatalog(path=path, fetch=FakeFetch()).names()
+
+    # The current catalogue is kept if it can't be downloaded again
+    catalog = ImageryCatalog(path=path, fetch=fail)
+    assert catalog.names() == ['a', 'b']
+    catalog._refresh_thread.join()
+    catalog.refresh_in_background(force=True)
+    catalog._refresh_thread.join()
+    assert catalog.names() == ['a', 'b']
+
+
+def test_refresh_tool(monkeypatch):
+
+    fetch = FakeFetch()
+    catalog = FakeImageryCatalog(fetch=fetch)
+    monkeypatch.setattr(FakeWWTViewer, '_imagery_catalog', catalog)
+    dc = DataCollection()
+    viewer, other = [FakeWWTViewer(Session(data_collection=dc, hub=dc.hub)) for _ in range(2)]
+
+    # The catalogue is downloaded in the background, and all the viewers
+    # updated once it is available
+    fetch.layers = OrderedDict([('c', {'thumbnail': None})])
+    fetch.release.clear()
+    RefreshTileCacheTool(viewer).activate()
+    assert catalog.refreshing
+    assert len(viewer.scheduled) == 1
+    fetch.release.set()
+    catalog._refresh_thread.join()
+    viewer.run_scheduled()
+    assert viewer.scheduled == []
+    for wwt_viewer in (viewer, other):
+        assert wwt_viewer.state.imagery_layers == ['c']
+        assert 'c' in wwt_viewer._wwt._available_layers
+
+    # Listeners are only called if the catalogue changed, until removed
+    catalog.remove_listener(other._update_imagery_layers)
+    catalog._set_layers(OrderedDict([('d', {'thumbnail': None})]))
+    catalog.notify()
+    assert viewer.state.imagery_layers == ['d']
+    assert other.state.imagery_layers == ['c']
+    viewer.state.imagery_layers = ['c']
+    catalog.notify()
+    assert viewer.state.imagery_layers == ['c']
@@ -0,0 +1,36 @@
+from __future__ import absolute_import, division, print_function
+
+import json
+import subprocess
+import sys
+
+# Modules that are slow to import and should only be imported once a WWT
+# viewer is actually created. Rather than timing the import (which would be
+# unreliable on busy machines), we check that none of them are imported.
+HEAVY_MODULES = ['pywwt', 'qtpy.QtWebEngineWidgets', 'qtpy.QtWebEngineCore']
+
+# The modules needed to register the plugin, excluding the Qt and Jupyter
+# specific ones which are only importable if those frontends are installed.
+PLUGIN_MODULES = ['glue_wwt', 'glue_wwt.viewer.data_viewer', 'glue_wwt.viewer.image_layer',
+                  'glue_wwt.viewer.table_layer', 'glue_wwt.viewer.tools']
+
+SCRIPT = """
+import json, sys
+{imports}
+print(json.dumps([name for name in {heavy!r} if name in sys.modules]))
+"""
+
+
+def imported_heavy_modules(modules):
+    imports = '\n'.join('import {0}'.format(name) for name in modules)
+    script = SCRIPT.format(imports=imports, heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', script], universal_newlines=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_package_import():
+    assert imported_heavy_modules(['glue_wwt']) == []
+
+
+def test_plugin_modules_import():
+    assert imported_heavy_modules(PLUGIN_MODULES) == []
@@ -0,0 +1,238 @@
+# Budgets on the messages sent to WWT by common operations, checked with a
+# stand-in client that records them rather than with a real WWT viewer. Setting
+# a layer property costs a little over 100 bytes, most of which are the layer id.
+
+from __future__ import absolute_import, division, print_function
+
+from datetime import datetime, timezone
+
+import pytest
+
+import numpy as np
+from matplotlib import cm
+
+from astropy.wcs import WCS
+
+from glue.core import Data, DataCollection
+from glue.core.session import Session
+from glue.core.tests.test_state import clone
+
+pytest.importorskip('pywwt')
+
+from .fake_wwt import FakeWWTViewer  # noqa: E402
+
+
+class TestMessageBudgets(object):
+
+    def setup_method(self, method):
+        rng = np.random.default_rng(12345)
+        self.data = Data(label='table', ra=rng.uniform(0, 360, 1000),
+                         dec=rng.uniform(-90, 90, 1000), mag=rng.normal(15, 2, 1000))
+        self.dc = DataCollection([self.data])
+        self.viewer = FakeWWTViewer(Session(data_collection=self.dc, hub=self.dc.hub))
+        self.viewer.register_to_hub(self.dc.hub)
+        self.viewer.add_data(self.data)
+        self.viewer.state.lon_att = self.data.id['ra']
+        self.viewer.state.lat_att = self.data.id['dec']
+        self.wwt = self.viewer._wwt
+        self.layer_state = self.viewer.layers[0].state
+
+    def teardown_method(self, method):
+        self.viewer.remove_data(self.data)
+
+    def test_record(self):
+        self.wwt.latency = 0.1
+        self.wwt.bandwidth = 1000
+        with self.wwt.record() as record:
+            self.viewer.state.equatorial_grid = not self.viewer.state.equatorial_grid
+        assert record.count == 1
+        assert record.deliveries == 1
+        assert record.events == {'setting_set': 1}
+        assert record.latency == pytest.approx(0.1 + record.nbytes / 1000)
+
+    def test_change_cmap(self):
+        with self.wwt.record() as record:
+            self.layer_state.cmap = cm.plasma
+        assert record.count <= 1
+        assert record.nbytes <= 128
+
+    @pytest.mark.parametrize(('name', 'value'), [('color', '#ff0000'), ('alpha', 0.5),
+                                                 ('size_scaling', 2), ('cmap_vmin', 10)])
+    def test_change_style(self, name, value):
+        with self.wwt.record() as record:
+            setattr(self.layer_state, name, value)
+        assert record.count <= 1
+        assert record.nbytes <= 128
+
+    def test_toggle_settings(self):
+        with self.wwt.record() as record:
+            with self.viewer.settings_transaction():
+                for name in ('equatorial_grid', 'ecliptic_grid', 'galactic_grid', 'alt_az_grid'):
+                    setattr(self.viewer.state, name, not getattr(self.viewer.state, name))
+        assert record.count == 4
+        assert record.deliveries == 1
+
+    def test_modify_rows(self):
+        # Only the modified rows are prepared again, but pywwt can only
+        # replace the whole table of a layer, so the table is sent once
+        self.layer_state.cmap_att = self.data.id['mag']
+        self.layer_state.color_mode = 'Linear'
+        mag = self.data['mag'].copy()
+        mag[[3, 141, 592]] = 12.
+        updates = self.viewer.layers[0]._row_update_count
+        with self.wwt.record() as record:
+            self.data.update_components({self.data.id['mag']: mag})
+        assert record.events['table_layer_update'] <= 1
+        assert self.viewer.layers[0]._row_update_count == updates + 1
+        assert 'table_layer_create' not in record.events
+
+    def test_append_rows(self):
+        # Appended rows are sent on their own, in a second layer with the
+        # same settings, until it is merged into the main layer
+        def append(count):
+            rng = np.random.default_rng(count)
+            rows = Data(label='table', ra=np.append(self.data['ra'], rng.uniform(0, 360, count)),
+                        dec=np.append(self.data['dec'], rng.uniform(-90, 90, count)),
+                        mag=np.append(self.data['mag'], rng.normal(15, 2, count)))
+            self.data.update_values_from_data(rows)
+
+        layer = self.viewer.layers[0]
+        with self.wwt.record() as record:
+            append(10)
+        assert record.events['table_layer_create'] == 1
+        assert 'table_layer_update' not in record.events
+        assert len(record.messages[0]['table']) == 10
+        assert layer._tail_layer.opacity == self.layer_state.alpha
+
+        with self.wwt.record() as record:
+            self.layer_state.alpha = 0.5
+        assert record.count == 2
+        assert layer._tail_layer.opacity == 0.5
+
+        with self.wwt.record() as record:
+            append(20)
+        assert record.events == {'table_layer_update': 1}
+        assert len(record.messages[0]['table']) == 30
+
+        with self.wwt.record() as record:
+            append(500)
+        assert record.events == {'table_layer_update': 1, 'table_layer_remove': 1}
+        assert len(record.messages[0]['table']) == 1530
+        assert layer._tail_layer is None
+        assert len(layer._coords[0]) == 1530
+
+    def test_time_values_cached(self, monkeypatch):
+        # The time values sent to pywwt are only converted for modified rows
+        from .. import table_layer
+        self.data.add_component(np.arange(1000).astype('datetime64[D]'), 'time')
+        self.layer_state.time_att = self.data.id['time']
+        self.layer_state.time_series = True
+        converted = []
+
+        def utc_datetimes(times):
+            converted.append(len(times))
+            return table_layer_utc_datetimes(times)
+
+        table_layer_utc_datetimes = table_layer.utc_datetimes
+        monkeypatch.setattr(table_layer, 'utc_datetimes', utc_datetimes)
+
+        time = self.data['time'].copy()
+        time[[3, 141]] = np.datetime64('2000-01-01')
+        self.data.update_components({self.data.id['time']: time})
+        assert converted == [2]
+        table = self.wwt.layers._layers[0]._data
+        assert table['time'][141] == datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+        # Other columns changing don't convert the times again
+        self.layer_state.alpha = 0.5
+        mag = self.data['mag'].copy()
+        mag[0] = 1.
+        self.data.update_components({self.data.id['mag']: mag})
+        assert converted == [2]
+
+    def test_mode_round_trip(self):
+        self.viewer.state.mode = 'Earth'
+        # Switching back to a mode shows the layer parked for it, so the
+        # table isn't sent again.
+        with self.wwt.record() as record:
+            self.viewer.state.mode = 'Sky'
+        assert 'table_layer_create' not in record.events
+        assert 'table_layer_update' not in record.events
+        assert record.nbytes <= 1000
+
+    def test_traffic_by_layer(self):
+        # The viewer's own metrics agree with what the client recorded
+        self.viewer.metrics.enabled = True
+        with self.wwt.record() as record:
+            self.layer_state.alpha = 0.5
+            self.viewer.state.equatorial_grid = not self.viewer.state.equatorial_grid
+        traffic = self.viewer.traffic_by_layer()
+        assert traffic[self.data.label] == (1, record.nbytes - traffic[None][1])
+        assert traffic[None][0] == 1
+        assert self.viewer.metrics.total_bytes == record.nbytes
+        assert self.viewer.metrics.latencies['send'].count == 2
+        assert self.data.label in self.viewer.metrics_report()
+
+
+def test_image_subset_cutout():
+
+    # An image subset is only sent as the part of the image it covers
+
+    wcs = WCS(naxis=2)
+    wcs.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+    wcs.wcs.crval = [10, 20]
+    wcs.wcs.crpix = [50, 50]
+    wcs.wcs.cdelt = [-0.01, 0.01]
+    wcs.wcs.radesys = 'ICRS'
+    image = Data(x=np.arange(10000.).reshape((100, 100)), coords=wcs, label='image')
+    dc = DataCollection([image])
+    viewer = FakeWWTViewer(Session(data_collection=dc, hub=dc.hub))
+    viewer.register_to_hub(dc.hub)
+    viewer.add_data(image)
+    wwt = viewer._wwt
+
+    row, col = image.pixel_component_ids
+    with wwt.record() as record:
+        image.new_subset((row >= 10) & (row < 20) & (col >= 30) & (col < 35))
+    assert record.events['image_layer_create'] == 1
+    overlay, overlay_wcs = [message['image'] for message in record.messages
+                            if message['event'] == 'image_layer_create'][0]
+    assert overlay.shape == (10, 5)
+    assert overlay.dtype == np.float32
+    assert np.all(overlay == 1)
+    assert overlay_wcs.pixel_to_world_values(0, 0) == wcs.pixel_to_world_values(30, 10)
+
+    # An empty subset isn't sent at all
+    with wwt.record() as record:
+        image.new_subset(row < 0)
+    assert 'image_layer_create' not in record.events
+
+
+def test_restored_viewer_deferred():
+
+    # A viewer restored from a session sends nothing until it is first shown,
+    # while viewers created afterwards with a new state are unaffected
+
+    data = Data(label='table', ra=[1., 2., 3.], dec=[4., 5., 6.])
+    dc = DataCollection([data])
+    session = Session(data_collection=dc, hub=dc.hub)
+    viewer = FakeWWTViewer(session)
+    viewer.add_data(data)
+    viewer.state.lon_att = data.id['ra']
+    viewer.state.lat_att = data.id['dec']
+
+    state = clone(viewer.state)
+    assert state._restored
+    restored = FakeWWTViewer(Session(data_collection=dc, hub=dc.hub), state=state)
+    assert restored._layers_deferred
+    assert not state._restored
+
+    with restored._wwt.record() as record:
+        restored.add_data(data)
+    assert 'table_layer_create' not in record.events
+
+    with restored._wwt.record() as record:
+        restored._materialize_layers()
+    assert record.events['table_layer_create'] == 1
+
+    assert not FakeWWTViewer(session)._layers_deferred
@@ -0,0 +1,66 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from astropy import units as u
+from astropy.table import Table
+from matplotlib import cm
+
+from ..metrics import LatencyHistogram, WWTMetrics, message_size
+
+
+def test_message_size():
+    message = dict(event='table_layer_set', id='a', setting='cmap', value=cm.viridis)
+    assert message_size(message) == len('{"event":"table_layer_set","id":"a",'
+                                         '"setting":"cmap","value":"viridis"}')
+    message = dict(event='table_layer_set', id='a', setting='time_decay', value=16 * u.day)
+    assert message_size(message) == len('{"event":"table_layer_set","id":"a",'
+                                         '"setting":"time_decay","value":16.0}')
+
+
+def test_message_size_table():
+    # The table is sent as base64 encoded CSV with \r\n line endings
+    table = Table({'lon': [1.5, 2.5], 'lat': [3, 4]})
+    csv = 'lon,lat\r\n1.5,3\r\n2.5,4\r\n'
+    assert message_size(dict(table=table)) == len('{"table":""}') + 4 * ((len(csv) + 2) // 3)
+    assert message_size(dict(table='x' * 2000)) == len('{"table":""}') + 2000
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.count == 0
+    assert histogram.quantile(0.5) == 0
+    for seconds in (0.0005, 0.002, 0.002, 20):
+        histogram.add(seconds)
+    assert histogram.count == 4
+    assert histogram.mean == pytest.approx(20.0045 / 4)
+    assert histogram.max == 20
+    assert histogram.quantile(0.5) == 3e-3
+    assert histogram.quantile(1) == 20
+
+
+def test_metrics():
+    metrics = WWTMetrics()
+    metrics.add_message(dict(event='setting_set', setting='grid', value=True))
+    metrics.add_message(dict(event='table_layer_set', id='a', setting='opacity', value=1))
+    metrics.add_message(dict(event='table_layer_set', id='a', setting='opacity', value=0.5))
+    with metrics.timed('get_center'):
+        pass
+    assert metrics.messages == {None: 1, 'a': 2}
+    assert metrics.total_messages == 3
+    assert metrics.total_bytes == sum(metrics.bytes.values())
+    assert metrics.latencies['get_center'].count == 1
+    assert metrics.summary().startswith('3 messages, {0} B | get_center: '.format(metrics.total_bytes))
+
+    metrics.reset()
+    assert metrics.total_messages == 0
+    assert not metrics.latencies
+
+
+def test_metrics_disabled():
+    metrics = WWTMetrics(enabled=False)
+    metrics.add_message(dict(event='setting_set', setting='grid', value=True))
+    with metrics.timed('get_center'):
+        pass
+    assert metrics.total_messages == 0
+    assert not metrics.latencies
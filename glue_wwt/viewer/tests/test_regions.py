@@ -0,0 +1,114 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from astropy import units as u
+from astropy.coordinates import SkyCoord, angular_separation
+from glue.core import Data, DataCollection
+from glue.core.tests.test_state import clone
+
+from ..column_store import COLUMN_STORE
+from ..regions import SkyConeSubsetState, SkyPolygonSubsetState, view_footprint
+from ..spatial_index import SpatialIndex
+
+
+def make_data(n=2000, seed=12345):
+    rng = np.random.default_rng(seed)
+    ra = rng.uniform(0, 360, n)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    return Data(ra=ra, dec=dec, label='sources')
+
+
+def test_cone_subset_state():
+
+    data = make_data()
+    state = SkyConeSubsetState(lon_att=data.id['ra'], lat_att=data.id['dec'], frame='ICRS',
+                               lon=30, lat=-20, radius=15)
+
+    separation = angular_separation(data['ra'] * u.deg, data['dec'] * u.deg, 30 * u.deg, -20 * u.deg)
+    assert_equal(state.to_mask(data), separation.to_value(u.deg) <= 15)
+    assert_equal(state.to_mask(data, view=slice(10, 20)), state.to_mask(data)[10:20])
+
+
+def test_cone_subset_state_frame():
+
+    data = make_data()
+    state = SkyConeSubsetState(lon_att=data.id['ra'], lat_att=data.id['dec'], frame='Galactic',
+                               lon=30, lat=-20, radius=15)
+
+    icrs = SkyCoord(data['ra'], data['dec'], unit='deg', frame='galactic').icrs
+    separation = icrs.separation(SkyCoord(30, -20, unit='deg'))
+    assert_equal(state.to_mask(data), separation.deg <= 15)
+
+
+def test_polygon_subset_state():
+
+    data = make_data()
+    lon, lat = view_footprint(100, 40, 30)
+    state = SkyPolygonSubsetState(lon_att=data.id['ra'], lat_att=data.id['dec'], frame='ICRS',
+                                  lon=lon, lat=lat)
+
+    mask = state.to_mask(data)
+    assert 0 < mask.sum() < len(mask)
+
+    # Points inside the footprint are within the circle going through its
+    # corners, and points in the inscribed circle are inside the footprint
+    separation = angular_separation(data['ra'] * u.deg, data['dec'] * u.deg,
+                                    100 * u.deg, 40 * u.deg).to_value(u.deg)
+    corner = angular_separation(lon[0] * u.deg, lat[0] * u.deg, 100 * u.deg, 40 * u.deg).to_value(u.deg)
+    assert np.all(separation[mask] <= corner)
+    assert np.all(mask[separation < 15])
+
+
+def test_view_footprint():
+
+    index = SpatialIndex([0, 0, 19, 20, 0, 0], [9.9, 10.1, 0, 0, 19, 20])
+
+    lon, lat = view_footprint(0, 0, 20, aspect_ratio=2)
+    assert_equal(index.polygon(lon, lat), [0, 2])
+
+    # Rolling the view by 90 degrees swaps its width and height
+    lon, lat = view_footprint(0, 0, 20, aspect_ratio=2, roll=90)
+    assert_equal(index.polygon(lon, lat), [0, 1, 4])
+
+
+def test_shared_index():
+
+    data = make_data()
+    key = ('index', COLUMN_STORE.input_key(data, data.id['ra'], data['ra']),
+           COLUMN_STORE.input_key(data, data.id['dec'], data['dec']), 'Sky', 'ICRS')
+
+    # An index built by a table layer showing the same coordinates is used
+    index = COLUMN_STORE.acquire(key, lambda: SpatialIndex(data['ra'], data['dec']))
+    try:
+        state = SkyConeSubsetState(lon_att=data.id['ra'], lat_att=data.id['dec'], lon=0, lat=0, radius=10)
+        state.to_mask(data)
+        assert state._index is None
+    finally:
+        COLUMN_STORE.release(key)
+
+    state.to_mask(data)
+    assert state._index[1] is not index
+
+
+def test_serialize():
+
+    data = make_data()
+    dc = DataCollection([data])
+    lon, lat = view_footprint(100, 40, 30)
+
+    cone = dc.new_subset_group(subset_state=SkyConeSubsetState(lon_att=data.id['ra'], lat_att=data.id['dec'],
+                                                               frame='Galactic', lon=30, lat=-20, radius=15))
+    polygon = dc.new_subset_group(subset_state=SkyPolygonSubsetState(lon_att=data.id['ra'],
+                                                                     lat_att=data.id['dec'],
+                                                                     lon=lon, lat=lat))
+
+    dc2 = clone(dc)
+    data2 = dc2[0]
+
+    for index, group in enumerate((cone, polygon)):
+        state2 = dc2.subset_groups[index].subset_state
+        assert type(state2) is type(group.subset_state)
+        assert_equal(state2.to_mask(data2), group.subset_state.to_mask(data))
+        assert_equal(data2.subsets[index].to_mask(), data.subsets[index].to_mask())
@@ -0,0 +1,86 @@
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ..render import FramePipeline, ImageSequenceWriter, Keyframe
+
+
+class RecordingWriter(object):
+
+    def __init__(self, ordered=False, fail_at=None):
+        self.ordered = ordered
+        self.fail_at = fail_at
+        self.frames = {}
+        self.order = []
+        self.threads = set()
+        self.closed = False
+
+    def write(self, index, frame):
+        if index == self.fail_at:
+            raise ValueError('cannot write frame {0}'.format(index))
+        self.frames[index] = frame
+        self.order.append(index)
+        self.threads.add(threading.get_ident())
+
+    def close(self):
+        self.closed = True
+
+
+def test_pipeline():
+    writer = RecordingWriter()
+    written = []
+    pipeline = FramePipeline(writer, convert=lambda frame: frame * 2, workers=2,
+                             on_written=lambda: written.append(True))
+    assert pipeline.max_pending == 4
+    for index in range(10):
+        pipeline.submit(index, index)
+    stats = pipeline.close()
+    assert writer.closed
+    assert writer.frames == {index: 2 * index for index in range(10)}
+    assert len(written) == 10
+    assert stats.frames == 10
+    assert stats.fps > 0
+
+
+def test_pipeline_ordered():
+    # Writers that need frames in order get a single worker
+    writer = RecordingWriter(ordered=True)
+    pipeline = FramePipeline(writer, workers=4)
+    for index in range(20):
+        pipeline.submit(index, index)
+    pipeline.close()
+    assert writer.order == list(range(20))
+    assert len(writer.threads) == 1
+
+
+def test_pipeline_error():
+    writer = RecordingWriter(ordered=True, fail_at=3)
+    pipeline = FramePipeline(writer)
+    for index in range(6):
+        pipeline.submit(index, index)
+    with pytest.raises(ValueError, match='frame 3'):
+        pipeline.close()
+    # Frames after the failure are not written
+    assert writer.order == [0, 1, 2]
+
+
+def test_image_sequence(tmpdir):
+    pattern = tmpdir.join('frames', '{0:03d}.png').strpath
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+    frame[1, 2] = 255, 128, 0
+    pipeline = FramePipeline(ImageSequenceWriter(pattern))
+    pipeline.submit(0, frame)
+    pipeline.submit(1, frame[::-1])
+    assert pipeline.close().frames == 2
+    np.testing.assert_array_equal(np.asarray(Image.open(pattern.format(0))), frame)
+    np.testing.assert_array_equal(np.asarray(Image.open(pattern.format(1))), frame[::-1])
+
+
+def test_keyframe():
+    keyframe = Keyframe(*('2020-01-01', None))
+    assert keyframe.time == '2020-01-01'
+    assert keyframe.camera is None
@@ -0,0 +1,105 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+import time
+
+import pytest
+import numpy as np
+from numpy.testing import assert_equal
+
+from astropy.wcs import WCS
+
+from ..reprojection_cache import (ReprojectionCache, apply_pixel_map, is_native_wcs,
+                                 nearest_pixel_map, prepare_image_for_wwt)
+
+
+def make_wcs(ctype=('RA---TAN', 'DEC--TAN'), radesys='ICRS'):
+    wcs = WCS(naxis=2)
+    wcs.wcs.ctype = list(ctype)
+    wcs.wcs.crval = [10, 20]
+    wcs.wcs.crpix = [5, 5]
+    wcs.wcs.cdelt = [-0.1, 0.1]
+    if radesys is not None:
+        wcs.wcs.radesys = radesys
+    return wcs
+
+
+def test_is_native_wcs():
+    assert is_native_wcs(make_wcs())
+    assert not is_native_wcs(make_wcs(radesys='FK5'))
+    assert not is_native_wcs(make_wcs(ctype=('RA---CAR', 'DEC--CAR')))
+    assert not is_native_wcs(make_wcs(ctype=('GLON-TAN', 'GLAT-TAN'), radesys=None))
+
+
+def test_prepare_native_image_unchanged(tmpdir):
+    cache = ReprojectionCache(directory=tmpdir.strpath)
+    data = np.ones((10, 10))
+    wcs = make_wcs()
+    assert prepare_image_for_wwt(data, wcs, cache=cache) == (data, wcs)
+    assert cache.entries() == []
+
+
+def test_key():
+    data = np.arange(100.).reshape((10, 10))
+    wcs_in = make_wcs(ctype=('GLON-TAN', 'GLAT-TAN'), radesys=None)
+    wcs_out = make_wcs()
+    key = ReprojectionCache.key(data, wcs_in, wcs_out)
+    assert ReprojectionCache.key(data.copy(), wcs_in, wcs_out) == key
+    assert ReprojectionCache.key(data + 1, wcs_in, wcs_out) != key
+    assert ReprojectionCache.key(data.astype(np.float32), wcs_in, wcs_out) != key
+    assert ReprojectionCache.key(data, wcs_in, make_wcs(radesys='FK5')) != key
+
+
+def test_get_put(tmpdir):
+    cache = ReprojectionCache(directory=tmpdir.join('cache').strpath)
+    assert cache.get('missing') is None
+    array = np.arange(12, dtype=np.float32).reshape((3, 4))
+    cache.put('abc', array, make_wcs())
+    cached_array, cached_wcs = cache.get('abc')
+    assert_equal(cached_array, array)
+    assert cached_wcs.wcs.ctype[0] == 'RA---TAN'
+    cache.clear()
+    assert cache.get('abc') is None
+
+
+def test_lru_eviction(tmpdir):
+
+    array = np.zeros((100, 100), dtype=np.float32)
+
+    cache = ReprojectionCache(directory=tmpdir.strpath)
+    cache.put('a', array, make_wcs())
+    entry_size = cache.size
+    cache.max_size = int(entry_size * 2.5)
+
+    # Make sure the modification times differ between entries
+    os.utime(cache._path('a'), (time.time() - 20,) * 2)
+    cache.put('b', array, make_wcs())
+    os.utime(cache._path('b'), (time.time() - 10,) * 2)
+
+    # Accessing 'a' makes 'b' the least recently used entry
+    cache.get('a')
+    cache.put('c', array, make_wcs())
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+    assert cache.size <= cache.max_size
+
+
+def test_pixel_map_native():
+    wcs = make_wcs()
+    assert nearest_pixel_map(wcs, (10, 10)) == (wcs, None)
+    mask = np.zeros((10, 10), dtype=bool)
+    assert apply_pixel_map(mask, None) is mask
+
+
+def test_pixel_map():
+    pytest.importorskip('reproject')
+    from reproject import reproject_interp
+    wcs = make_wcs(ctype=('GLON-TAN', 'GLAT-TAN'), radesys=None)
+    data = np.random.default_rng(0).random((10, 12))
+    wcs_out, index = nearest_pixel_map(wcs, data.shape)
+    assert nearest_pixel_map(wcs, data.shape)[1] is index
+    expected = reproject_interp((data, wcs), wcs_out, shape_out=index.shape,
+                                order='nearest-neighbor', return_footprint=False)
+    assert_equal(apply_pixel_map(data, index, fill=np.nan), expected)
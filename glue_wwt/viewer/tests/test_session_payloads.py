@@ -0,0 +1,39 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from ..session_payloads import SessionPayloads, payload_fingerprint
+
+
+def test_fingerprint():
+    keys = {'coords': ('coords', 'abc', 'def', 'Sky', 'ICRS'), 'alt': ('alt', 'ghi', 'pc')}
+    fingerprint = payload_fingerprint(keys)
+    assert payload_fingerprint(dict(reversed(list(keys.items())))) == fingerprint
+    assert payload_fingerprint(dict(keys, alt=('alt', 'ghi', 'kpc'))) != fingerprint
+    assert payload_fingerprint({'coords': keys['coords']}) != fingerprint
+
+
+def test_save_load(tmpdir):
+
+    payloads = SessionPayloads()
+    assert payloads.load('abc') is None
+
+    columns = {'lon': np.arange(3.), 'lat': np.ones(3),
+               'time': np.array(['2020-01-01T00:00:00'] * 3, dtype='datetime64[s]')}
+
+    with tmpdir.as_cwd():
+        path = payloads.save('abc', columns)
+    assert path == os.path.join('wwt_payloads', 'abc.npz')
+    assert tmpdir.join(path).exists()
+
+    # A new session should only see the payloads registered with it
+    payloads = SessionPayloads()
+    assert payloads.load('abc') is None
+    payloads.register('abc', tmpdir.join(path).strpath)
+    loaded = payloads.load('abc')
+    assert sorted(loaded) == ['lat', 'lon', 'time']
+    for name in columns:
+        assert_equal(loaded[name], columns[name])
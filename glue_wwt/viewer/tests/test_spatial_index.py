@@ -0,0 +1,67 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from astropy import units as u
+from astropy.coordinates import angular_separation
+
+from ..spatial_index import SpatialIndex
+
+
+def random_positions(n, seed=12345):
+    rng = np.random.default_rng(seed)
+    lon = rng.uniform(-180, 360, n)
+    lat = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    return lon, lat
+
+
+def separation(lon, lat, lon0, lat0):
+    return angular_separation(lon * u.deg, lat * u.deg, lon0 * u.deg, lat0 * u.deg).to_value(u.deg)
+
+
+def test_cone():
+
+    lon, lat = random_positions(5000)
+    index = SpatialIndex(lon, lat)
+    assert len(index) == 5000
+
+    for lon0, lat0, radius in [(10, 20, 5), (359, 0, 12), (0, 89, 7), (123, -45, 90)]:
+        expected = np.nonzero(separation(lon, lat, lon0, lat0) <= radius)[0]
+        assert_equal(index.cone(lon0, lat0, radius), expected)
+
+    assert_equal(index.cone(0, 0, 180), np.arange(5000))
+
+
+def test_box():
+
+    lon, lat = random_positions(5000)
+    index = SpatialIndex(lon, lat)
+
+    expected = np.nonzero((lon % 360 >= 20) & (lon % 360 <= 40) & (lat >= -10) & (lat <= 10))[0]
+    assert_equal(index.box(20, 40, -10, 10), expected)
+
+    # Longitude ranges can wrap around 0
+    expected = np.nonzero(((lon % 360 >= 350) | (lon % 360 <= 10)) & (lat >= 0) & (lat <= 30))[0]
+    assert_equal(index.box(350, 10, 0, 30), expected)
+
+    assert_equal(index.box(0, 360, -90, 90), np.arange(5000))
+
+
+def test_nearest():
+
+    lon, lat = random_positions(1000)
+    index = SpatialIndex(lon, lat)
+
+    expected = np.argmin(separation(lon, lat, 45, 30))
+    assert index.nearest(45, 30) == expected
+    assert index.nearest(lon[expected] + 1e-3, lat[expected], max_radius=0.01) == expected
+
+    assert SpatialIndex([0.], [0.]).nearest(180, 0, max_radius=10) is None
+    assert SpatialIndex([], []).nearest(0, 0) is None
+
+
+def test_non_finite():
+    index = SpatialIndex([1., np.nan, 2., 3.], [0., 0., np.inf, 0.])
+    assert_equal(index.cone(2, 0, 5), [0, 3])
+    assert_equal(index.box(0, 10, -10, 10), [0, 3])
@@ -0,0 +1,103 @@
+from __future__ import absolute_import, division, print_function
+
+from glue.config import settings
+
+from ..throttle import Throttle, time_slider_interval
+
+
+class FakeLoop(object):
+
+    def __init__(self):
+        self.time = 0.
+        self.scheduled = []
+
+    def __call__(self):
+        return self.time
+
+    def call_later(self, delay, callback):
+        self.scheduled.append((self.time + delay, callback))
+
+    def advance(self, seconds):
+        self.time += seconds
+        due = [item for item in self.scheduled if item[0] <= self.time]
+        self.scheduled = [item for item in self.scheduled if item[0] > self.time]
+        for _, callback in due:
+            callback()
+
+
+def make_throttle(interval=1):
+    loop = FakeLoop()
+    calls = []
+    throttle = Throttle(lambda value: calls.append((loop.time, value)), interval,
+                        loop.call_later, clock=loop)
+    return throttle, loop, calls
+
+
+def test_first_call():
+    throttle, loop, calls = make_throttle()
+    throttle(1)
+    assert calls == [(0, 1)]
+    assert not loop.scheduled
+
+
+def test_coalesce():
+    # Calls within the interval are coalesced into one with the latest value
+    throttle, loop, calls = make_throttle()
+    throttle(1)
+    for value in range(2, 50):
+        loop.advance(0.01)
+        throttle(value)
+    assert len(loop.scheduled) == 1
+    assert throttle.pending
+    loop.advance(0.6)
+    assert [value for _, value in calls] == [1, 49]
+    assert calls[1][0] >= 1
+    assert not throttle.pending
+
+
+def test_rate():
+    # A steady stream of calls results in one call per interval
+    throttle, loop, calls = make_throttle(interval=0.1)
+    for value in range(1000):
+        throttle(value)
+        loop.advance(0.001)
+    loop.advance(0.1)
+    assert 10 <= len(calls) <= 11
+    assert calls[-1][1] == 999
+
+
+def test_after_interval():
+    throttle, loop, calls = make_throttle()
+    throttle(1)
+    loop.advance(2)
+    throttle(2)
+    assert calls == [(0, 1), (2, 2)]
+
+
+def test_flush_cancel():
+    throttle, loop, calls = make_throttle()
+    throttle(1)
+    throttle(2)
+    throttle.flush()
+    assert calls == [(0, 1), (0, 2)]
+    loop.advance(1)
+    assert len(calls) == 2
+
+    loop.advance(1)
+    throttle(3)
+    throttle(4)
+    throttle.cancel()
+    loop.advance(1)
+    assert calls[-1] == (2, 3)
+    assert not throttle.pending
+
+
+def test_time_slider_interval():
+    rate = settings.WWT_TIME_SLIDER_RATE
+    try:
+        settings.WWT_TIME_SLIDER_RATE = 4
+        assert time_slider_interval() == 0.25
+        settings.WWT_TIME_SLIDER_RATE = 0
+        assert time_slider_interval() == 0.
+    finally:
+        settings.WWT_TIME_SLIDER_RATE = rate
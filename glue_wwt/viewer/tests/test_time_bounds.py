@@ -0,0 +1,99 @@
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from glue.core import Data, DataCollection
+from glue.core.subset import RangeSubsetState
+
+from ..time_bounds import TimeBoundsCache, update_time_bounds
+from ..viewer_state import WWTDataViewerState
+
+
+def make_data():
+    times = np.array(['2010-01-01', '2012-06-01', 'NaT', '2015-12-31'], dtype='datetime64[D]')
+    data = Data(x=[1, 2, 3, 4], t=times, label='data')
+    DataCollection([data])
+    return data
+
+
+class CountingData(Data):
+
+    reads = 0
+
+    def __getitem__(self, key):
+        CountingData.reads += 1
+        return super(CountingData, self).__getitem__(key)
+
+
+def test_bounds():
+    data = make_data()
+    cache = TimeBoundsCache()
+    assert cache.get(data, data.id['t']) == (np.datetime64('2010-01-01'), np.datetime64('2015-12-31'))
+    assert len(cache) == 1
+
+
+def test_cached():
+    data = CountingData(t=np.array(['2010-01-01', '2011-01-01'], dtype='datetime64[D]'))
+    DataCollection([data])
+    cache = TimeBoundsCache()
+    cache.get(data, data.id['t'])
+    reads = CountingData.reads
+    cache.get(data, data.id['t'])
+    assert CountingData.reads == reads
+
+
+def test_not_in_collection():
+    data = Data(t=np.array(['2010-01-01'], dtype='datetime64[D]'))
+    cache = TimeBoundsCache()
+    assert cache.get(data, data.id['t']) == (np.datetime64('2010-01-01'),) * 2
+    assert len(cache) == 0
+
+
+def test_data_changed():
+    data = make_data()
+    subset = data.new_subset(RangeSubsetState(1.5, 2.5, data.id['x']))
+    cache = TimeBoundsCache()
+    cache.get(data, data.id['t'])
+    assert cache.get(subset, data.id['t']) == (np.datetime64('2012-06-01'),) * 2
+    assert len(cache) == 2
+
+    data.update_components({data.id['t']: np.array(['2000-01-01', '2001-01-01', '2002-01-01', '2003-01-01'],
+                                                    dtype='datetime64[D]')})
+    assert len(cache) == 0
+    assert cache.get(data, data.id['t']) == (np.datetime64('2000-01-01'), np.datetime64('2003-01-01'))
+    assert cache.get(subset, data.id['t']) == (np.datetime64('2001-01-01'),) * 2
+
+
+def test_subset_changed():
+    data = make_data()
+    subset = data.new_subset(RangeSubsetState(1.5, 2.5, data.id['x']))
+    cache = TimeBoundsCache()
+    cache.get(data, data.id['t'])
+    cache.get(subset, data.id['t'])
+
+    subset.subset_state = RangeSubsetState(0.5, 2.5, data.id['x'])
+    assert len(cache) == 1
+    assert cache.get(subset, data.id['t']) == (np.datetime64('2010-01-01'), np.datetime64('2012-06-01'))
+
+
+def test_all_nat():
+    data = Data(t=np.array(['NaT'], dtype='datetime64[D]'))
+    DataCollection([data])
+    assert TimeBoundsCache().get(data, data.id['t']) is None
+
+
+def test_update_time_bounds():
+
+    class LayerState(object):
+        def __init__(self, layer, time_att):
+            self.layer = layer
+            self.time_att = time_att
+
+    data = make_data()
+    state = WWTDataViewerState()
+    state.min_time = np.datetime64('2011-01-01')
+    state.max_time = np.datetime64('2011-02-01')
+    state.layers = [LayerState(data, data.id['t']), LayerState(data, None)]
+    update_time_bounds(state, cache=TimeBoundsCache())
+    assert state.min_time == np.datetime64('2010-01-01')
+    assert state.max_time == np.datetime64('2015-12-31')
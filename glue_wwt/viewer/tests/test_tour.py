@@ -0,0 +1,43 @@
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+
+import pytest
+
+from ..tour import TourWriter
+
+TOUR = ('<Tour><TourStop AltUnit="1"/><TourStop AltUnit="10"/>'
+        '<TourStop AltUnit="0"/><TourStop AltUnit="2"/></Tour>\r\n')
+
+EXPECTED = ('<Tour><TourStop AltUnit="0"/><TourStop AltUnit="9"/>'
+            '<TourStop AltUnit="0"/><TourStop AltUnit="1"/></Tour>\r\n')
+
+
+def read(filename):
+    with io.open(filename, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 11, 12, 13, len(TOUR)])
+def test_write_chunks(tmpdir, chunk_size):
+    # The altitude units are fixed however the tour is split in chunks
+    filename = tmpdir.join('tour.wtt').strpath
+    writer = TourWriter(filename)
+    for start in range(0, len(TOUR), chunk_size):
+        writer.write(TOUR[start:start + chunk_size])
+    assert not os.path.exists(filename)
+    writer.close()
+    assert read(filename) == EXPECTED
+    assert not os.path.exists(filename + '.part')
+
+
+def test_abort(tmpdir):
+    filename = tmpdir.join('tour.wtt').strpath
+    with io.open(filename, 'w') as f:
+        f.write('previous')
+    writer = TourWriter(filename)
+    writer.write(TOUR)
+    writer.abort()
+    assert read(filename) == 'previous'
+    assert not os.path.exists(filename + '.part')
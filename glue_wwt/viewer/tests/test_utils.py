@@ -3,7 +3,10 @@ from __future__ import absolute_import, division, print_function
 import numpy as np
 from numpy.testing import assert_allclose
 
-from ..utils import center_fov
+from astropy import units as u
+from astropy.coordinates import angular_separation
+
+from ..utils import center_fov, center_fov_chunked
 
 
 def test_center_fov():
@@ -32,5 +35,58 @@ def test_center_fov_non_finite():
     assert_allclose(fov, 1)
 
 
+def test_center_fov_wrap():
+
+    # The circle should be centered on RA 0 rather than on RA 180
+    lon = np.array([358, 359, 1, 2])
+    lat = np.array([0, 1, -1, 0])
+
+    lon_c, lat_c, fov = center_fov(lon, lat)
+
+    assert_allclose(lon_c % 360, 0, atol=1e-10)
+    assert_allclose(lat_c, 0, atol=1e-10)
+    assert_allclose(fov, 2)
+
+
+def test_center_fov_clustered():
+
+    # The circle should go through the extreme points rather than be
+    # centered on the mean position, which is close to the cluster
+    lon = np.hstack([np.full(1000, 10.), [20.]])
+    lat = np.zeros(1001)
+
+    lon_c, lat_c, fov = center_fov(lon, lat)
+
+    assert_allclose(lon_c, 15)
+    assert_allclose(lat_c, 0, atol=1e-10)
+    assert_allclose(fov, 5)
+
+
+def test_center_fov_enclosing():
+
+    rng = np.random.default_rng(12345)
+
+    for spread in (1, 20, 60, 180):
+        lon = rng.normal(100, spread, 1000)
+        lat = np.clip(rng.normal(40, spread, 1000), -90, 90)
+        lon_c, lat_c, fov = center_fov(lon, lat)
+        separation = angular_separation(lon * u.deg, lat * u.deg, lon_c * u.deg, lat_c * u.deg)
+        assert separation.to_value(u.deg).max() <= fov + 1e-8
+
+
+def test_center_fov_empty():
+    assert center_fov(np.array([np.nan]), np.array([0.])) == (None, None, None)
+
+
+def test_center_fov_chunked():
+
+    rng = np.random.default_rng(12345)
+    lon = rng.normal(100, 10, 10000)
+    lat = rng.normal(40, 10, 10000)
+    chunks = [(lon[start:start + 1000], lat[start:start + 1000]) for start in range(0, 10000, 1000)]
+
+    assert_allclose(center_fov_chunked(lambda: chunks), center_fov(lon, lat))
+
+
 def create_disabled_message(reason):
     return "Cannot visualize this layer: %s" % reason
@@ -0,0 +1,99 @@
+"""
+Rate-limiting calls made in response to user interaction, such as moving a
+slider or slewing the view, so that WWT isn't sent a storm of updates.
+
+The ``WWT_TIME_SLIDER_RATE`` setting is the maximum number of times per
+second that dragging the time slider of the viewer options updates the time
+(or 0 for no limit).
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import time
+
+from glue.config import settings
+
+__all__ = ['Throttle', 'time_slider_interval']
+
+settings.add('WWT_TIME_SLIDER_RATE', 20, validator=float)
+
+
+def time_slider_interval():
+    """
+    Return the minimum interval in seconds between updates of the time by the
+    time sliders, from the ``WWT_TIME_SLIDER_RATE`` setting.
+    """
+    rate = settings.WWT_TIME_SLIDER_RATE
+    return 1. / rate if rate > 0 else 0.
+
+
+class Throttle(object):
+    """
+    Call ``callback`` at most once every ``interval`` seconds, with the
+    arguments of the latest call.
+
+    The first call is made straight away. Calls made less than ``interval``
+    seconds after the previous one are coalesced into a single call, made
+    once the interval has elapsed by ``call_later(delay, function)``, which
+    should call ``function`` after ``delay`` seconds on the same thread
+    (e.g. with a Qt timer or the asyncio event loop).
+    """
+
+    def __init__(self, callback, interval, call_later, clock=time.monotonic):
+        self.callback = callback
+        self.interval = interval
+        self._call_later = call_later
+        self._clock = clock
+        self._pending = None
+        self._last = None
+        # The generation of the call scheduled, if any, which is incremented
+        # each time, so that calls scheduled before being cancelled are ignored
+        self._scheduled = None
+        self._generation = 0
+
+    @property
+    def pending(self):
+        """
+        Whether a call is waiting for the interval to elapse.
+        """
+        return self._pending is not None
+
+    def __call__(self, *args, **kwargs):
+        self._pending = args, kwargs
+        if self._scheduled is not None:
+            return
+        now = self._clock()
+        if self._last is None or now - self._last >= self.interval:
+            self._fire()
+        else:
+            self._generation += 1
+            generation = self._scheduled = self._generation
+            self._call_later(self.interval - (now - self._last), lambda: self._on_timer(generation))
+
+    def _on_timer(self, generation):
+        if generation != self._scheduled:
+            return
+        self._scheduled = None
+        if self._pending is not None:
+            self._fire()
+
+    def _fire(self):
+        args, kwargs = self._pending
+        self._pending = None
+        self._last = self._clock()
+        self.callback(*args, **kwargs)
+
+    def flush(self):
+        """
+        Make the pending call (if any) now.
+        """
+        self._scheduled = None
+        if self._pending is not None:
+            self._fire()
+
+    def cancel(self):
+        """
+        Drop the pending call (if any).
+        """
+        self._scheduled = None
+        self._pending = None
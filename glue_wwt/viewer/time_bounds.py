@@ -0,0 +1,112 @@
+"""
+A cache of the range of the time components of datasets and subsets.
+
+The time slider of the viewer options covers the times of all the layers with
+a time component, and has to be updated whenever the layers change, e.g. when
+a subset is added. Rather than scanning every time column each time, the range
+of each (layer, component) is cached until the data or subset changes, which
+the cache hears about from the hub of the data collection.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import weakref
+
+import numpy as np
+
+from glue.core.hub import HubListener
+from glue.core.message import (ComponentsChangedMessage, DataUpdateMessage,
+                               NumericalDataChangedMessage, SubsetUpdateMessage)
+
+__all__ = ['TimeBoundsCache', 'TIME_BOUNDS_CACHE', 'update_time_bounds']
+
+
+def _time_bounds(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        values = values[~np.isnat(values)]
+    if values.size == 0:
+        return None
+    return values.min(), values.max()
+
+
+class TimeBoundsCache(HubListener):
+    """
+    Cache the ``(min, max)`` times of components of datasets and subsets.
+
+    Entries for a dataset are dropped when its values or components change
+    (along with those for its subsets), and entries for a subset when its
+    selection changes. Layers that aren't in a data collection (and so can't
+    tell us when they change) aren't cached.
+    """
+
+    def __init__(self):
+        self._bounds = weakref.WeakKeyDictionary()
+        self._hubs = weakref.WeakSet()
+
+    def __len__(self):
+        return sum(len(bounds) for bounds in self._bounds.values())
+
+    def get(self, layer, component):
+        """
+        Return the ``(min, max)`` of ``component`` in ``layer`` (a dataset or
+        subset), or `None` if it has no valid values.
+        """
+        bounds = self._bounds.get(layer)
+        if bounds is not None and component in bounds:
+            return bounds[component]
+        result = _time_bounds(layer[component])
+        hub = getattr(layer.data, 'hub', None)
+        if hub is not None:
+            self._register(hub)
+            self._bounds.setdefault(layer, {})[component] = result
+        return result
+
+    def invalidate(self, layer):
+        """
+        Drop the entries for ``layer``, and for its subsets if it is a dataset.
+        """
+        self._bounds.pop(layer, None)
+        for subset in getattr(layer, 'subsets', ()):
+            self._bounds.pop(subset, None)
+
+    def clear(self):
+        self._bounds.clear()
+
+    def _register(self, hub):
+        if hub in self._hubs:
+            return
+        self._hubs.add(hub)
+        hub.subscribe(self, NumericalDataChangedMessage, handler=self._on_data_changed)
+        hub.subscribe(self, ComponentsChangedMessage, handler=self._on_data_changed)
+        hub.subscribe(self, DataUpdateMessage, handler=self._on_data_changed)
+        hub.subscribe(self, SubsetUpdateMessage, handler=self._on_subset_changed)
+
+    def _on_data_changed(self, message):
+        self.invalidate(message.data)
+
+    def _on_subset_changed(self, message):
+        if message.attribute == 'subset_state':
+            self.invalidate(message.subset)
+
+
+TIME_BOUNDS_CACHE = TimeBoundsCache()
+
+
+def update_time_bounds(viewer_state, cache=TIME_BOUNDS_CACHE):
+    """
+    Widen the ``min_time`` and ``max_time`` of ``viewer_state`` to cover the
+    times of all its layers with a time component.
+    """
+    min_time = viewer_state.min_time
+    max_time = viewer_state.max_time
+    for layer_state in viewer_state.layers:
+        if getattr(layer_state, 'time_att', None) is None:
+            continue
+        bounds = cache.get(layer_state.layer, layer_state.time_att)
+        if bounds is not None:
+            min_time = min(min_time, bounds[0])
+            max_time = max(max_time, bounds[1])
+
+    viewer_state.min_time = min_time
+    viewer_state.max_time = max_time
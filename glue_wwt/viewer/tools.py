@@ -4,6 +4,7 @@ from os.path import abspath, dirname, join
 
 from glue.viewers.common.tool import Tool
 from glue.config import viewer_tool
+from glue.logger import logger
 
 
 @viewer_tool
@@ -16,3 +17,55 @@ class RefreshTileCacheTool(Tool):
 
     def activate(self):
         self.viewer._wwt.refresh_tile_cache()
+        # The catalogue is downloaded without blocking the user interface,
+        # and the current one is kept if that fails (e.g. when offline).
+        # All the viewers are updated once it is done.
+        self.viewer._imagery_catalog.refresh_in_background(force=True)
+        self.viewer._wait_for_imagery_catalog()
+
+
+class SkyRegionSelectTool(Tool):
+
+    shape = None
+
+    def activate(self):
+        from pywwt import ViewerNotAvailableError
+        try:
+            self.viewer.select_sky_region(self.shape)
+        except (ValueError, ViewerNotAvailableError) as exc:
+            logger.warning(str(exc))
+
+
+@viewer_tool
+class ConeSelectTool(SkyRegionSelectTool):
+
+    icon = 'glue_circle'
+    tool_id = 'wwt:select_cone'
+    action_text = 'Select the sources in a circle centered on the view'
+    tool_tip = 'Select the sources in the largest circle that fits in the view'
+    shape = 'cone'
+
+
+@viewer_tool
+class PolygonSelectTool(SkyRegionSelectTool):
+
+    icon = 'glue_square'
+    tool_id = 'wwt:select_polygon'
+    action_text = 'Select the sources in the view'
+    tool_tip = 'Select the sources in the area of the sky shown in the view'
+    shape = 'polygon'
+
+
+@viewer_tool
+class PickedSelectTool(Tool):
+
+    icon = 'glue_circle_point'
+    tool_id = 'wwt:select_picked'
+    action_text = 'Select the source last clicked in the view'
+    tool_tip = 'Select the source last clicked in the view'
+
+    def activate(self):
+        try:
+            self.viewer.select_picked()
+        except ValueError as exc:
+            logger.warning(str(exc))
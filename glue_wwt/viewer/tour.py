@@ -0,0 +1,75 @@
+"""
+Writing WWT tour files from the XML exported by WWT, which is received in
+chunks so that large tours never have to be held in memory at once.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import re
+
+from glue.logger import logger
+
+__all__ = ['TourWriter']
+
+# The web client and the Windows client disagree on the altitude units in
+# tours, so we patch them so that tours are correct for the Windows client:
+# https://github.com/WorldWideTelescope/wwt-web-client/issues/248
+ALT_UNIT = re.compile(r'AltUnit="(\d+)"')
+
+# The length of the longest AltUnit attribute that is changed
+_MAX_ALT_UNIT_LENGTH = len('AltUnit="10"')
+
+
+class TourWriter(object):
+    """
+    Write the tour XML given to `write` in chunks to ``filename``.
+
+    The chunks are written to a temporary file alongside ``filename``, which
+    only replaces it once `close` is called, so that a failed export never
+    leaves a partial tour behind.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._partial_filename = filename + '.part'
+        self._file = io.open(self._partial_filename, 'w', encoding='utf-8', newline='')
+        self._pending = ''
+        self._fixed = 0
+
+    def write(self, chunk):
+        text = self._pending + chunk
+        # Text that may be the start of an AltUnit attribute is kept until
+        # the next chunk, so that attributes split between chunks are fixed.
+        cut = max(len(text) - _MAX_ALT_UNIT_LENGTH + 1, 0)
+        for match in ALT_UNIT.finditer(text, max(cut - _MAX_ALT_UNIT_LENGTH, 0)):
+            if match.start() < cut < match.end():
+                cut = match.start()
+                break
+        self._file.write(ALT_UNIT.sub(self._fix_alt_unit, text[:cut]))
+        self._pending = text[cut:]
+
+    def _fix_alt_unit(self, match):
+        unit = int(match.group(1))
+        if 1 <= unit <= 10:
+            self._fixed += 1
+            return 'AltUnit="{0}"'.format(unit - 1)
+        return match.group(0)
+
+    def close(self):
+        """
+        Finish writing the tour, and move it to ``filename``.
+        """
+        self._file.write(ALT_UNIT.sub(self._fix_alt_unit, self._pending))
+        self._file.close()
+        os.replace(self._partial_filename, self.filename)
+        if self._fixed:
+            logger.info('Changed {0} altitude units in {1} for the Windows client'.format(self._fixed, self.filename))
+
+    def abort(self):
+        """
+        Stop writing the tour, and remove what was written.
+        """
+        self._file.close()
+        os.remove(self._partial_filename)
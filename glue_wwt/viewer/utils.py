@@ -2,29 +2,151 @@ from __future__ import absolute_import, division, print_function
 
 import numpy as np
 
-from astropy import units as u
-try:
-    from astropy.coordinates import angular_separation
-except ImportError:
-    from astropy.coordinates.angle_utilities import angular_separation
-from astropy.coordinates.representation import UnitSphericalRepresentation
+__all__ = ['center_fov', 'center_fov_chunked']
 
-__all__ = ['center_fov']
+# Tolerance on the cosine of angles when checking if points are in a cap
+_TOLERANCE = 1e-12
 
+# The maximum number of points added to the set defining the enclosing cap
+# before giving up on finding the minimum one
+_MAX_SUPPORT = 1000
 
-def center_fov(lon, lat):
 
-    # We need to filter out any non-finite values
+def _unit_vectors(lon, lat):
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
     keep = np.isfinite(lon) & np.isfinite(lat)
-    lon, lat = lon[keep], lat[keep]
+    if not keep.all():
+        lon, lat = lon[keep], lat[keep]
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector)
+    return None if norm < _TOLERANCE else vector / norm
+
+
+def _cap(points):
+    """
+    Return the ``(center, cos_radius)`` of the smallest cap with one, two or
+    three points on its boundary, or `None` if it isn't well defined.
+    """
+    if len(points) == 1:
+        return points[0], 1.
+    elif len(points) == 2:
+        center = _normalize(points[0] + points[1])
+    else:
+        center = _normalize(np.cross(points[1] - points[0], points[2] - points[0]))
+        if center is not None and center @ points[0] < 0:
+            center = -center
+    if center is None:
+        return None
+    return center, center @ points[0]
+
+
+def _welzl(points):
+    """
+    Return the ``(center, cos_radius)`` of the minimum cap enclosing the
+    (few) given unit vectors, which should fit in a hemisphere, or `None`.
+    """
+
+    def outside(cap, point):
+        return cap is not None and cap[0] @ point < cap[1] - _TOLERANCE
+
+    cap = points[0], 1.
+    for i in range(1, len(points)):
+        if not outside(cap, points[i]):
+            continue
+        cap = points[i], 1.
+        for j in range(i):
+            if not outside(cap, points[j]):
+                continue
+            cap = _cap(points[[i, j]])
+            for k in range(j):
+                if outside(cap, points[k]):
+                    cap = _cap(points[[i, j, k]])
+        if cap is None:
+            return None
+    return cap
 
-    lon = u.Quantity(lon, u.deg, copy=False)
-    lat = u.Quantity(lat, u.deg, copy=False)
 
-    unit_sph = UnitSphericalRepresentation(lon, lat, copy=False)
+def _result(center, cos_radius):
+    lon = np.degrees(np.arctan2(center[1], center[0])) % 360
+    lat = np.degrees(np.arcsin(np.clip(center[2], -1, 1)))
+    return lon, lat, np.degrees(np.arccos(np.clip(cos_radius, -1, 1)))
 
-    cen = unit_sph.mean()
 
-    sep = angular_separation(lon, lat, cen.lon, cen.lat).to(u.deg).value.max()
+def _enclosing_cap(get_chunks):
+    """
+    Return the center and radius of the minimum cap enclosing the unit
+    vectors in the chunks returned by each call to ``get_chunks``.
+    """
+
+    total = np.zeros(3)
+    support = []
+    for vectors in get_chunks():
+        if len(vectors):
+            total += vectors.sum(axis=0)
+            if not support:
+                support.append(vectors[0])
+
+    if not support:
+        return None, None, None
+
+    # The mean direction is only used if the data doesn't fit in a hemisphere,
+    # in which case we fall back to the cap around it that contains the data.
+    mean = _normalize(total)
+    if mean is None:
+        mean = np.array([1., 0., 0.])
+
+    # We find the cap enclosing a small set of points, and then add the
+    # points outside it that are farthest from its center, until there are
+    # no points outside it (each pass only needs to go through the data once).
+    random = np.random.RandomState(12345)
+    while len(support) <= _MAX_SUPPORT:
+        points = np.array(support)
+        cap = _welzl(points[random.permutation(len(points))])
+        # If the points don't fit in a hemisphere, the cap found doesn't
+        # contain all of them or is larger than a hemisphere.
+        if cap is None or cap[1] <= 0 or np.any(points @ cap[0] < cap[1] - _TOLERANCE):
+            break
+        center, cos_radius = cap
+        added = False
+        for vectors in get_chunks():
+            if len(vectors) == 0:
+                continue
+            dots = vectors @ center
+            farthest = np.argmin(dots)
+            if dots[farthest] < cos_radius - _TOLERANCE:
+                support.append(vectors[farthest])
+                added = True
+        if not added:
+            return _result(center, cos_radius)
+
+    cos_radius = min(np.min(vectors @ mean) for vectors in get_chunks() if len(vectors))
+    return _result(mean, cos_radius)
+
+
+def center_fov(lon, lat):
+    """
+    Return the longitude and latitude of the center of the smallest circle
+    containing all the finite positions given by ``lon`` and ``lat``, and
+    its radius, all in degrees. If the positions don't fit in a hemisphere,
+    the circle is centered on their mean direction instead. If there are no
+    finite positions, `None` is returned for all values.
+    """
+    vectors = _unit_vectors(lon, lat)
+    return _enclosing_cap(lambda: [vectors])
+
 
-    return cen.lon.to(u.deg).value, cen.lat.to(u.deg).value, sep
+def center_fov_chunked(get_chunks):
+    """
+    As `center_fov`, for data that doesn't fit in memory: ``get_chunks``
+    should return a new iterable of ``(lon, lat)`` arrays each time it is
+    called. Each call goes through the data once, and only a few calls are
+    usually needed.
+    """
+    return _enclosing_cap(lambda: (_unit_vectors(lon, lat) for lon, lat in get_chunks()))
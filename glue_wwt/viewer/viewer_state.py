@@ -81,6 +81,10 @@ class WWTDataViewerState(ViewerState):
     # fails.
     imagery_layers = ListCallbackProperty()
 
+    # Whether this state was restored from a session, in which case the
+    # viewer it is given to only creates its layers in WWT once it is shown
+    _restored = False
+
     def __init__(self, **kwargs):
 
         super(WWTDataViewerState, self).__init__()
@@ -126,6 +130,12 @@ class WWTDataViewerState(ViewerState):
         self.lat_att_helper.set_multiple_data(self.layers_data)
         self.alt_att_helper.set_multiple_data(self.layers_data)
 
+    @classmethod
+    def __setgluestate__(cls, rec, context):
+        state = super(WWTDataViewerState, cls).__setgluestate__(rec, context)
+        state._restored = True
+        return state
+
     def _update_imagery_layers(self, *args):
         WWTDataViewerState.foreground.set_choices(self, self.imagery_layers)
         WWTDataViewerState.background.set_choices(self, self.imagery_layers)